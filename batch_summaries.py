@@ -0,0 +1,408 @@
+# -*- coding: utf-8 -*-
+
+"""
+Zusammenfassungen nicht eiliger Accounts über die OpenAI-Batch-API.
+
+Statt die Zusammenfassung sofort anzufordern, reiht process_tweet_async die fertige
+Chat-Anfrage in die Tabelle batch_requests ein. submit_due schreibt fällige Anfragen
+(BATCH_SUMMARY["max_requests"] erreicht oder die älteste länger als max_wait_seconds
+wartend) als JSONL-Datei, lädt sie hoch und legt einen Batch an; poll fragt laufende
+Batches ab und übernimmt die Antworten aus Ausgabe- und Fehlerdatei. Die fertigen
+Ergebnisse holt main.run_batches_async mit claim_results ab und sendet sie an Telegram.
+
+Der gesamte Fortschritt liegt im State-Store, ein Neustart setzt laufende Batches fort.
+Zustände einer Anfrage: queued -> submitting -> submitted -> done/failed -> posting ->
+posted/dropped. Anfragen aus fehlgeschlagenen oder abgelaufenen Batches werden erneut
+eingereiht, nach max_attempts (wie auch Einzelfehler) direkt zusammengefasst. Scheitert der
+Versand, geht die Anfrage zurück nach done/failed und wird erst nach max_send_attempts verworfen.
+Einreichen, Abfragen und Senden sind über Leases abgesichert, sodass mehrere Worker
+denselben Store nutzen können. Ein Absturz zwischen Versand und Eintrag kann einen Post
+wiederholen (wie bei process_tweet_async); ein Absturz direkt nach dem Anlegen eines Batches
+lässt dessen Anfragen nach Ablauf der Lease erneut einreichen (doppelte Kosten, kein doppelter Post).
+"""
+
+import os
+import json
+import time
+import threading
+
+from config import BATCH_SUMMARY
+from state_store import get_state_store
+from sharding import get_worker_id
+from metrics import get_metrics
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS batch_requests (
+    custom_id   TEXT PRIMARY KEY,
+    tweet       TEXT NOT NULL,
+    account     TEXT NOT NULL,
+    instruction TEXT NOT NULL,
+    body        TEXT NOT NULL,
+    max_chars   INTEGER,
+    cache_key   TEXT,
+    state       TEXT NOT NULL,
+    batch_id    TEXT,
+    attempts    INTEGER NOT NULL DEFAULT 0,
+    send_attempts INTEGER NOT NULL DEFAULT 0,
+    response    TEXT,
+    error       TEXT,
+    owner       TEXT,
+    lease_until REAL,
+    queued_at   REAL NOT NULL,
+    updated_at  REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_batch_requests_state ON batch_requests (state, queued_at);
+CREATE INDEX IF NOT EXISTS idx_batch_requests_batch ON batch_requests (batch_id);
+CREATE TABLE IF NOT EXISTS batch_jobs (
+    batch_id      TEXT PRIMARY KEY,
+    input_file_id TEXT NOT NULL,
+    local_file    TEXT,
+    status        TEXT NOT NULL,
+    requests      INTEGER NOT NULL,
+    submitted_at  REAL NOT NULL,
+    checked_at    REAL,
+    finished_at   REAL,
+    owner         TEXT,
+    lease_until   REAL
+);
+"""
+
+# Endzustände eines Batches laut API
+_FINAL_STATUSES = ("completed", "failed", "expired", "cancelled")
+# Anfragen, die noch nicht veröffentlicht oder verworfen wurden
+_OPEN_STATES = ("queued", "submitting", "submitted", "done", "failed", "posting")
+_ENDPOINT = "/v1/chat/completions"
+
+
+class BatchQueue:
+    """Warteschlange der Batch-Anfragen und laufenden Batches im gemeinsamen State-Store."""
+
+    def __init__(self, store=None, settings=None):
+        self.settings = dict(BATCH_SUMMARY if settings is None else settings)
+        self.store = store or get_state_store()
+        self.store.ensure_schema(_SCHEMA)
+        self._add_missing_columns()
+        self.store.add_compaction_hook(self.compact)
+        self.owner = get_worker_id()
+
+    def _add_missing_columns(self):
+        """Ergänzt Spalten, die in Stores älterer Versionen fehlen."""
+        columns = {row[1] for row in self.store.execute("PRAGMA table_info(batch_requests)").fetchall()}
+        if "send_attempts" not in columns:
+            self.store.execute("ALTER TABLE batch_requests ADD COLUMN send_attempts INTEGER NOT NULL DEFAULT 0")
+
+    def applies_to(self, account_config):
+        """Prüft, ob die Zusammenfassungen eines Accounts über die Batch-API laufen."""
+        if not self.settings["enabled"]:
+            return False
+        accounts = {account.lower() for account in self.settings["accounts"]}
+        return bool(account_config.get("batch")) or "*" in accounts or account_config["username"].lower() in accounts
+
+    def enqueue(self, custom_id, tweet, account_config, instruction, request):
+        """
+        Reiht eine Zusammenfassung ein.
+
+        Args:
+            custom_id: Eindeutige Kennung (Hash des Tweet-Texts), verhindert doppelte Einträge
+            tweet: Der Tweet (Tweet-Objekt)
+            account_config: Konfiguration des Accounts
+            instruction: Verwendeter Instruktionsschlüssel (Stil)
+            request: Ergebnis von main.build_summary_request
+
+        Returns:
+            bool: True, wenn die Anfrage neu eingereiht wurde
+        """
+        body = {"model": request["model"], "messages": request["messages"]}
+        if request["max_tokens"]:
+            body["max_tokens"] = request["max_tokens"]
+        now = time.time()
+        cursor = self.store.execute(
+            "INSERT OR IGNORE INTO batch_requests (custom_id, tweet, account, instruction, body, max_chars, cache_key, "
+            "state, queued_at, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?, 'queued', ?, ?)",
+            (custom_id, json.dumps(tweet.to_dict(), ensure_ascii=False), json.dumps(account_config, ensure_ascii=False),
+             instruction, json.dumps(body, ensure_ascii=False), request["max_chars"], request["cache_key"], now, now)
+        )
+        if cursor.rowcount:
+            get_metrics().count("batch", "success", "queued")
+        return bool(cursor.rowcount)
+
+    def counts(self):
+        """Anzahl der Anfragen pro Zustand."""
+        rows = self.store.execute("SELECT state, COUNT(*) FROM batch_requests GROUP BY state").fetchall()
+        return dict(rows)
+
+    def has_work(self):
+        """True, solange Anfragen eingereiht, in einem Batch oder noch nicht gesendet sind."""
+        placeholders = ",".join("?" * len(_OPEN_STATES))
+        row = self.store.execute(
+            f"SELECT 1 FROM batch_requests WHERE state IN ({placeholders}) LIMIT 1", _OPEN_STATES
+        ).fetchone()
+        return row is not None
+
+    def _claim_queued(self, force):
+        """Beansprucht die nächsten fälligen Anfragen zum Einreichen (leere Liste, wenn noch nichts fällig ist)."""
+        now = time.time()
+        with self.store.transaction() as conn:
+            rows = conn.execute(
+                "SELECT custom_id, body, queued_at FROM batch_requests "
+                "WHERE state = 'queued' OR (state = 'submitting' AND lease_until < ?) ORDER BY queued_at LIMIT ?",
+                (now, self.settings["max_requests"])
+            ).fetchall()
+            if not rows:
+                return []
+            due = (force or len(rows) >= self.settings["max_requests"]
+                   or now - min(row[2] for row in rows) >= self.settings["max_wait_seconds"])
+            if not due:
+                return []
+            conn.executemany(
+                "UPDATE batch_requests SET state = 'submitting', owner = ?, lease_until = ?, updated_at = ? WHERE custom_id = ?",
+                [(self.owner, now + self.settings["lease_seconds"], now, row[0]) for row in rows]
+            )
+        return [(custom_id, body) for custom_id, body, _ in rows]
+
+    def _write_input_file(self, requests):
+        """Schreibt die Anfragen als JSONL-Eingabedatei der Batch-API und gibt Pfad und Inhalt zurück."""
+        lines = [json.dumps({"custom_id": custom_id, "method": "POST", "url": _ENDPOINT, "body": json.loads(body)},
+                            ensure_ascii=False) for custom_id, body in requests]
+        data = ("\n".join(lines) + "\n").encode("utf-8")
+        os.makedirs(self.settings["directory"], exist_ok=True)
+        path = os.path.join(self.settings["directory"], f"batch-{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}-{len(requests)}.jsonl")
+        with open(path, "wb") as f:
+            f.write(data)
+        return path, data
+
+    async def submit_due(self, client, force=False):
+        """
+        Reicht fällige Anfragen als neue Batches ein (je höchstens max_requests Anfragen).
+
+        Args:
+            client: AsyncOpenAI-Client
+            force: True = auch einen unvollständigen Batch sofort einreichen (Ende eines Laufs)
+
+        Returns:
+            list: IDs der angelegten Batches
+        """
+        batch_ids = []
+        while True:
+            requests = self._claim_queued(force)
+            if not requests:
+                return batch_ids
+            batch_ids.append(await self._submit(client, requests))
+
+    async def _submit(self, client, requests):
+        """Lädt die beanspruchten Anfragen hoch, legt den Batch an und trägt ihn ein."""
+        started = time.perf_counter()
+        try:
+            path, data = self._write_input_file(requests)
+            uploaded = await client.files.create(file=(os.path.basename(path), data), purpose="batch")
+            batch = await client.batches.create(
+                input_file_id=uploaded.id, endpoint=_ENDPOINT, completion_window=self.settings["completion_window"],
+                metadata={"source": "xnewsagent", "requests": str(len(requests))}
+            )
+        except Exception:
+            # Anfragen für den nächsten Versuch freigeben
+            self.store.execute(
+                f"UPDATE batch_requests SET state = 'queued', owner = NULL, lease_until = NULL "
+                f"WHERE state = 'submitting' AND owner = ? AND custom_id IN ({','.join('?' * len(requests))})",
+                (self.owner, *(custom_id for custom_id, _ in requests))
+            )
+            get_metrics().record("batch", "failure", started, "submit")
+            raise
+        now = time.time()
+        with self.store.transaction() as conn:
+            conn.execute(
+                "INSERT INTO batch_jobs (batch_id, input_file_id, local_file, status, requests, submitted_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (batch.id, uploaded.id, path, batch.status, len(requests), now)
+            )
+            conn.executemany(
+                "UPDATE batch_requests SET state = 'submitted', batch_id = ?, attempts = attempts + 1, owner = NULL, "
+                "lease_until = NULL, updated_at = ? WHERE custom_id = ? AND state = 'submitting' AND owner = ?",
+                [(batch.id, now, custom_id, self.owner) for custom_id, _ in requests]
+            )
+        get_metrics().record("batch", "success", started, "submit")
+        print(f"Batch {batch.id} mit {len(requests)} Zusammenfassungen eingereicht")
+        return batch.id
+
+    def _claim_jobs(self):
+        """Beansprucht laufende Batches, deren letzte Abfrage länger als poll_interval_seconds zurückliegt."""
+        now = time.time()
+        placeholders = ",".join("?" * len(_FINAL_STATUSES))
+        with self.store.transaction() as conn:
+            rows = conn.execute(
+                f"SELECT batch_id FROM batch_jobs WHERE finished_at IS NULL AND status NOT IN ({placeholders}) "
+                "AND (checked_at IS NULL OR checked_at <= ?) AND (lease_until IS NULL OR lease_until < ? OR owner = ?)",
+                (*_FINAL_STATUSES, now - self.settings["poll_interval_seconds"], now, self.owner)
+            ).fetchall()
+            conn.executemany(
+                "UPDATE batch_jobs SET owner = ?, lease_until = ? WHERE batch_id = ?",
+                [(self.owner, now + self.settings["lease_seconds"], row[0]) for row in rows]
+            )
+        return [row[0] for row in rows]
+
+    async def _read_results(self, client, file_id):
+        """Liest eine Ausgabe- oder Fehlerdatei: custom_id -> (Antwort oder None, Fehlermeldung oder None)."""
+        results = {}
+        if not file_id:
+            return results
+        content = await client.files.content(file_id)
+        for line in content.text.splitlines():
+            if not line.strip():
+                continue
+            item = json.loads(line)
+            response = item.get("response") or {}
+            if response.get("status_code") == 200 and response.get("body"):
+                results[item["custom_id"]] = (response["body"], None)
+            else:
+                error = item.get("error") or (response.get("body") or {}).get("error") or {}
+                message = error.get("message") if isinstance(error, dict) else str(error)
+                results[item["custom_id"]] = (None, message or f"HTTP {response.get('status_code')}")
+        return results
+
+    async def poll(self, client):
+        """
+        Fragt laufende Batches ab und übernimmt die Ergebnisse abgeschlossener Batches.
+
+        Returns:
+            int: Anzahl der übernommenen Antworten
+        """
+        received = 0
+        for batch_id in self._claim_jobs():
+            started = time.perf_counter()
+            try:
+                batch = await client.batches.retrieve(batch_id)
+                now = time.time()
+                if batch.status not in _FINAL_STATUSES:
+                    self.store.execute(
+                        "UPDATE batch_jobs SET status = ?, checked_at = ?, owner = NULL, lease_until = NULL WHERE batch_id = ?",
+                        (batch.status, now, batch_id)
+                    )
+                    continue
+                # Auch abgelaufene oder abgebrochene Batches können Teilergebnisse enthalten
+                results = await self._read_results(client, batch.output_file_id)
+                results.update(await self._read_results(client, batch.error_file_id))
+                received += self._store_results(batch_id, batch.status, results)
+                get_metrics().record("batch", "success" if batch.status == "completed" else "fallback", started, "poll")
+                print(f"Batch {batch_id} beendet ({batch.status}): {len(results)} Antworten")
+            except Exception as e:
+                print(f"Fehler beim Abfragen von Batch {batch_id}: {e}")
+                self.store.execute(
+                    "UPDATE batch_jobs SET checked_at = ?, owner = NULL, lease_until = NULL WHERE batch_id = ?",
+                    (time.time(), batch_id)
+                )
+                get_metrics().record("batch", "failure", started, "poll")
+        return received
+
+    def _store_results(self, batch_id, status, results):
+        """Trägt die Antworten ein und reiht unbeantwortete Anfragen erneut ein (in einer Transaktion)."""
+        now = time.time()
+        local_file = None
+        with self.store.transaction() as conn:
+            for custom_id, (response, error) in results.items():
+                conn.execute(
+                    "UPDATE batch_requests SET state = ?, response = ?, error = ?, updated_at = ? "
+                    "WHERE custom_id = ? AND batch_id = ? AND state = 'submitted'",
+                    ("done" if response else "failed", json.dumps(response) if response else None, error,
+                     now, custom_id, batch_id)
+                )
+            # Anfragen ohne Antwort (Batch fehlgeschlagen oder abgelaufen)
+            conn.execute(
+                "UPDATE batch_requests SET state = 'queued', batch_id = NULL, updated_at = ? "
+                "WHERE batch_id = ? AND state = 'submitted' AND attempts < ?",
+                (now, batch_id, self.settings["max_attempts"])
+            )
+            conn.execute(
+                "UPDATE batch_requests SET state = 'failed', error = ?, updated_at = ? WHERE batch_id = ? AND state = 'submitted'",
+                (f"Batch {status}", now, batch_id)
+            )
+            row = conn.execute("SELECT local_file FROM batch_jobs WHERE batch_id = ?", (batch_id,)).fetchone()
+            local_file = row[0] if row else None
+            conn.execute(
+                "UPDATE batch_jobs SET status = ?, checked_at = ?, finished_at = ?, owner = NULL, lease_until = NULL "
+                "WHERE batch_id = ?",
+                (status, now, now, batch_id)
+            )
+        if local_file and not self.settings["keep_files"]:
+            try:
+                os.remove(local_file)
+            except OSError:
+                pass
+        return sum(1 for response, _ in results.values() if response)
+
+    def claim_results(self, limit=None):
+        """
+        Beansprucht fertige Anfragen (mit Antwort oder endgültig fehlgeschlagen) zum Senden.
+
+        Returns:
+            list: Dictionaries mit custom_id, tweet, account, instruction, body, max_chars, cache_key,
+                  response (Chat Completion als dict oder None), error und send_attempts
+        """
+        now = time.time()
+        columns = ("custom_id", "tweet", "account", "instruction", "body", "max_chars", "cache_key", "response", "error",
+                   "send_attempts")
+        with self.store.transaction() as conn:
+            rows = conn.execute(
+                f"SELECT {', '.join(columns)} FROM batch_requests "
+                "WHERE state IN ('done', 'failed') OR (state = 'posting' AND lease_until < ?) ORDER BY queued_at LIMIT ?",
+                (now, limit or -1)
+            ).fetchall()
+            conn.executemany(
+                "UPDATE batch_requests SET state = 'posting', owner = ?, lease_until = ?, updated_at = ? WHERE custom_id = ?",
+                [(self.owner, now + self.settings["lease_seconds"], now, row[0]) for row in rows]
+            )
+        claimed = []
+        for row in rows:
+            item = dict(zip(columns, row))
+            for field in ("tweet", "account", "body", "response"):
+                item[field] = json.loads(item[field]) if item[field] else None
+            claimed.append(item)
+        return claimed
+
+    def finish(self, custom_id, sent):
+        """
+        Schließt eine beanspruchte Anfrage ab. Ist der Versand gescheitert, wird sie für einen neuen
+        Versuch freigegeben (done, bzw. failed ohne Antwort) und nach max_send_attempts verworfen.
+
+        Returns:
+            str: Neuer Zustand der Anfrage oder None, wenn sie owner nicht mehr gehört
+        """
+        with self.store.transaction() as conn:
+            row = conn.execute(
+                "SELECT send_attempts, response IS NOT NULL FROM batch_requests "
+                "WHERE custom_id = ? AND state = 'posting' AND owner = ?",
+                (custom_id, self.owner)
+            ).fetchone()
+            if not row:
+                return None
+            send_attempts = row[0] + (0 if sent else 1)
+            if sent:
+                state = "posted"
+            elif send_attempts < self.settings["max_send_attempts"]:
+                state = "done" if row[1] else "failed"
+            else:
+                state = "dropped"
+            conn.execute(
+                "UPDATE batch_requests SET state = ?, send_attempts = ?, owner = NULL, lease_until = NULL, updated_at = ? "
+                "WHERE custom_id = ?",
+                (state, send_attempts, time.time(), custom_id)
+            )
+        return state
+
+    def compact(self):
+        """Entfernt abgeschlossene Anfragen und Batches, die älter als retention_days sind."""
+        cutoff = time.time() - self.settings["retention_days"] * 86400
+        self.store.execute("DELETE FROM batch_requests WHERE state IN ('posted', 'dropped') AND updated_at < ?", (cutoff,))
+        self.store.execute("DELETE FROM batch_jobs WHERE finished_at IS NOT NULL AND finished_at < ?", (cutoff,))
+
+
+_queue = None
+_queue_lock = threading.Lock()
+
+
+def get_batch_queue():
+    """Gibt die prozessweite Batch-Warteschlange zurück."""
+    global _queue
+    with _queue_lock:
+        if _queue is None:
+            _queue = BatchQueue()
+        return _queue
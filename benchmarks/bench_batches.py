@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Prüfung des Batch-Modus (BATCH_SUMMARY) mit einem Neustart zwischen Einreichen und Abholen.
+Startet die Stand-in-Dienste aus fake_services.py und nacheinander zwei Prozesse, die
+denselben State-Store in einem temporären Verzeichnis nutzen:
+
+1. Der erste Prozess verarbeitet alle Accounts mit run_pipeline_async, reiht die
+   Zusammenfassungen ein, reicht sie als Batch ein und endet, bevor der Batch fertig ist.
+2. Der zweite Prozess setzt die laufenden Batches aus dem State-Store fort
+   (run_batches_async mit wait=True) und sendet die Ergebnisse.
+
+Am Ende wird geprüft, dass jeder Tweet genau einmal an die Telegram-Attrappe gesendet wurde
+und Zusammenfassungen nur bei Einzelfehlern (--batch-error-ratio) oder nach abgelaufenen
+Batches (--batch-status expired) direkt angefordert wurden.
+
+Aufruf:
+    python benchmarks/bench_batches.py [--accounts 10] [--batch-latency 2] [--batch-error-ratio 0.1]
+"""
+
+import os
+import re
+import sys
+import zlib
+import argparse
+import tempfile
+import subprocess
+from types import SimpleNamespace
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fake_services import FakeNitter, FakeOpenAI, FakeTelegram  # noqa: E402
+
+_TWEET_URL = re.compile(r"/status/(\d+)")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--accounts", type=int, default=10, help="Anzahl der (erfundenen) Accounts")
+    parser.add_argument("--tweets-per-account", type=int, default=3, help="Tweets pro Account")
+    parser.add_argument("--max-requests", type=int, default=12, help="Anfragen pro Batch (BATCH_SUMMARY)")
+    parser.add_argument("--batch-latency", type=float, default=2.0, help="Sekunden bis ein Batch fertig ist")
+    parser.add_argument("--batch-status", default="completed", help="Endzustand der Batches (completed, expired, failed)")
+    parser.add_argument("--batch-error-ratio", type=float, default=0.0, help="Anteil der Einzelfehler in einem Batch")
+    parser.add_argument("--keep-logs", action="store_true", help="Ausgaben der Prozesse nach dem Lauf anzeigen")
+    # Interne Optionen für die Kindprozesse
+    parser.add_argument("--child", choices=["submit", "resume"], help=argparse.SUPPRESS)
+    parser.add_argument("--nitter-url", help=argparse.SUPPRESS)
+    parser.add_argument("--openai-url", help=argparse.SUPPRESS)
+    parser.add_argument("--telegram-url", help=argparse.SUPPRESS)
+    return parser.parse_args()
+
+
+def run_child(args):
+    """Kindprozess: main.py auf die Stand-ins umleiten und einreichen bzw. fortsetzen."""
+    import config
+    import main
+    from bench_pipeline import configure_main
+
+    services = SimpleNamespace(
+        nitter=SimpleNamespace(url=args.nitter_url),
+        openai=SimpleNamespace(base_url=args.openai_url),
+        telegram=SimpleNamespace(base_url=args.telegram_url),
+    )
+    settings = SimpleNamespace(tweets_per_account=args.tweets_per_account, no_images=True, telegram_limits=False)
+    configure_main(main, services.nitter, services.openai, services.telegram, settings)
+    config.BATCH_SUMMARY.update(enabled=True, accounts=["*"], max_requests=args.max_requests,
+                                max_wait_seconds=3600, poll_interval_seconds=0.5)
+
+    if args.child == "submit":
+        accounts = [{"username": f"bench_account_{i}", "model": "default", "instruction": "default"}
+                    for i in range(args.accounts)]
+        main.run_sync(main.run_pipeline_async(accounts))
+        # Rest einreichen und laufende Batches einmal abfragen, aber nicht auf sie warten
+        main.run_sync(main.run_batches_async(flush=True))
+        print(f"Zustände nach dem Einreichen: {main.get_batch_queue().counts()}")
+    else:
+        print(f"Zustände beim Start: {main.get_batch_queue().counts()}")
+        main.run_sync(main.run_batches_async(flush=True, wait=True))
+        print(f"Zustände am Ende: {main.get_batch_queue().counts()}")
+    main.run_sync(main.close_telegram_queue())
+    return 0
+
+
+def run_step(args, step, workdir, nitter, openai, telegram):
+    command = [sys.executable, os.path.abspath(__file__), "--child", step,
+               "--nitter-url", nitter.url, "--openai-url", openai.base_url, "--telegram-url", telegram.base_url,
+               "--accounts", str(args.accounts), "--tweets-per-account", str(args.tweets_per_account),
+               "--max-requests", str(args.max_requests)]
+    result = subprocess.run(command, cwd=workdir, capture_output=True, text=True)
+    return result.returncode, result.stdout + result.stderr
+
+
+def expected_tweet_ids(args):
+    """IDs aller Tweets, die FakeNitter(fresh=False) für die Bench-Accounts liefert."""
+    for i in range(args.accounts):
+        base = 1790000000000000000 + zlib.crc32(f"bench_account_{i}".encode("utf-8")) * 1000
+        for n in range(1, args.tweets_per_account + 1):
+            yield str(base + n)
+
+
+def main():
+    args = parse_args()
+    if args.child:
+        return run_child(args)
+
+    nitter = FakeNitter(0.01, 0.2, seed=1, tweets_per_page=args.tweets_per_account, media_ratio=1.0, fresh=False)
+    openai = FakeOpenAI(0.05, 0.2, seed=2, completion_words=30, batch_latency=args.batch_latency,
+                        batch_status=args.batch_status, batch_error_ratio=args.batch_error_ratio)
+    telegram = FakeTelegram(0.01, 0.2, seed=3)
+    logs = {}
+    try:
+        with tempfile.TemporaryDirectory() as workdir:
+            for step in ("submit", "resume"):
+                code, logs[step] = run_step(args, step, workdir, nitter, openai, telegram)
+                posted_so_far = len(telegram.messages)
+                print(f"{step}: Exit {code}, bisher {posted_so_far} Posts")
+                if code:
+                    print(logs[step][-3000:])
+                    return 1
+                if step == "submit":
+                    print(f"  OpenAI nach dem Einreichen: {dict(sorted(openai.calls.items()))}")
+    finally:
+        for service in (nitter, openai, telegram):
+            service.close()
+
+    posted = {}
+    for _, body, _ in telegram.messages:
+        match = _TWEET_URL.search(body)
+        if match:
+            posted[match.group(1)] = posted.get(match.group(1), 0) + 1
+    expected = set(expected_tweet_ids(args))
+    missing = sorted(expected - set(posted))
+    duplicates = {tweet_id: count for tweet_id, count in posted.items() if count > 1}
+    direct = openai.calls.get("chat.completions", 0)
+
+    print(f"OpenAI gesamt: {dict(sorted(openai.calls.items()))}")
+    print(f"Gesendet: {sum(posted.values())} Posts, {len(posted)} verschiedene Tweets von {len(expected)} erwarteten, "
+          f"{direct} Zusammenfassungen direkt angefordert")
+    ok = True
+    if missing:
+        print(f"FEHLER: {len(missing)} Tweets nicht gesendet: {', '.join(missing[:5])}")
+        ok = False
+    if duplicates:
+        print(f"FEHLER: {len(duplicates)} Tweets mehrfach gesendet: {dict(list(duplicates.items())[:5])}")
+        ok = False
+    if direct and not args.batch_error_ratio and args.batch_status == "completed":
+        print("FEHLER: Zusammenfassungen außerhalb der Batches angefordert")
+        ok = False
+    if args.keep_logs or not ok:
+        for step, text in logs.items():
+            print(f"\n===== {step} =====\n{text[-5000:]}")
+    if ok:
+        print("OK: jeder Tweet genau einmal gesendet, laufende Batches nach dem Neustart fortgesetzt")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
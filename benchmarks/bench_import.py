@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Startzeit-Benchmark: misst, wie lange `import main` in einem frischen Interpreter dauert,
+und prüft, dass der Import keine Nebenwirkungen hat (keine Ausgabe, kein erzeugter Client,
+keine geladene Client-Bibliothek wie openai, telegram oder twscrape).
+
+Jede Messung läuft in einem eigenen Prozess mit `python -X importtime`; ausgegeben werden
+Median und Maximum sowie die Module mit dem größten Anteil an der Importzeit.
+Mit --max-seconds schlägt der Benchmark fehl (Exit-Code 1), wenn der Median darüber liegt.
+
+Aufruf:
+    python benchmarks/bench_import.py [--runs 5] [--module main] [--max-seconds 0.5]
+"""
+
+import os
+import sys
+import json
+import argparse
+import statistics
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Bibliotheken, die erst bei der ersten Verwendung eines Clients geladen werden sollen
+LAZY_LIBRARIES = ("openai", "telegram", "twscrape", "httpx", "dotenv", "PIL", "tiktoken")
+
+PROBE = """
+import sys, time, json
+started = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - started
+import clients
+print(json.dumps({{
+    "seconds": elapsed,
+    "clients": clients.created_clients(),
+    "libraries": sorted(name for name in {libraries!r} if name in sys.modules),
+}}))
+"""
+
+
+def measure_once(module):
+    """Importiert das Modul in einem frischen Interpreter und gibt Messwerte und importtime-Ausgabe zurück."""
+    code = PROBE.format(module=module, libraries=LAZY_LIBRARIES)
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", code],
+                            cwd=ROOT, capture_output=True, text=True, check=True)
+    lines = result.stdout.strip().splitlines()
+    probe = json.loads(lines[-1])
+    # Alles vor der Messzeile hat der Import selbst ausgegeben
+    probe["output"] = lines[:-1]
+    return probe, result.stderr
+
+
+def slowest_modules(importtime_log, module, limit):
+    """Liest die -X-importtime-Ausgabe und gibt die direkten Importe des Moduls mit der größten kumulierten Zeit zurück."""
+    children = []
+    for line in importtime_log.splitlines():
+        if not line.startswith("import time:") or line.count("|") != 2:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        if not cumulative.strip().isdigit():
+            continue
+        name = name[1:]
+        depth = (len(name) - len(name.lstrip())) // 2
+        # Untermodule stehen vor dem Modul, das sie importiert
+        if depth == 1:
+            children.append((int(cumulative) / 1e6, name.strip()))
+        elif depth == 0:
+            if name == module:
+                return sorted(children, reverse=True)[:limit]
+            children = []
+    return []
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5, help="Anzahl der Messungen (je ein neuer Prozess)")
+    parser.add_argument("--module", default="main", help="Zu importierendes Modul")
+    parser.add_argument("--top", type=int, default=10, help="Anzahl der langsamsten Importe in der Ausgabe")
+    parser.add_argument("--max-seconds", type=float, help="Obergrenze für den Median der Importzeit")
+    args = parser.parse_args()
+
+    # Einmal vorab importieren, damit .pyc-Dateien existieren und nicht mitgemessen werden
+    measure_once(args.module)
+    runs = [measure_once(args.module) for _ in range(args.runs)]
+    seconds = [probe["seconds"] for probe, _ in runs]
+    probe, importtime_log = runs[-1]
+
+    median = statistics.median(seconds)
+    print(f"import {args.module}: Median {median * 1000:.1f} ms, max. {max(seconds) * 1000:.1f} ms ({args.runs} Läufe)")
+    print(f"\n{'Import':<28} {'kumuliert (ms)':>15}")
+    for cumulative, name in slowest_modules(importtime_log, args.module, args.top):
+        print(f"{name:<28} {cumulative * 1000:>15.1f}")
+
+    problems = []
+    if probe["output"]:
+        problems.append(f"Ausgabe beim Import: {probe['output'][0]!r} ({len(probe['output'])} Zeilen)")
+    if probe["clients"]:
+        problems.append(f"Beim Import erzeugte Clients: {', '.join(probe['clients'])}")
+    if probe["libraries"]:
+        problems.append(f"Beim Import geladene Client-Bibliotheken: {', '.join(probe['libraries'])}")
+    if args.max_seconds is not None and median > args.max_seconds:
+        problems.append(f"Median {median:.3f}s über der Grenze von {args.max_seconds:.3f}s")
+
+    print()
+    for problem in problems:
+        print(f"FEHLER: {problem}")
+    if not problems:
+        print("OK: Import ohne Nebenwirkungen")
+    return 1 if problems else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
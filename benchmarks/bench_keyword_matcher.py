@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Micro-Benchmark und Äquivalenzprüfung für den kompilierten Keyword-Matcher.
+Vergleicht die bisherige Teilstring-Suche pro Keyword mit KeywordMatcher.count und
+KeywordMatcher.count_batch, zuerst mit den Kategorien aus TONALITY_SCALE, dann mit
+wachsenden synthetischen Keyword-Listen.
+
+Aufruf:
+    python benchmarks/bench_keyword_matcher.py [--tweets 2000] [--repeat 3]
+"""
+
+import os
+import re
+import sys
+import time
+import random
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import TONALITY_SCALE  # noqa: E402
+from keyword_matcher import KeywordMatcher  # noqa: E402
+
+FILLER = ("der die das und heute morgen wieder neue zahlen zeigen dass wir mehr brauchen "
+          "warum sagt niemand etwas dazu thread lesen lohnt sich kirche kaiser autobahn").split()
+
+
+def naive_count(categories, text, word_boundary=False):
+    """Bisheriges Verfahren: eine Suche pro Keyword und Kategorie."""
+    text_lower = text.lower()
+    counts = {}
+    for category, keywords in categories.items():
+        matches = 0
+        for keyword in keywords:
+            if word_boundary:
+                if re.search(r"(?<!\w)" + re.escape(keyword.lower()) + r"(?!\w)", text_lower):
+                    matches += 1
+            elif keyword.lower() in text_lower:
+                matches += 1
+        if matches > 0:
+            counts[category] = matches
+    return counts
+
+
+def synthetic_categories(size, rng):
+    """Erzeugt size zufällige Keywords, verteilt auf 10 Kategorien (mit gemeinsamen Präfixen)."""
+    letters = "abcdefghijklmnopqrstuvwxyzäöü"
+    keywords = set()
+    while len(keywords) < size:
+        base = "".join(rng.choice(letters) for _ in range(rng.randint(3, 9)))
+        keywords.add(base)
+        if rng.random() < 0.2:
+            keywords.add(base + rng.choice(["ung", "en", " state"]))
+    keywords = sorted(keywords)[:size]
+    return {f"kategorie_{i}": keywords[i::10] for i in range(10)}
+
+
+def make_tweets(categories, count, rng):
+    keywords = [k for words in categories.values() for k in words]
+    tweets = []
+    for _ in range(count):
+        words = [rng.choice(FILLER) for _ in range(rng.randint(10, 40))]
+        for _ in range(rng.randint(0, 4)):
+            keyword = rng.choice(keywords)
+            # Keywords auch als Wortteil und in Großschreibung einstreuen
+            words.insert(rng.randrange(len(words) + 1), rng.choice([keyword, keyword.upper(), keyword + "s", "x" + keyword]))
+        tweets.append(" ".join(words))
+    return tweets
+
+
+def check_equivalence(categories, tweets, label):
+    for word_boundary in (False, True):
+        matcher = KeywordMatcher(categories, word_boundary=word_boundary)
+        expected = [naive_count(categories, tweet, word_boundary) for tweet in tweets]
+        single = [matcher.count(tweet) for tweet in tweets]
+        batch = matcher.count_batch(tweets)
+        for i, tweet in enumerate(tweets):
+            if not (expected[i] == single[i] == batch[i]):
+                print(f"Abweichung ({label}, word_boundary={word_boundary}) bei: {tweet}\n"
+                      f"  naiv:  {expected[i]}\n  count: {single[i]}\n  batch: {batch[i]}")
+                return False
+    print(f"{label}: naive Suche, count und count_batch identisch ({len(tweets)} Tweets, mit/ohne Wortgrenzen)")
+    return True
+
+
+def best_of(func, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return min(timings) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tweets", type=int, default=2000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    rng = random.Random(42)
+
+    scenarios = [("TONALITY_SCALE", {c: d["keywords"] for c, d in TONALITY_SCALE["categories"].items()})]
+    for size in (100, 500, 2000):
+        scenarios.append((f"{size} Keywords", synthetic_categories(size, rng)))
+
+    corpora = []
+    for label, categories in scenarios:
+        tweets = make_tweets(categories, args.tweets, rng)
+        if not check_equivalence(categories, tweets[:300], label):
+            return 1
+        corpora.append((label, categories, tweets))
+
+    print(f"\n{'Keywords':<16} {'naiv (ms)':>10} {'count (ms)':>11} {'batch (ms)':>11} {'Faktor':>8}")
+    for label, categories, tweets in corpora:
+        matcher = KeywordMatcher(categories)
+        naive_ms = best_of(lambda: [naive_count(categories, t) for t in tweets], args.repeat)
+        count_ms = best_of(lambda: [matcher.count(t) for t in tweets], args.repeat)
+        batch_ms = best_of(lambda: matcher.count_batch(tweets), args.repeat)
+        print(f"{label:<16} {naive_ms:>10.1f} {count_ms:>11.1f} {batch_ms:>11.1f} {naive_ms / min(count_ms, batch_ms):>7.1f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
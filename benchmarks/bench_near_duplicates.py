@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Benchmark für den MinHash-LSH-Index der Beinahe-Duplikate.
+Füllt eine temporäre Datenbank mit synthetischen Tweets und misst
+  - Trefferquote für bearbeitete Varianten (Wort geändert, neue URL, Zusatz angehängt)
+  - Fehlalarme für unabhängige Tweets
+  - Abfragezeit des Index im Vergleich zum linearen Vergleich mit allen Signaturen
+
+Aufruf:
+    python benchmarks/bench_near_duplicates.py [--sizes 1000 4000 16000]
+"""
+
+import os
+import sys
+import time
+import random
+import struct
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from state_store import StateStore  # noqa: E402
+from near_duplicates import NearDuplicateIndex  # noqa: E402
+
+VOCABULARY = ("regierung partei wahl bundestag kanzler inflation aktien börse bitcoin krypto software "
+              "studie forschung analyse gesellschaft kultur bildung schule familie generation energie "
+              "preise heute morgen wieder warum niemand darüber spricht thread lesen wichtig neue zahlen "
+              "zeigen deutlich dass wir mehr brauchen weniger reden handeln jetzt endlich").split()
+
+
+def make_tweet(rng):
+    return " ".join(rng.choice(VOCABULARY) for _ in range(rng.randint(15, 35))) + f" https://t.co/{rng.randrange(10**8)}"
+
+
+def variants(text, rng):
+    words = text.split()
+    changed = list(words)
+    changed[rng.randrange(len(changed) - 1)] = rng.choice(VOCABULARY)
+    return {
+        "neue URL": " ".join(words[:-1]) + f" https://t.co/{rng.randrange(10**8)}",
+        "Wort geändert": " ".join(changed),
+        "Zusatz angehängt": text + " 👉 unbedingt teilen",
+        "Großschreibung/Satzzeichen": text.upper().replace(" ", ", ", 3),
+    }
+
+
+def linear_scan(index, signature):
+    """Vergleich mit allen gespeicherten Signaturen (ohne LSH) als Referenz."""
+    best = None
+    for tweet_hash, blob in index.store.execute("SELECT tweet_hash, signature FROM near_duplicate_signatures"):
+        similarity = index.similarity(signature, struct.unpack(f"<{index.num_perm}I", blob))
+        if similarity >= index.threshold and (best is None or similarity > best[1]):
+            best = (tweet_hash, similarity)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 4000, 16000])
+    parser.add_argument("--queries", type=int, default=200)
+    args = parser.parse_args()
+    rng = random.Random(3)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store = StateStore(os.path.join(tmp, "bench.db"), compaction_interval=0)
+        index = NearDuplicateIndex(store)
+        tweets = []
+
+        print(f"{'Index':>7} {'LSH (ms)':>9} {'linear (ms)':>12} {'Faktor':>8} {'Treffer':>9} {'Fehlalarme':>11}")
+        for size in sorted(args.sizes):
+            while len(tweets) < size:
+                text = make_tweet(rng)
+                index.add(f"t{len(tweets)}", text, tweet_id=len(tweets))
+                tweets.append(text)
+
+            originals = rng.sample(tweets, args.queries)
+            queries = [(variant, True) for text in originals for variant in variants(text, rng).values()]
+            queries += [(make_tweet(rng), False) for _ in range(args.queries)]
+            signatures = [index.signature(text) for text, _ in queries]
+
+            start = time.perf_counter()
+            results = [index.find_similar(text, signature) for (text, _), signature in zip(queries, signatures)]
+            lsh_ms = (time.perf_counter() - start) / len(queries) * 1000
+
+            sample = signatures[:20]
+            start = time.perf_counter()
+            for signature in sample:
+                linear_scan(index, signature)
+            linear_ms = (time.perf_counter() - start) / len(sample) * 1000
+
+            edited = [bool(result) for result, (_, is_variant) in zip(results, queries) if is_variant]
+            unrelated = [bool(result) for result, (_, is_variant) in zip(results, queries) if not is_variant]
+            print(f"{size:>7} {lsh_ms:>9.3f} {linear_ms:>12.3f} {linear_ms / lsh_ms:>7.1f}x "
+                  f"{sum(edited) / len(edited):>8.1%} {sum(unrelated) / len(unrelated):>10.1%}")
+
+        # Trefferquote je Art der Bearbeitung
+        print()
+        per_kind = {}
+        for text in rng.sample(tweets, args.queries):
+            for kind, variant in variants(text, rng).items():
+                per_kind.setdefault(kind, []).append(bool(index.find_similar(variant)))
+        for kind, hits in per_kind.items():
+            print(f"{kind:<28} {sum(hits) / len(hits):.1%} erkannt")
+        store.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
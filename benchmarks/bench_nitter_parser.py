@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Benchmark und Äquivalenzprüfung für die Nitter-Parser-Backends.
+Vergleicht den bisherigen BeautifulSoup-Extraktor mit dem lxml-Backend auf einer
+gespeicherten Timeline-Seite (fixtures/nitter_timeline.html oder --fixture).
+
+Aufruf:
+    python benchmarks/bench_nitter_parser.py [--fixture PFAD] [--repeat 50]
+"""
+
+import os
+import sys
+import time
+import argparse
+import contextlib
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from nitter_parser import etree, parse_nitter_timeline  # noqa: E402
+
+DEFAULT_FIXTURE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "nitter_timeline.html")
+BASE_URL = "https://nitter.example.org"
+
+
+def run_backend(backend, html, count, since_id=None):
+    # Die Erfolgsmeldung des Extraktors würde die Ausgabe überfluten
+    with contextlib.redirect_stdout(open(os.devnull, "w")):
+        return parse_nitter_timeline(html, "testuser", count, BASE_URL, backend=backend, since_id=since_id)
+
+
+def check_equivalence(html, counts, since_ids=(None,)):
+    """Prüft, dass beide Backends für alle Anzahlen (und High-Water-Marks) identische Tweets liefern."""
+    for count, since_id in ((c, s) for s in since_ids for c in counts):
+        expected = run_backend("bs4", html, count, since_id)
+        actual = run_backend("lxml", html, count, since_id)
+        if expected != actual:
+            for i, (a, b) in enumerate(zip(expected, actual)):
+                if a != b:
+                    print(f"Abweichung bei count={count}, Tweet {i}:\n  bs4:  {a}\n  lxml: {b}")
+                    break
+            else:
+                print(f"Abweichung bei count={count}: {len(expected)} vs. {len(actual)} Tweets")
+            return False
+        print(f"count={count:>3} since_id={since_id}: {len(actual)} Tweets, Backends identisch")
+    return True
+
+
+def check_retweets(html):
+    """
+    Prüft, dass ein Retweet (Link auf die ältere Status-ID des Originals) das Lesen bis zur
+    High-Water-Mark nicht vorzeitig beendet.
+
+    Returns:
+        bool: True, wenn beide Backends alle neueren Tweets nach dem Retweet liefern
+    """
+    tweets = run_backend("bs4", html, 1000)
+    position = next((i for i, t in enumerate(tweets) if "/testuser/" not in t.url), None)
+    if position is None:
+        print("Fixture enthält keinen Retweet eines anderen Accounts")
+        return False
+    # High-Water-Mark über der ID des Originals, mit eigenen Tweets zwischen Retweet und Marke
+    own = [t.id for t in tweets if "/testuser/" in t.url]
+    since_id = tweets[min(position + 4, len(tweets) - 1)].id
+    expected = [tweet_id for tweet_id in own if int(tweet_id) > int(since_id)]
+    for backend in ("bs4", "lxml"):
+        actual = [t.id for t in run_backend(backend, html, 100, since_id)]
+        if actual != expected:
+            print(f"Retweet beendet das Lesen vorzeitig ({backend}): {len(actual)} statt {len(expected)} Tweets")
+            return False
+    print(f"Retweet von {tweets[position].id} vor since_id={since_id}: {len(expected)} neuere Tweets in beiden Backends")
+    return True
+
+
+def bench(backend, html, count, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        run_backend(backend, html, count)
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--fixture", default=DEFAULT_FIXTURE)
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    if etree is None:
+        print("lxml ist nicht installiert - nur das BeautifulSoup-Backend ist verfügbar.")
+        return 1
+
+    with open(args.fixture, "r", encoding="utf-8") as f:
+        html = f.read()
+    print(f"Fixture: {args.fixture} ({len(html) / 1024:.1f} KiB)\n")
+
+    # Die zehnte Tweet-ID der Fixture dient als High-Water-Mark für den inkrementellen Fall
+    ids = [t.id for t in run_backend("bs4", html, 1000)]
+    if not check_equivalence(html, counts=[1, 3, 5, 10, 100], since_ids=(None, ids[min(9, len(ids) - 1)])):
+        return 1
+    if not check_retweets(html):
+        return 1
+
+    print(f"\n{'count':>6} {'bs4 (ms)':>10} {'lxml (ms)':>10} {'Faktor':>8}")
+    for count in (3, 10, 100):
+        bs4_ms = bench("bs4", html, count, args.repeat)
+        lxml_ms = bench("lxml", html, count, args.repeat)
+        print(f"{count:>6} {bs4_ms:>10.2f} {lxml_ms:>10.2f} {bs4_ms / lxml_ms:>7.1f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
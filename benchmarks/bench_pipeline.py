@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Offline-End-to-End-Benchmark der gesamten Pipeline (Abruf bis Telegram-Versand).
+Startet lokale Stand-in-Dienste (Nitter, OpenAI-kompatible API, Telegram Bot API, siehe
+fake_services.py), leitet main.py auf diese um und verarbeitet alle Accounts mit
+run_pipeline_async in einem temporären Arbeitsverzeichnis (eigener State-Store und Bild-Cache).
+
+Ausgegeben werden Tweets/s, p50/p95-Latenz pro Stufe (aus metrics.py) und API-Aufrufe pro
+gesendetem Tweet. Mit --json lässt sich das Ergebnis speichern und zwischen Commits vergleichen.
+
+Mit --replay wird statt der Nitter-Attrappe ein mit --record (hier oder in main.py) aufgezeichnetes
+Archiv über run_replay_async abgespielt, z.B. um einen echten Rückstau nachzustellen und die
+Stufen-Limits (PIPELINE_CONCURRENCY) abzustimmen.
+
+Aufruf:
+    python benchmarks/bench_pipeline.py [--accounts 20] [--openai-latency 0.3] [--json ergebnis.json]
+    python benchmarks/bench_pipeline.py --structured [--invalid-json-ratio 0.1]
+    python benchmarks/bench_pipeline.py --record tweets.jsonl.gz
+    python benchmarks/bench_pipeline.py --replay tweets.jsonl.gz [--replay-rate 50]
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import contextlib
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fake_services import FakeNitter, FakeOpenAI, FakeTelegram  # noqa: E402
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--accounts", type=int, default=20, help="Anzahl der (erfundenen) Accounts")
+    parser.add_argument("--tweets-per-account", type=int, default=3, help="Verarbeitete Tweets pro Account (MAX_TWEETS_PER_ACCOUNT)")
+    parser.add_argument("--media-ratio", type=float, default=0.5, help="Anteil der Tweets mit Bild (die übrigen lösen DALL-E aus)")
+    parser.add_argument("--image-size", default="640x480", help="Größe der Tweet-Bilder (BREITExHÖHE), z.B. 4000x3000 für die Anpassung an die Telegram-Limits")
+    parser.add_argument("--image-variants", type=int, default=0,
+                        help="Anzahl verschiedener Tweet-Bilder, die sich die Tweets teilen (0 = jedes Bild einzeln)")
+    parser.add_argument("--nitter-latency", type=float, default=0.05, help="Antwortzeit der Nitter-Instanz in Sekunden")
+    parser.add_argument("--openai-latency", type=float, default=0.3, help="Antwortzeit für Chat Completions in Sekunden")
+    parser.add_argument("--image-latency", type=float, default=1.0, help="Antwortzeit für die Bildgenerierung in Sekunden")
+    parser.add_argument("--telegram-latency", type=float, default=0.02, help="Antwortzeit der Telegram Bot API in Sekunden")
+    parser.add_argument("--jitter", type=float, default=0.2, help="Relative Streuung der Antwortzeiten (0.2 = ±20%%)")
+    parser.add_argument("--structured", action="store_true",
+                        help="Zusammenfassung, Stil und Bild-Prompt in einem JSON-Aufruf (STRUCTURED_SUMMARY)")
+    parser.add_argument("--invalid-json-ratio", type=float, default=0.0,
+                        help="Anteil ungültiger JSON-Antworten der OpenAI-Attrappe (prüft den Rückfall mit --structured)")
+    parser.add_argument("--no-images", action="store_true", help="DALL-E-Bildgenerierung abschalten")
+    parser.add_argument("--telegram-limits", action="store_true",
+                        help="Echte Telegram-Sendelimits verwenden (Standard: aufgehoben, damit die Pipeline gemessen wird)")
+    parser.add_argument("--record", metavar="ARCHIV", help="Abgerufene Tweets in diesem Archiv aufzeichnen")
+    parser.add_argument("--replay", metavar="ARCHIV", help="Archiv abspielen statt Nitter abzufragen")
+    parser.add_argument("--replay-rate", type=float, help="Wiedergabe mit dieser Rate (Tweets pro Sekunde)")
+    parser.add_argument("--replay-speed", type=float, help="Wiedergabe in den ursprünglichen Abständen, beschleunigt um diesen Faktor")
+    parser.add_argument("--json", help="Ergebnis zusätzlich als JSON in diese Datei schreiben")
+    parser.add_argument("--verbose", action="store_true", help="Ausgaben der Pipeline nicht unterdrücken")
+    return parser.parse_args()
+
+
+def configure_main(main, nitter, openai, telegram, args):
+    """Leitet main.py auf die Stand-in-Dienste um; Änderungen gelten nur für diesen Prozess."""
+    import config
+    from clients import load_environment
+
+    # Erst die .env-Datei laden (sie hat Vorrang), dann die Werte für die Stand-ins setzen
+    load_environment()
+    os.environ["OPENAI_BASE_URL"] = openai.base_url
+    os.environ["OPENAI_API_KEY"] = "sk-benchmark"
+    os.environ["TELEGRAM_BOT_TOKEN"] = "123456:benchmark"
+    os.environ["TELEGRAM_CHANNEL_ID"] = "@benchmark"
+    # Ohne Zugangsdaten überspringt die Pipeline twscrape und fragt direkt Nitter ab
+    for name in ("TWITTER_USERNAME", "TWITTER_PASSWORD", "TWITTER_EMAIL", "TWITTER_EMAIL_PASSWORD"):
+        os.environ[name] = ""
+
+    main.NITTER_INSTANCES = [nitter.url]
+    main.MAX_TWEETS_PER_ACCOUNT = args.tweets_per_account
+    main.DISABLE_IMAGE_GENERATION = args.no_images
+    config.STRUCTURED_SUMMARY["enabled"] = getattr(args, "structured", False)
+    config.TELEGRAM_CLIENT.update(base_url=telegram.base_url,
+                                  connection_pool_size=config.PIPELINE_CONCURRENCY.get("send") or 8)
+
+    if not args.telegram_limits:
+        config.TELEGRAM_SEND.update(per_chat_messages_per_minute=1e9, per_chat_burst=1e9,
+                                    global_messages_per_second=1e9, global_burst=1e9)
+
+
+def run(args):
+    import main
+    # Client-Bibliotheken laden main.py und clients.py erst beim ersten Aufruf; vorab importiert,
+    # damit ihr einmaliger Import nicht in die gemessenen Stufenlatenzen eingeht
+    import openai  # noqa: F401
+    import telegram  # noqa: F401
+    from metrics import get_metrics
+    from telegram_queue import close_telegram_queue
+    from tweet_archive import get_tweet_archive, close_tweet_archive
+
+    nitter = FakeNitter(args.nitter_latency, args.jitter, seed=1,
+                        tweets_per_page=max(5, args.tweets_per_account), media_ratio=args.media_ratio,
+                        image_size=tuple(int(side) for side in args.image_size.lower().split("x")),
+                        image_variants=args.image_variants)
+    openai = FakeOpenAI(args.openai_latency, args.jitter, seed=2, image_latency=args.image_latency,
+                        invalid_json_ratio=args.invalid_json_ratio)
+    telegram = FakeTelegram(args.telegram_latency, args.jitter, seed=3)
+    try:
+        configure_main(main, nitter, openai, telegram, args)
+        accounts = [{"username": f"bench_account_{i}", "model": "default", "instruction": "default"}
+                    for i in range(args.accounts)]
+
+        output = contextlib.nullcontext() if args.verbose else contextlib.redirect_stdout(open(os.devnull, "w"))
+        if args.record:
+            get_tweet_archive(args.record)
+        with output:
+            started = time.perf_counter()
+            if args.replay:
+                sent = main.run_sync(main.run_replay_async([], args.replay, args.replay_rate, args.replay_speed))
+            else:
+                sent = main.run_sync(main.run_pipeline_async(accounts))
+            queue_stats = main.run_sync(close_telegram_queue())
+            elapsed = time.perf_counter() - started
+        close_tweet_archive()
+    finally:
+        for service in (nitter, openai, telegram):
+            service.close()
+
+    calls = {
+        "nitter": dict(nitter.calls),
+        "openai": dict(openai.calls),
+        "telegram": dict(telegram.calls),
+    }
+    total_calls = sum(count for service in calls.values() for count in service.values())
+    summary = get_metrics().summary()
+    return {
+        "settings": {key: value for key, value in vars(args).items() if key not in ("json", "verbose")},
+        "sent": sent,
+        "elapsed_seconds": round(elapsed, 3),
+        "tweets_per_second": round(sent / elapsed, 3) if elapsed else None,
+        "api_calls": calls,
+        "api_calls_per_sent_tweet": round(total_calls / sent, 3) if sent else None,
+        "telegram_queue": queue_stats,
+        "stages": summary["stages"],
+        "tokens": summary["tokens"],
+    }
+
+
+def print_report(result):
+    print(f"Gesendet: {result['sent']} Tweets in {result['elapsed_seconds']:.2f}s "
+          f"= {result['tweets_per_second']} Tweets/s\n")
+
+    print(f"{'Stufe':<13} {'Quelle':<22} {'Aufrufe':>8} {'p50 (ms)':>9} {'p95 (ms)':>9}  Ergebnisse")
+    for stage, sources in result["stages"].items():
+        for source, values in sources.items():
+            p50 = f"{values['p50_seconds'] * 1000:.1f}" if values["p50_seconds"] is not None else "-"
+            p95 = f"{values['p95_seconds'] * 1000:.1f}" if values["p95_seconds"] is not None else "-"
+            outcomes = ", ".join(f"{outcome} {count}" for outcome, count in values["outcomes"].items())
+            print(f"{stage:<13} {source:<22} {values['calls']:>8} {p50:>9} {p95:>9}  {outcomes}")
+
+    sent = result["sent"] or 0
+    print(f"\n{'API-Aufrufe':<34} {'gesamt':>7} {'pro Tweet':>10}")
+    for service, endpoints in result["api_calls"].items():
+        for endpoint, count in sorted(endpoints.items()):
+            per_tweet = f"{count / sent:.2f}" if sent else "-"
+            print(f"{service + ' ' + endpoint:<34} {count:>7} {per_tweet:>10}")
+    print(f"{'Summe':<34} {sum(sum(e.values()) for e in result['api_calls'].values()):>7} "
+          f"{result['api_calls_per_sent_tweet'] if result['api_calls_per_sent_tweet'] is not None else '-':>10}")
+
+    if result["tokens"]:
+        print(f"\n{'Tokens':<34} {'Prompt':>9} {'Antwort':>9} {'pro Tweet':>10}")
+        for stage, models in result["tokens"].items():
+            for model, values in models.items():
+                total = values["prompt"] + values["completion"]
+                per_tweet = f"{total / sent:.1f}" if sent else "-"
+                print(f"{stage + ' ' + model:<34} {values['prompt']:>9} {values['completion']:>9} {per_tweet:>10}")
+
+
+def main():
+    args = parse_args()
+    for name in ("record", "replay", "json"):
+        if getattr(args, name):
+            setattr(args, name, os.path.abspath(getattr(args, name)))
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as workdir:
+        # State-Store, Bild-Cache und Metrik-Dateien landen im temporären Verzeichnis
+        os.chdir(workdir)
+        try:
+            result = run(args)
+        finally:
+            os.chdir(cwd)
+    print_report(result)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+        print(f"\nErgebnis gespeichert: {args.json}")
+    return 0 if result["sent"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Benchmark und Äquivalenzprüfung für die vektorisierte Qualitätsbewertung.
+Vergleicht evaluate_tweet_quality (ein Tweet pro Aufruf) mit evaluate_tweet_quality_batch
+auf zufällig erzeugten Tweets, deren Engagement-Werte gezielt die Schwellenwerte treffen.
+Scores müssen bitgenau und Begründungen wörtlich übereinstimmen.
+
+Aufruf:
+    python benchmarks/bench_quality_scoring.py [--repeat 5]
+"""
+
+import os
+import sys
+import time
+import random
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tweet_quality import (  # noqa: E402
+    QUALITY_KEYWORDS, evaluate_tweet_quality, evaluate_tweet_quality_batch, quality_features, score_quality_features, np
+)
+from tweet_record import Tweet  # noqa: E402
+
+WORDS = "die neue regierung plant heute wieder etwas warum sagt das niemand thread lesen".split()
+# Werte um die Schwellen der Bewertung herum (auch für das Gesamtengagement)
+LIKE_VALUES = [0, 5, 19, 20, 21, 99, 100, 101, 5000]
+RETWEET_VALUES = [0, 9, 10, 11, 49, 50, 51, 800]
+REPLY_VALUES = [0, 4, 5, 6, 19, 20, 21, 300]
+QUOTE_VALUES = [0, 1, 60, 199, 200, 4000]
+
+
+def make_tweets(count, rng):
+    tweets = []
+    for i in range(count):
+        words = [rng.choice(WORDS) for _ in range(rng.randint(0, 45))]
+        if rng.random() < 0.3:
+            words.insert(rng.randrange(len(words) + 1), rng.choice(QUALITY_KEYWORDS).upper())
+        text = " ".join(words)
+        if rng.random() < 0.1:
+            text = "https://t.co/abc " + text
+        if rng.random() < 0.1:
+            text += " " + " ".join(f"#tag{n}" for n in range(rng.randint(3, 9)))
+        if rng.random() < 0.2:
+            text += "?"
+        tweets.append(Tweet(
+            id=str(i), text=text,
+            likes=rng.choice(LIKE_VALUES), retweets=rng.choice(RETWEET_VALUES),
+            replies=rng.choice(REPLY_VALUES), quotes=rng.choice(QUOTE_VALUES),
+        ))
+    return tweets
+
+
+def check_equivalence(tweets):
+    scores, reasons = evaluate_tweet_quality_batch(tweets, with_reasons=True)
+    for i, tweet in enumerate(tweets):
+        expected_score, expected_reason = evaluate_tweet_quality(tweet.text, tweet)
+        if float(scores[i]) != expected_score or reasons[i] != expected_reason:
+            print(f"Abweichung bei Tweet {i}: {tweet}\n"
+                  f"  skalar: {expected_score!r} {expected_reason!r}\n  batch:  {float(scores[i])!r} {reasons[i]!r}")
+            return False
+    print(f"{len(tweets)} Tweets: Scores bitgenau und Begründungen identisch")
+    return True
+
+
+def best_of(func, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return min(timings) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    if np is None:
+        print("NumPy ist nicht installiert - die Batch-Bewertung fällt auf die Einzelbewertung zurück.")
+        return 1
+
+    rng = random.Random(7)
+    if not check_equivalence(make_tweets(5000, rng)):
+        return 1
+
+    # "nur Score": Merkmale liegen bereits als Arrays vor
+    print(f"\n{'Tweets':>7} {'skalar (ms)':>12} {'batch (ms)':>11} {'+Gründe (ms)':>13} {'nur Score (ms)':>15} {'Faktor':>8}")
+    for count in (100, 1000, 10000):
+        tweets = make_tweets(count, rng)
+        scalar_ms = best_of(lambda: [evaluate_tweet_quality(t.text, t) for t in tweets], args.repeat)
+        batch_ms = best_of(lambda: evaluate_tweet_quality_batch(tweets), args.repeat)
+        reasons_ms = best_of(lambda: evaluate_tweet_quality_batch(tweets, with_reasons=True), args.repeat)
+        features = quality_features(tweets)
+        score_ms = best_of(lambda: score_quality_features(features), args.repeat)
+        print(f"{count:>7} {scalar_ms:>12.2f} {batch_ms:>11.2f} {reasons_ms:>13.2f} {score_ms:>15.2f} "
+              f"{scalar_ms / batch_ms:>7.1f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Prüfung und Benchmark des Worker-Modus (--mode worker) mit mehreren Prozessen.
+Startet die Stand-in-Dienste aus fake_services.py und mehrere Worker-Prozesse, die sich
+einen State-Store in einem temporären Verzeichnis teilen. Die Nitter-Attrappe liefert für
+jeden Account bei jedem Abruf dieselben Tweets, sodass doppelte Abrufe während einer
+Umverteilung sofort als doppelte Posts sichtbar würden.
+
+Während des Laufs wird ein Worker hart beendet (SIGKILL, --kill-after) und ein neuer
+gestartet (--join-after). Am Ende wird geprüft, dass jeder Tweet an die Telegram-Attrappe
+gesendet wurde und keiner doppelt; ausgenommen ist nur ein Tweet, den der beendete Worker
+gesendet, aber nicht mehr als verarbeitet eingetragen hat (Absturzfenster, wird gemeldet).
+Ausgegeben werden außerdem Abrufe und Umverteilungen pro Worker.
+
+Aufruf:
+    python benchmarks/bench_workers.py [--workers 3] [--accounts 30] [--duration 25]
+"""
+
+import os
+import re
+import sys
+import time
+import zlib
+import signal
+import argparse
+import tempfile
+import subprocess
+from types import SimpleNamespace
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fake_services import FakeNitter, FakeOpenAI, FakeTelegram  # noqa: E402
+
+_TWEET_URL = re.compile(r"/status/(\d+)")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=3, help="Anzahl der Worker beim Start")
+    parser.add_argument("--accounts", type=int, default=30, help="Anzahl der (erfundenen) Accounts")
+    parser.add_argument("--tweets-per-account", type=int, default=3, help="Tweets pro Account")
+    parser.add_argument("--duration", type=float, default=25.0, help="Laufzeit in Sekunden")
+    parser.add_argument("--kill-after", type=float, default=6.0, help="Nach so vielen Sekunden einen Worker mit SIGKILL beenden (0 = nie)")
+    parser.add_argument("--join-after", type=float, default=10.0, help="Nach so vielen Sekunden einen weiteren Worker starten (0 = nie)")
+    parser.add_argument("--openai-latency", type=float, default=0.2, help="Antwortzeit für Chat Completions in Sekunden")
+    parser.add_argument("--keep-logs", action="store_true", help="Ausgaben der Worker nach dem Lauf anzeigen")
+    # Interne Optionen für die Worker-Prozesse
+    parser.add_argument("--child", metavar="WORKER_ID", help=argparse.SUPPRESS)
+    parser.add_argument("--nitter-url", help=argparse.SUPPRESS)
+    parser.add_argument("--openai-url", help=argparse.SUPPRESS)
+    parser.add_argument("--telegram-url", help=argparse.SUPPRESS)
+    return parser.parse_args()
+
+
+def run_child(args):
+    """Worker-Prozess: main.py auf die Stand-ins umleiten und run_daemon_async mit einem WorkerShard ausführen."""
+    import config
+    import main
+    from bench_pipeline import configure_main
+    from sharding import WorkerShard
+
+    services = SimpleNamespace(
+        nitter=SimpleNamespace(url=args.nitter_url),
+        openai=SimpleNamespace(base_url=args.openai_url),
+        telegram=SimpleNamespace(base_url=args.telegram_url),
+    )
+    settings = SimpleNamespace(tweets_per_account=args.tweets_per_account, no_images=True, telegram_limits=False)
+    configure_main(main, services.nitter, services.openai, services.telegram, settings)
+    # Eigenes Bot-Token pro Worker, damit die Telegram-Attrappe jeden Post einem Worker zuordnen kann
+    os.environ["TELEGRAM_BOT_TOKEN"] = f"123456:{args.child}"
+
+    # Kurze Intervalle, damit Ausfälle und Umverteilungen in wenigen Sekunden sichtbar werden
+    config.SHARDING.update(worker_id=args.child, heartbeat_interval_seconds=0.5,
+                           worker_timeout_seconds=2.0, claim_lease_seconds=30)
+    config.POLL_SCHEDULE.update(min_interval_seconds=2, initial_interval_seconds=2,
+                                max_interval_seconds=4, idle_sleep_seconds=0.5, jitter=0.0)
+
+    accounts = [{"username": f"bench_account_{i}", "model": "default", "instruction": "default"}
+                for i in range(args.accounts)]
+    main.run_sync(main.run_daemon_async(accounts, accounts_file="accounts-none.txt", shard=WorkerShard()))
+    main.run_sync(main.close_telegram_queue())
+    return 0
+
+
+def start_worker(args, worker_id, workdir, nitter, openai, telegram):
+    log = open(os.path.join(workdir, f"{worker_id}.log"), "w", encoding="utf-8")
+    command = [sys.executable, os.path.abspath(__file__), "--child", worker_id,
+               "--nitter-url", nitter.url, "--openai-url", openai.base_url, "--telegram-url", telegram.base_url,
+               "--accounts", str(args.accounts), "--tweets-per-account", str(args.tweets_per_account)]
+    process = subprocess.Popen(command, cwd=workdir, stdout=log, stderr=subprocess.STDOUT)
+    return SimpleNamespace(worker_id=worker_id, process=process, log=log, killed=False)
+
+
+def expected_tweet_ids(args):
+    """IDs aller Tweets, die FakeNitter(fresh=False) für die Bench-Accounts liefert."""
+    for i in range(args.accounts):
+        base = 1790000000000000000 + zlib.crc32(f"bench_account_{i}".encode("utf-8")) * 1000
+        for n in range(1, args.tweets_per_account + 1):
+            yield str(base + n)
+
+
+def summarize_log(path):
+    with open(path, encoding="utf-8", errors="replace") as f:
+        text = f.read()
+    return {
+        "polls": len(re.findall(r"Account: bench_account_", text)),
+        "rebalances": len(re.findall(r"Neu verteilt auf", text)),
+        "claimed_elsewhere": len(re.findall(r"wird bereits von einem anderen Worker verarbeitet", text)),
+        "errors": len(re.findall(r"Traceback", text)),
+        "text": text,
+    }
+
+
+def run(args, workdir):
+    nitter = FakeNitter(0.02, 0.2, seed=1, tweets_per_page=args.tweets_per_account, media_ratio=1.0, fresh=False)
+    openai = FakeOpenAI(args.openai_latency, 0.2, seed=2, completion_words=30)
+    telegram = FakeTelegram(0.01, 0.2, seed=3)
+    workers = []
+    try:
+        for i in range(args.workers):
+            workers.append(start_worker(args, f"worker-{i + 1}", workdir, nitter, openai, telegram))
+        started = time.monotonic()
+        killed = joined = False
+        while time.monotonic() - started < args.duration:
+            elapsed = time.monotonic() - started
+            if args.kill_after and not killed and elapsed >= args.kill_after and workers:
+                victim = workers[0]
+                victim.process.send_signal(signal.SIGKILL)
+                victim.killed = killed = True
+                print(f"{elapsed:5.1f}s: {victim.worker_id} mit SIGKILL beendet")
+            if args.join_after and not joined and elapsed >= args.join_after:
+                workers.append(start_worker(args, f"worker-{len(workers) + 1}", workdir, nitter, openai, telegram))
+                joined = True
+                print(f"{elapsed:5.1f}s: {workers[-1].worker_id} gestartet")
+            time.sleep(0.2)
+
+        for worker in workers:
+            if worker.process.poll() is None:
+                worker.process.send_signal(signal.SIGTERM)
+        for worker in workers:
+            try:
+                worker.process.wait(timeout=30)
+            except subprocess.TimeoutExpired:
+                worker.process.kill()
+            worker.log.close()
+    finally:
+        for worker in workers:
+            if worker.process.poll() is None:
+                worker.process.kill()
+        for service in (nitter, openai, telegram):
+            service.close()
+
+    # Tweet-ID -> Worker, die ihn gesendet haben
+    posted = {}
+    for _, body, token in telegram.messages:
+        match = _TWEET_URL.search(body)
+        if match:
+            posted.setdefault(match.group(1), []).append(token.split(":", 1)[-1])
+    return workers, posted
+
+
+def main():
+    args = parse_args()
+    if args.child:
+        return run_child(args)
+
+    with tempfile.TemporaryDirectory() as workdir:
+        workers, posted = run(args, workdir)
+        logs = {worker.worker_id: summarize_log(os.path.join(workdir, f"{worker.worker_id}.log")) for worker in workers}
+
+    print(f"\n{'Worker':<10} {'Status':<12} {'Abrufe':>7} {'Umverteilungen':>15} {'bei anderem Worker':>19} {'Fehler':>7}")
+    for worker in workers:
+        log = logs[worker.worker_id]
+        status = "SIGKILL" if worker.killed else f"Exit {worker.process.returncode}"
+        print(f"{worker.worker_id:<10} {status:<12} {log['polls']:>7} {log['rebalances']:>15} "
+              f"{log['claimed_elsewhere']:>19} {log['errors']:>7}")
+
+    expected = args.accounts * args.tweets_per_account
+    missing = sorted(set(expected_tweet_ids(args)) - set(posted))
+    killed = {worker.worker_id for worker in workers if worker.killed}
+    duplicates = {tweet_id: senders for tweet_id, senders in posted.items() if len(senders) > 1}
+    # Ein mit SIGKILL beendeter Worker kann einen Tweet gesendet haben, ohne ihn noch als
+    # verarbeitet einzutragen; dieses Absturzfenster ist erwartet und wird nur gemeldet
+    crash_window = {tweet_id: senders for tweet_id, senders in duplicates.items()
+                    if len(senders) == 2 and killed & set(senders)}
+    errors = {tweet_id: senders for tweet_id, senders in duplicates.items() if tweet_id not in crash_window}
+    total = sum(len(senders) for senders in posted.values())
+    print(f"\nGesendet: {total} Posts, {len(posted)} verschiedene Tweets von {expected} erwarteten")
+    ok = not errors and len(posted) == expected
+    if crash_window:
+        print(f"Hinweis: {len(crash_window)} Tweets erneut gesendet, weil der Absender mit SIGKILL beendet wurde: "
+              f"{dict(list(crash_window.items())[:5])}")
+    if errors:
+        print(f"FEHLER: {len(errors)} Tweets mehrfach gesendet: {dict(list(errors.items())[:5])}")
+    if len(posted) < expected:
+        print(f"FEHLER: {expected - len(posted)} Tweets nicht gesendet (--duration erhöhen?): {', '.join(missing[:5])}")
+    if args.keep_logs:
+        for worker_id, log in logs.items():
+            print(f"\n===== {worker_id} =====\n{log['text']}")
+    if ok:
+        print("OK: jeder Tweet gesendet, keine doppelten Posts außerhalb des Absturzfensters")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
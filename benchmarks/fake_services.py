@@ -0,0 +1,456 @@
+# -*- coding: utf-8 -*-
+
+"""
+Lokale Stand-in-Dienste für Offline-Benchmarks: eine Nitter-Instanz, eine OpenAI-kompatible
+API (Chat Completions, Bildgenerierung, Bild-Download, Dateien und Batches) und die
+Telegram Bot API.
+Jeder Dienst läuft als ThreadingHTTPServer in einem Hintergrund-Thread, wartet pro Anfrage
+die eingestellte Latenz ab und zählt seine Aufrufe pro Endpunkt.
+"""
+
+import re
+import sys
+import json
+import time
+import zlib
+import random
+import struct
+import threading
+from email import policy
+from email.parser import BytesParser
+from urllib.parse import unquote_plus
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+
+def tiny_png(width=1, height=1, color=(0x80, 0x40, 0x20)):
+    """Erzeugt ein gültiges, einfarbiges PNG (Antwort auf Bild-Downloads)."""
+    def chunk(kind, data):
+        return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data) & 0xFFFFFFFF)
+    rows = b"".join(b"\x00" + bytes(color) * width for _ in range(height))
+    return (b"\x89PNG\r\n\x1a\n" + chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0))
+            + chunk(b"IDAT", zlib.compress(rows)) + chunk(b"IEND", b""))
+
+
+VOCABULARY = ("regierung partei wahl bundestag kanzler inflation aktien börse bitcoin krypto software "
+              "gesellschaft kultur bildung schule familie generation energie preise heute morgen wieder "
+              "warum niemand darüber spricht thread lesen zahlen zeigen deutlich dass wir mehr brauchen "
+              "weniger reden handeln jetzt endlich überwachung kontrolle digital internet").split()
+QUALITY_WORDS = ["analyse", "studie", "forschung", "erklärt", "wichtig"]
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _read_body(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        return self.rfile.read(length) if length else b""
+
+    def _reply(self, status, body, content_type="application/json"):
+        if isinstance(body, (dict, list)):
+            body = json.dumps(body).encode("utf-8")
+        elif isinstance(body, str):
+            body = body.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        # Abgebrochene Verbindungen (z.B. eines beendeten Clients) sind im Benchmark kein Fehler
+        if isinstance(sys.exc_info()[1], ConnectionError):
+            return
+        super().handle_error(request, client_address)
+
+
+class FakeService:
+    """Basisklasse: startet den Server, zählt Aufrufe und verzögert Antworten."""
+
+    handler = _Handler
+
+    def __init__(self, latency=0.0, jitter=0.0, seed=0):
+        self.latency = latency
+        self.jitter = jitter
+        self.calls = {}
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        service = self
+
+        class Handler(self.handler):
+            pass
+        Handler.service = service
+        self.server = _Server(("127.0.0.1", 0), Handler)
+        self.thread = threading.Thread(target=self.server.serve_forever, name=type(self).__name__, daemon=True)
+        self.thread.start()
+
+    @property
+    def url(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def count(self, endpoint):
+        with self._lock:
+            self.calls[endpoint] = self.calls.get(endpoint, 0) + 1
+
+    def wait(self, latency=None):
+        latency = self.latency if latency is None else latency
+        if latency or self.jitter:
+            with self._lock:
+                spread = self._rng.uniform(-self.jitter, self.jitter) if self.jitter else 0.0
+            time.sleep(max(0.0, latency * (1 + spread)))
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+# Nitter ----------------------------------------------------------------------
+
+_MEDIA_ID = re.compile(r"^/pic/.*?(\d+)\.\w+$")
+
+
+class _NitterHandler(_Handler):
+    def do_GET(self):
+        service = self.service
+        media = _MEDIA_ID.match(self.path)
+        if media:
+            service.count("image")
+            service.wait()
+            self._reply(200, service.image(int(media.group(1))), "image/png")
+            return
+        username = self.path.strip("/").split("/")[0].split("?")[0]
+        if not username or "/" in self.path.strip("/"):
+            service.count("other")
+            self._reply(404, "not found", "text/plain")
+            return
+        service.count("timeline")
+        service.wait()
+        self._reply(200, service.timeline(username), "text/html; charset=utf-8")
+
+
+class FakeNitter(FakeService):
+    """
+    Nitter-Instanz, die pro Account eine Timeline mit eindeutigen, gut bewerteten Tweets liefert.
+    Jeder Abruf zeigt tweets_per_page neue Tweets (neueste zuerst), sodass auch wiederholte
+    Abrufe desselben Accounts neue Tweets finden. Mit fresh=False liefert jeder Abruf eines
+    Accounts dieselben Tweets (z.B. um doppelte Abrufe durch mehrere Worker zu prüfen).
+
+    Die Bilder der Tweets liefert die Instanz unter /pic/ als PNG der Größe image_size aus.
+    Mit image_variants > 0 gibt es nur so viele verschiedene Bilder, die sich die Tweets teilen
+    (wie erneut gepostete Bilder); sonst hat jeder Tweet ein eigenes.
+    """
+
+    handler = _NitterHandler
+
+    def __init__(self, latency=0.0, jitter=0.0, seed=0, tweets_per_page=5, media_ratio=0.5, fresh=True,
+                 image_size=(64, 64), image_variants=0):
+        super().__init__(latency, jitter, seed)
+        self.seed = seed
+        self.tweets_per_page = tweets_per_page
+        self.media_ratio = media_ratio
+        self.fresh = fresh
+        self.image_size = image_size
+        self.image_variants = image_variants
+        self._images = {}
+        self._next_id = 1790000000000000000
+
+    def image(self, tweet_id):
+        """PNG für das Bild eines Tweets (gleiche Variante -> identische Bytes)."""
+        variant = tweet_id % self.image_variants if self.image_variants else tweet_id
+        with self._lock:
+            data = self._images.get(variant)
+        if data is None:
+            color = zlib.crc32(str(variant).encode("ascii")).to_bytes(4, "big")[:3]
+            data = tiny_png(*self.image_size, color=color)
+            if self.image_variants:
+                with self._lock:
+                    self._images[variant] = data
+        return data
+
+    @staticmethod
+    def _tweet_text(rng):
+        words = [rng.choice(VOCABULARY) for _ in range(rng.randint(20, 40))]
+        words.insert(rng.randrange(len(words)), rng.choice(QUALITY_WORDS))
+        return " ".join(words) + "?"
+
+    def timeline(self, username):
+        items = []
+        with self._lock:
+            if self.fresh:
+                rng = self._rng
+            else:
+                # Feste Tweets pro Account: Zufallszahlen und IDs hängen nur vom Benutzernamen ab
+                rng = random.Random(f"{self.seed}:{username}")
+                self._next_id = 1790000000000000000 + zlib.crc32(username.encode("utf-8")) * 1000
+            for _ in range(self.tweets_per_page):
+                self._next_id += 1
+                tweet_id = self._next_id
+                text = self._tweet_text(rng)
+                has_media = rng.random() < self.media_ratio
+                likes, retweets, replies = (rng.randint(100, 5000) for _ in range(3))
+                items.append((tweet_id, text, has_media, likes, retweets, replies))
+        html = []
+        for tweet_id, text, has_media, likes, retweets, replies in reversed(items):
+            media = (f'<div class="attachments"><div class="gallery-row"><div class="attachment image">'
+                     f'<a class="still-image" href="/pic/orig/media%2F{tweet_id}.jpg">'
+                     f'<img src="/pic/media%2F{tweet_id}.jpg" alt=""></a></div></div></div>') if has_media else ""
+            html.append(
+                f'<div class="timeline-item " data-username="{username}">'
+                f'<a class="tweet-link" href="/{username}/status/{tweet_id}#m"></a>'
+                f'<div class="tweet-body"><div class="tweet-content media-body" dir="auto">{text}</div>{media}'
+                f'<div class="tweet-stats">'
+                f'<span class="tweet-stat"><div class="icon-container"><span class="icon-comment" title=""></span> {replies:,}</div></span>'
+                f'<span class="tweet-stat"><div class="icon-container"><span class="icon-retweet" title=""></span> {retweets:,}</div></span>'
+                f'<span class="tweet-stat"><div class="icon-container"><span class="icon-heart" title=""></span> {likes:,}</div></span>'
+                f'</div></div></div>'
+            )
+        return f'<html><body><div class="timeline-container"><div class="timeline">{"".join(html)}</div></div></body></html>'
+
+
+# OpenAI ----------------------------------------------------------------------
+
+_BATCH_PATH = re.compile(r"^/v1/batches/([\w-]+)$")
+_FILE_CONTENT_PATH = re.compile(r"^/v1/files/([\w-]+)/content$")
+
+
+class _OpenAIHandler(_Handler):
+    def do_POST(self):
+        service = self.service
+        body = self._read_body()
+        if self.path.endswith("/files"):
+            service.count("files.create")
+            self._reply(200, service.create_file(self.headers.get("Content-Type") or "", body))
+            return
+        request = json.loads(body or b"{}")
+        if self.path.endswith("/batches"):
+            service.count("batches.create")
+            self._reply(200, service.create_batch(request))
+        elif self.path.endswith("/chat/completions"):
+            service.count("chat.completions")
+            service.wait()
+            self._reply(200, service.chat_completion(request))
+        elif self.path.endswith("/images/generations"):
+            service.count("images.generations")
+            service.wait(service.image_latency)
+            self._reply(200, {"created": int(time.time()), "data": [{"url": f"{service.url}/files/{time.time_ns()}.png"}]})
+        else:
+            service.count("other")
+            self._reply(404, {"error": {"message": "unknown endpoint"}})
+
+    def do_GET(self):
+        service = self.service
+        batch = _BATCH_PATH.match(self.path)
+        content = _FILE_CONTENT_PATH.match(self.path)
+        if self.path.startswith("/files/"):
+            service.count("image.download")
+            self._reply(200, service.image_bytes, "image/png")
+        elif batch and batch.group(1) in service.batches:
+            service.count("batches.retrieve")
+            self._reply(200, service.retrieve_batch(batch.group(1)))
+        elif content and content.group(1) in service.files:
+            service.count("files.content")
+            self._reply(200, service.files[content.group(1)], "application/octet-stream")
+        else:
+            service.count("other")
+            self._reply(404, {"error": {"message": "unknown endpoint"}})
+
+
+class FakeOpenAI(FakeService):
+    """
+    OpenAI-kompatible API: /v1/chat/completions, /v1/images/generations und der Download
+    der erzeugten Bilder. latency gilt für Chat-Anfragen, image_latency für Bilder.
+    Anfragen mit response_format (json_schema/json_object) erhalten ein JSON-Objekt mit den
+    Feldern des Schemas; invalid_json_ratio liefert stattdessen zufällig ungültiges JSON.
+
+    Batch-API: /v1/files (Upload), /v1/batches und /v1/files/{id}/content. Ein Batch ist
+    batch_latency Sekunden nach dem Anlegen im Zustand batch_status ("completed", oder z.B.
+    "expired" ohne Ergebnisse); batch_error_ratio landet als Einzelfehler in der Fehlerdatei.
+    """
+
+    handler = _OpenAIHandler
+
+    def __init__(self, latency=0.0, jitter=0.0, seed=0, image_latency=None, completion_words=120,
+                 invalid_json_ratio=0.0, batch_latency=1.0, batch_status="completed", batch_error_ratio=0.0):
+        super().__init__(latency, jitter, seed)
+        self.image_latency = latency if image_latency is None else image_latency
+        self.completion_words = completion_words
+        self.invalid_json_ratio = invalid_json_ratio
+        self.batch_latency = batch_latency
+        self.batch_status = batch_status
+        self.batch_error_ratio = batch_error_ratio
+        self.image_bytes = tiny_png(64, 64)
+        self.files = {}
+        self.batches = {}
+        self._batch_lock = threading.Lock()
+
+    @property
+    def base_url(self):
+        return f"{self.url}/v1"
+
+    def chat_completion(self, request):
+        # Ein Wort entspricht hier einem Token; max_tokens schneidet die Antwort ab wie die echte API
+        words = self.completion_words
+        finish_reason = "stop"
+        if request.get("max_tokens") and request["max_tokens"] < words:
+            words, finish_reason = request["max_tokens"], "length"
+        with self._lock:
+            content = " ".join(self._rng.choice(VOCABULARY) for _ in range(words))
+            if (request.get("response_format") or {}).get("type") in ("json_schema", "json_object"):
+                content = self._json_content(request["response_format"], content, finish_reason)
+        prompt_tokens = sum(len(str(message.get("content", "")).split()) for message in request.get("messages", []))
+        return {
+            "id": f"chatcmpl-{time.time_ns()}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": request.get("model", "gpt-4o"),
+            "choices": [{"index": 0, "finish_reason": finish_reason, "message": {"role": "assistant", "content": content}}],
+            "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": words,
+                      "total_tokens": prompt_tokens + words},
+        }
+
+    def create_file(self, content_type, body):
+        """Speichert die Datei aus einem multipart-Upload (Feld file)."""
+        message = BytesParser(policy=policy.HTTP).parsebytes(f"Content-Type: {content_type}\r\n\r\n".encode() + body)
+        data, filename = b"", "upload"
+        for part in message.iter_parts():
+            if part.get_param("name", header="content-disposition") == "file":
+                data, filename = part.get_payload(decode=True), part.get_filename() or filename
+        file_id = f"file-{time.time_ns()}"
+        with self._lock:
+            self.files[file_id] = data
+        return {"id": file_id, "object": "file", "bytes": len(data), "created_at": int(time.time()),
+                "filename": filename, "purpose": "batch", "status": "processed"}
+
+    def create_batch(self, request):
+        batch_id = f"batch_{time.time_ns()}"
+        lines = [line for line in self.files[request["input_file_id"]].decode("utf-8").splitlines() if line.strip()]
+        batch = {
+            "id": batch_id, "object": "batch", "endpoint": request["endpoint"], "errors": None,
+            "input_file_id": request["input_file_id"], "completion_window": request["completion_window"],
+            "status": "validating", "output_file_id": None, "error_file_id": None, "created_at": int(time.time()),
+            "request_counts": {"total": len(lines), "completed": 0, "failed": 0},
+            "metadata": request.get("metadata"),
+        }
+        with self._lock:
+            self.batches[batch_id] = {"batch": batch, "lines": lines, "created": time.monotonic()}
+        return batch
+
+    def retrieve_batch(self, batch_id):
+        """Gibt den Batch zurück; nach batch_latency wird er einmalig abgeschlossen (Ausgabe- und Fehlerdatei)."""
+        with self._batch_lock:
+            return self._advance_batch(self.batches[batch_id])
+
+    def _advance_batch(self, entry):
+        batch = entry["batch"]
+        if batch["status"] in ("validating", "in_progress") and time.monotonic() - entry["created"] >= self.batch_latency:
+            output, errors = [], []
+            if self.batch_status == "completed":
+                for line in entry["lines"]:
+                    request = json.loads(line)
+                    with self._lock:
+                        failed = self._rng.random() < self.batch_error_ratio
+                    if failed:
+                        response = {"status_code": 500, "body": {"error": {"message": "server error", "type": "server_error"}}}
+                        errors.append({"id": f"batch_req_{time.time_ns()}", "custom_id": request["custom_id"],
+                                       "response": response, "error": None})
+                    else:
+                        response = {"status_code": 200, "body": self.chat_completion(request["body"])}
+                        output.append({"id": f"batch_req_{time.time_ns()}", "custom_id": request["custom_id"],
+                                       "response": response, "error": None})
+            for name, items in (("output_file_id", output), ("error_file_id", errors)):
+                if items:
+                    file_id = f"file-{time.time_ns()}"
+                    self.files[file_id] = "".join(json.dumps(item) + "\n" for item in items).encode("utf-8")
+                    batch[name] = file_id
+            batch["request_counts"].update(completed=len(output), failed=len(errors))
+            batch["status"] = self.batch_status
+            batch["completed_at" if self.batch_status == "completed" else f"{self.batch_status}_at"] = int(time.time())
+        elif batch["status"] == "validating":
+            batch["status"] = "in_progress"
+        return batch
+
+    def _json_content(self, response_format, text, finish_reason):
+        """JSON-Antwort zum Schema (Strings mit Text, enum mit dem ersten Wert); ohne Schema wie main.py es erwartet."""
+        if finish_reason == "length" or self._rng.random() < self.invalid_json_ratio:
+            return '{"summary": "' + text
+        schema = (response_format.get("json_schema") or {}).get("schema") or {
+            "properties": {"summary": {"type": "string"}, "style": {"enum": ["default"]},
+                           "image_prompt": {"type": "string"}}}
+        words = text.split()
+        result = {}
+        for name, field in schema["properties"].items():
+            if "enum" in field:
+                result[name] = field["enum"][0]
+            else:
+                result[name] = " ".join(words if name == "summary" else words[:20])
+        return json.dumps(result, ensure_ascii=False)
+
+
+# Telegram --------------------------------------------------------------------
+
+_BOT_METHOD = re.compile(r"^/bot([^/]+)/(\w+)")
+
+
+class _TelegramHandler(_Handler):
+    def do_POST(self):
+        service = self.service
+        body = self._read_body()
+        match = _BOT_METHOD.match(self.path)
+        token, method = match.groups() if match else (None, "other")
+        service.count(method)
+        # Hochgeladene Dateien (multipart) getrennt zählen, wiederverwendete file_ids nicht
+        if (self.headers.get("Content-Type") or "").startswith("multipart/form-data"):
+            service.count(f"{method} upload")
+        if method.startswith("send"):
+            service.record(method, body, token)
+        service.wait()
+        self._reply(200, {"ok": True, "result": service.result(method)})
+
+    do_GET = do_POST
+
+
+class FakeTelegram(FakeService):
+    """
+    Telegram-Bot-API-Stub: beantwortet sendMessage, sendPhoto und sendMediaGroup mit gültigen
+    Nachrichten und merkt sich die Anfragen (messages: Methode, Inhalt, Bot-Token), z.B. um
+    doppelte Posts zu erkennen. Eine Anfrage gilt schon beim Empfang als gesendet.
+    """
+
+    handler = _TelegramHandler
+
+    def __init__(self, latency=0.0, jitter=0.0, seed=0):
+        super().__init__(latency, jitter, seed)
+        self._message_id = 0
+        self.messages = []
+
+    def record(self, method, body, token=None):
+        with self._lock:
+            self.messages.append((method, unquote_plus(body.decode("utf-8", "replace")), token))
+
+    @property
+    def base_url(self):
+        return f"{self.url}/bot"
+
+    def _message(self, photo=False):
+        with self._lock:
+            self._message_id += 1
+            message_id = self._message_id
+        message = {"message_id": message_id, "date": int(time.time()),
+                   "chat": {"id": -1001, "type": "channel", "title": "Benchmark"}, "text": ""}
+        if photo:
+            message["photo"] = [{"file_id": f"photo-{message_id}", "file_unique_id": f"u{message_id}", "width": 1, "height": 1}]
+        return message
+
+    def result(self, method):
+        if method == "sendMediaGroup":
+            return [self._message(photo=True)]
+        if method == "getMe":
+            return {"id": 1, "is_bot": True, "first_name": "Benchmark", "username": "benchmark_bot"}
+        return self._message(photo=method == "sendPhoto")
@@ -0,0 +1,196 @@
+# -*- coding: utf-8 -*-
+
+"""
+Zentrale Fabrik für alle externen Clients (Telegram-Bot, twscrape, OpenAI, HTTP-Clients).
+Der Import dieses Moduls hat keine Nebenwirkungen: die .env-Datei wird erst beim ersten
+Zugriff auf eine Einstellung geladen, und jede Client-Bibliothek wird erst importiert und
+instanziiert, wenn eine Pipeline-Stufe den Client zum ersten Mal anfordert. Danach teilen
+sich alle Aufrufer dieselbe Instanz; Clients mit eigenem Verbindungspool (OpenAI, Nitter,
+Bild-Downloads) gehören zu dem Event-Loop, in dem sie erzeugt wurden.
+"""
+
+import os
+import asyncio
+import threading
+
+from config import OPENAI_CLIENT, NITTER_FETCH, TELEGRAM_CLIENT, TWITTER_SESSION
+
+ENV_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.env')
+
+# Variablen aus der .env-Datei, deren Status print_environment_status ausgibt (True = geheim)
+ENV_SETTINGS = {
+    "TELEGRAM_BOT_TOKEN": True,
+    "TELEGRAM_CHANNEL_ID": False,
+    "TWITTER_USERNAME": False,
+    "TWITTER_PASSWORD": True,
+    "TWITTER_EMAIL": False,
+    "TWITTER_EMAIL_PASSWORD": True,
+    "OPENAI_API_KEY": True,
+}
+
+# Zugangsdaten des Scraping-Accounts für twscrape
+TWITTER_CREDENTIALS = ("TWITTER_USERNAME", "TWITTER_PASSWORD", "TWITTER_EMAIL", "TWITTER_EMAIL_PASSWORD")
+
+_env_loaded = False
+_lock = threading.RLock()
+
+
+def load_environment(path=None):
+    """
+    Lädt die .env-Datei einmal pro Prozess (Werte aus der Datei haben Vorrang).
+
+    Returns:
+        str: Pfad der .env-Datei
+    """
+    global _env_loaded
+    path = path or ENV_PATH
+    with _lock:
+        if not _env_loaded:
+            from dotenv import load_dotenv
+            load_dotenv(dotenv_path=path, override=True)
+            _env_loaded = True
+    return path
+
+
+def get_setting(name, default=None):
+    """Liest eine Einstellung aus der Umgebung, nachdem die .env-Datei geladen wurde."""
+    load_environment()
+    return os.getenv(name, default)
+
+
+def print_environment_status():
+    """Gibt aus, welche Zugangsdaten geladen wurden (geheime Werte maskiert)."""
+    path = load_environment()
+    print(f".env-Datei {'gefunden' if os.path.exists(path) else 'nicht gefunden'}: {path}")
+    print("Geladene Konfiguration:")
+    for name, secret in ENV_SETTINGS.items():
+        value = os.getenv(name)
+        shown = ("*" * 10 if secret else value) if value else "Nicht geladen"
+        print(f"{name}: {shown}")
+    if not has_twitter_credentials():
+        print("WARNUNG: Twitter-Zugangsdaten fehlen oder sind unvollständig!")
+
+
+def has_twitter_credentials():
+    """Prüft, ob alle Zugangsdaten für twscrape gesetzt sind (ohne den Client zu erzeugen)."""
+    return all(get_setting(name) for name in TWITTER_CREDENTIALS)
+
+
+# Registrierte Fabrikfunktionen: Name -> (Funktion, an den Event-Loop gebunden)
+_builders = {}
+# Erzeugte Clients: Name -> (Instanz, Event-Loop oder None)
+_clients = {}
+
+
+def client_builder(name, per_loop=False):
+    """Registriert eine Fabrikfunktion für get_client (Dekorator)."""
+    def register(builder):
+        _builders[name] = (builder, per_loop)
+        return builder
+    return register
+
+
+def get_client(name):
+    """
+    Gibt den gemeinsamen Client mit diesem Namen zurück und erzeugt ihn beim ersten Aufruf.
+
+    Args:
+        name: telegram_bot, twitter_api, twitter_session, openai, nitter_http oder download_http
+
+    Returns:
+        Die Client-Instanz; an den Event-Loop gebundene Clients werden pro Loop neu erzeugt
+        (dafür muss ein Event-Loop laufen)
+    """
+    builder, per_loop = _builders[name]
+    loop = asyncio.get_running_loop() if per_loop else None
+    with _lock:
+        entry = _clients.get(name)
+        if entry is None or entry[1] is not loop:
+            entry = (builder(), loop)
+            _clients[name] = entry
+        return entry[0]
+
+
+def set_client(name, client):
+    """Ersetzt einen Client (z.B. durch einen Stand-in für Benchmarks); None verwirft ihn."""
+    with _lock:
+        if client is None:
+            _clients.pop(name, None)
+        else:
+            loop = asyncio.get_running_loop() if _builders[name][1] else None
+            _clients[name] = (client, loop)
+
+
+def created_clients():
+    """Namen der bisher erzeugten Clients (z.B. um zu prüfen, dass ein Import nichts erzeugt)."""
+    with _lock:
+        return sorted(_clients)
+
+
+@client_builder("telegram_bot")
+def _build_telegram_bot():
+    from telegram import Bot
+    from telegram.request import HTTPXRequest
+
+    timeout = TELEGRAM_CLIENT["timeout_seconds"]
+    request = HTTPXRequest(
+        connection_pool_size=TELEGRAM_CLIENT["connection_pool_size"],
+        read_timeout=timeout,
+        write_timeout=timeout,
+        connect_timeout=timeout
+    )
+    kwargs = {"base_url": TELEGRAM_CLIENT["base_url"]} if TELEGRAM_CLIENT["base_url"] else {}
+    return Bot(token=get_setting("TELEGRAM_BOT_TOKEN"), request=request, **kwargs)
+
+
+@client_builder("twitter_api")
+def _build_twitter_api():
+    from twscrape import API
+
+    # Cookies/Tokens bleiben in der Pool-Datenbank zwischen Läufen erhalten; gleichzeitige Anfragen
+    # warten, bis der Account frei ist, statt sofort mit NoAccountError abzubrechen
+    return API(TWITTER_SESSION["accounts_db"], raise_when_no_account=True,
+               wait_timeout=TWITTER_SESSION["account_wait_seconds"])
+
+
+@client_builder("twitter_session")
+def _build_twitter_session():
+    from twitter_session import TwitterSession
+
+    return TwitterSession(get_client("twitter_api"), *(get_setting(name) for name in TWITTER_CREDENTIALS))
+
+
+@client_builder("openai", per_loop=True)
+def _build_openai():
+    import httpx
+    from openai import AsyncOpenAI
+
+    load_environment()  # OPENAI_API_KEY und OPENAI_BASE_URL liest der Client aus der Umgebung
+    http_client = httpx.AsyncClient(
+        limits=httpx.Limits(
+            max_connections=OPENAI_CLIENT["max_connections"],
+            max_keepalive_connections=OPENAI_CLIENT["max_connections"]
+        ),
+        timeout=OPENAI_CLIENT["timeout_seconds"]
+    )
+    # Wiederholungen übernimmt llm_client.with_retries, damit das Backoff nicht blockiert
+    return AsyncOpenAI(http_client=http_client, max_retries=0)
+
+
+@client_builder("nitter_http", per_loop=True)
+def _build_nitter_http():
+    import httpx
+
+    return httpx.AsyncClient(
+        timeout=NITTER_FETCH["request_timeout_seconds"],
+        follow_redirects=False,
+        limits=httpx.Limits(max_connections=NITTER_FETCH["max_connections"])
+    )
+
+
+@client_builder("download_http", per_loop=True)
+def _build_download_http():
+    import httpx
+
+    # Für generierte Bilder und Medien (CDN-Links leiten häufig weiter)
+    return httpx.AsyncClient(timeout=30, follow_redirects=True)
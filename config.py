@@ -37,12 +37,95 @@ Bitte befolge diese Richtlinien:
 8. Halte die Länge kompakt, aber aussagekräftig
 """
 
+# Kombinierter Aufruf für Zusammenfassung, Kommentarstil und DALL-E-Prompt (siehe structured_summary.py)
+STRUCTURED_SUMMARY = {
+    "enabled": False,               # True = ein JSON-Aufruf statt Zusammenfassung + Bild-Prompt (auch per --structured-summary)
+    "choose_style": True,           # Modell darf vom Stil der Tonalitäts-Waage abweichen
+    "max_image_prompt_words": 60,   # Längere Bild-Prompts werden gekürzt
+    "image_prompt_tokens": 120,     # Zusätzliche max_tokens für Bild-Prompt und JSON-Gerüst
+    # Modelle mit Structured Outputs (response_format json_schema); andere nutzen den JSON-Modus
+    "schema_models": ["gpt-4o", "gpt-4o-mini", "gpt-4o-2024-08-06", "gpt-4.1", "gpt-4.1-mini"]
+}
+
+# Zusammenfassungen nicht eiliger Accounts über die OpenAI-Batch-API (siehe batch_summaries.py)
+BATCH_SUMMARY = {
+    "enabled": False,               # True = Accounts aus "accounts" bzw. mit Option batch in accounts.txt bündeln
+    "accounts": [],                 # Benutzernamen ("*" = alle Accounts)
+    "max_requests": 500,            # Anfragen pro Batch; ein voller Batch wird sofort eingereicht
+    "max_wait_seconds": 15 * 60,    # Spätestens dann wird ein unvollständiger Batch eingereicht
+    "poll_interval_seconds": 60,    # Abstand der Statusabfragen eines laufenden Batches
+    "completion_window": "24h",     # Von der Batch-API vorgegeben
+    "max_attempts": 2,              # Danach werden Anfragen aus fehlgeschlagenen Batches direkt zusammengefasst
+    "max_send_attempts": 3,         # Versuche, ein fertiges Ergebnis zu senden, bevor es verworfen wird
+    "lease_seconds": 300,           # Beanspruchung beim Einreichen, Abfragen und Senden (mehrere Worker)
+    "directory": "batches",         # JSONL-Eingabedateien
+    "keep_files": False,            # Eingabedateien nach Abschluss des Batches behalten
+    "retention_days": 7             # Abgeschlossene Anfragen im State-Store
+}
+
+# Gemeinsamer OpenAI-Client (AsyncOpenAI mit Verbindungspool)
+OPENAI_CLIENT = {
+    "max_connections": 20,     # Größe des HTTP-Verbindungspools
+    "timeout_seconds": 60,     # Timeout pro Anfrage
+    "max_retries": 3,          # Versuche pro Anfrage
+    "retry_delay_seconds": 2   # Anfangswartezeit für das exponentielle Backoff
+}
+
+# Token-Budgets und Verbrauchserfassung der LLM-Aufrufe (siehe token_budget.py)
+TOKEN_BUDGET = {
+    "max_input_tokens": 1500,       # Längere Tweet-Texte werden vor dem Aufruf gekürzt
+    "max_output_tokens": 600,       # Obergrenze für max_tokens einer Zusammenfassung
+    "caption_limit": 1024,          # Telegram-Limit für Bildunterschriften (Posts mit Bild)
+    "message_limit": 4096,          # Telegram-Limit für Textnachrichten
+    "min_summary_chars": 200,       # Mindestbudget, falls Quellen und Fußzeile fast alles belegen
+    "output_chars_per_token": 2.5,  # Umrechnung Zeichen -> max_tokens (bewusst knapp, deutscher Text mit Emojis)
+    "length_hint": True,            # Zeichenlimit zusätzlich als Anweisung in den Prompt schreiben
+    "use_tiktoken": True,           # Tokens mit tiktoken zählen, falls installiert
+    "fallback_encoding": "o200k_base",  # Kodierung für Modelle, die tiktoken nicht kennt
+    "chars_per_token": 3.5,         # Schätzung ohne tiktoken
+    "retention_days": 400           # Tageswerte des Verbrauchs im State-Store
+}
+
+# Maximale Anzahl gleichzeitiger Anfragen pro Modell
+OPENAI_CONCURRENCY = {
+    "default": 8,
+    "gpt-4o": 8,
+    "gpt-3.5-turbo": 16,
+    "dall-e-3": 2
+}
+
+# Persistenter Cache für Zusammenfassungen (im State-Store)
+LLM_CACHE = {
+    "enabled": True,                    # False = Cache umgehen (auch per --no-llm-cache)
+    "ttl_seconds": 7 * 24 * 60 * 60,    # Gültigkeitsdauer eines Eintrags
+    "max_entries": 5000                 # Maximale Anzahl Einträge, danach LRU-Verdrängung
+}
+
 # DALL-E Konfiguration
 DALLE_MODEL = "dall-e-3"
 DALLE_SIZE = "1024x1024"
 DALLE_QUALITY = "standard"
 DALLE_STYLE = "vivid"
 
+# Lokaler Cache für generierte Bilder (inhaltsadressiert)
+IMAGE_CACHE = {
+    "directory": "image_cache",  # Verzeichnis für heruntergeladene DALL-E-Bilder
+    "max_entries": 1000          # Maximale Anzahl Bilder, danach werden die ältesten entfernt
+}
+
+# Medien-Stufe für Telegram: Bilder selbst laden, an die Foto-Limits anpassen und einmal hochladen
+# (siehe telegram_media.py); die file_id wird nach Bildinhalt wiederverwendet
+TELEGRAM_MEDIA = {
+    "enabled": True,                          # False: URLs wie bisher direkt an Telegram übergeben
+    "max_download_bytes": 20 * 1024 * 1024,   # Größere Dateien werden nicht geladen (Telegram versucht die URL selbst)
+    "download_timeout_seconds": 20,
+    "max_photo_bytes": 10 * 1024 * 1024,      # Telegram-Limit für hochgeladene Fotos
+    "max_side": 2560,                         # Längere Kante in Pixeln; größere Bilder skaliert Telegram ohnehin herunter
+    "max_aspect_ratio": 20,                   # Telegram-Limit für das Seitenverhältnis
+    "jpeg_quality": 85,                       # Qualität beim Neukomprimieren (nur mit Pillow)
+    "cache_days": 90                          # file_ids und URLs, die so lange nicht genutzt wurden, werden entfernt
+}
+
 # Deaktivierung der Bildgenerierung (für Tests oder wenn API-Kosten gespart werden sollen)
 DISABLE_IMAGE_GENERATION = False
 
@@ -80,6 +163,38 @@ NITTER_INSTANCES = [
     "https://nitter.kavin.rocks"
 ]
 
+# Paralleler Abruf über mehrere Nitter-Instanzen (Hedging)
+NITTER_FETCH = {
+    "hedge_width": 3,               # Maximale Anzahl gleichzeitiger Anfragen an verschiedene Instanzen
+    "stagger_seconds": 1.0,         # Abstand, bevor die nächste Instanz zusätzlich angefragt wird (0 = alle sofort)
+    "request_timeout_seconds": 10,  # Timeout pro Anfrage
+    "account_budget_seconds": 20,   # Maximale Gesamtwartezeit pro Account
+    "max_connections": 20           # Größe des HTTP-Verbindungspools
+}
+
+# Parser-Backend für Nitter-Timelines ("lxml" = schnell, "bs4" = BeautifulSoup; ohne lxml immer bs4)
+NITTER_PARSER = {
+    "backend": "lxml"
+}
+
+# Gesundheitsbewertung und Circuit Breaker für Nitter-Instanzen (im State-Store gespeichert)
+NITTER_HEALTH = {
+    "ewma_alpha": 0.3,                # Gewicht neuer Messungen für Latenz und Erfolgsquote
+    "initial_success_rate": 0.5,      # Startwert für unbekannte Instanzen
+    "assumed_latency_seconds": 3.0,   # Angenommene Latenz, solange keine Messung vorliegt
+    "failure_threshold": 3,           # Aufeinanderfolgende Fehler, bis der Circuit Breaker öffnet
+    "open_seconds": 600,              # Sperrzeit nach Fehlern
+    "rate_limit_open_seconds": 1800,  # Sperrzeit nach einem 429
+    "max_open_seconds": 6 * 60 * 60   # Obergrenze für die Sperrzeit nach gescheiterten Proben
+}
+
+# twscrape-Sitzungsverwaltung
+TWITTER_SESSION = {
+    "accounts_db": "accounts.db",  # twscrape-Pool-Datenbank, speichert Cookies/Tokens zwischen Läufen
+    "relogin_cooldown_seconds": 300,  # Mindestabstand zwischen zwei Login-Versuchen
+    "account_wait_seconds": 60       # So lange wartet eine Anfrage, solange eine andere den Account belegt
+}
+
 # Duplikat-Erkennung
 DUPLICATE_DETECTION = {
     "cache_days": 7,  # Anzahl der Tage, für die Tweets im Cache behalten werden
@@ -89,6 +204,24 @@ DUPLICATE_DETECTION = {
 # Direkte Variable für einfacheren Zugriff
 DUPLICATE_CACHE_DAYS = DUPLICATE_DETECTION["cache_days"]
 
+# Erkennung von Beinahe-Duplikaten (MinHash-LSH über Zeichen-Shingles)
+NEAR_DUPLICATE = {
+    "enabled": True,
+    "similarity_threshold": 0.8,  # Geschätzte Jaccard-Ähnlichkeit, ab der ein Tweet als Duplikat gilt
+    "shingle_size": 5,            # Länge der Zeichen-Shingles nach der Normalisierung
+    "num_bands": 16,              # LSH-Bänder; Bänder x Zeilen = Anzahl der Hash-Funktionen
+    "rows_per_band": 4,           # Zeilen pro Band (16 x 4: Kandidaten ab ca. 50% Ähnlichkeit)
+    "min_shingles": 10,           # Kürzere Texte werden nicht auf Ähnlichkeit geprüft
+    "seed": 1                     # Startwert der Hash-Funktionen; eine Änderung leert den Index
+}
+
+# Persistenter Zustandsspeicher (SQLite im WAL-Modus)
+STATE_STORE = {
+    "db_file": "bot_state.db",  # Datenbankdatei für verarbeitete Tweets und weiteren Bot-Zustand
+    "legacy_json_file": "processed_tweets.json",  # Alter JSON-Cache, wird einmalig migriert
+    "compaction_interval_seconds": 3600  # Intervall für das Entfernen abgelaufener Einträge im Hintergrund
+}
+
 # Verarbeitungslimits
 PROCESSING_LIMITS = {
     "max_accounts_per_run": 5,  # Maximale Anzahl der zu verarbeitenden Accounts pro Durchlauf
@@ -99,6 +232,86 @@ PROCESSING_LIMITS = {
 MAX_ACCOUNTS_PER_RUN = PROCESSING_LIMITS["max_accounts_per_run"]
 MAX_TWEETS_PER_ACCOUNT = PROCESSING_LIMITS["tweets_per_account"]
 
+# Nebenläufige Verarbeitung in einem gemeinsamen Event-Loop
+PIPELINE = {
+    "mode": "async",              # "async" (alle Accounts nebenläufig) oder "sequential" (bisheriger Ablauf)
+    "max_accounts_per_run": None  # None = alle Accounts; im async-Modus steuern die Stufen-Limits den Durchsatz
+}
+
+# Maximale Anzahl gleichzeitig laufender Aufrufe pro Pipeline-Stufe (0 oder None = unbegrenzt)
+PIPELINE_CONCURRENCY = {
+    "accounts": 10,   # Gleichzeitig bearbeitete Accounts
+    "fetch": 5,       # Gleichzeitige Tweet-Abrufe (twscrape/Nitter)
+    "summarize": 8,   # Gleichzeitige GPT-Zusammenfassungen
+    "image": 2,       # Gleichzeitige Bild-Prompts und DALL-E-Generierungen
+    "media": 6,       # Gleichzeitige Downloads und Anpassungen von Tweet-Medien
+    "send": 10        # Gleichzeitige Telegram-Sendevorgänge (die Rate begrenzt die Sendewarteschlange, siehe TELEGRAM_SEND)
+}
+
+# Telegram-Bot-Client (wird erst beim ersten Senden erzeugt, siehe clients.py)
+TELEGRAM_CLIENT = {
+    "connection_pool_size": 8,  # Gleichzeitige Verbindungen zur Bot API (Standard von PTB ist 1)
+    "timeout_seconds": 30,      # Connect-, Read- und Write-Timeout
+    "base_url": None            # Eigener Bot-API-Server, z.B. "http://localhost:8081/bot" (Standard: api.telegram.org)
+}
+
+# Telegram-Sendewarteschlange (Token-Buckets nach den Telegram-Limits)
+TELEGRAM_SEND = {
+    "per_chat_messages_per_minute": 20,  # Telegram-Limit für Gruppen und Kanäle
+    "per_chat_burst": 3,                 # Nachrichten, die ohne Wartezeit direkt hintereinander gesendet werden
+    "global_messages_per_second": 30,    # Telegram-Limit pro Bot über alle Chats
+    "global_burst": 30,
+    "max_retries": 5,                    # Erneute Versuche nach RetryAfter, bevor der Post als fehlgeschlagen gilt
+    "max_queue_size": 1000               # Danach warten neue Nachrichten, bis wieder Platz ist
+}
+
+# Daemon-Modus: adaptives Abfrageintervall pro Account (--mode daemon)
+POLL_SCHEDULE = {
+    "min_interval_seconds": 300,        # Aktive Accounts höchstens alle 5 Minuten abfragen
+    "max_interval_seconds": 6 * 3600,   # Ruhende Accounts mindestens alle 6 Stunden abfragen
+    "initial_interval_seconds": 900,    # Intervall für neue Accounts ohne Beobachtungen
+    "rate_ewma_alpha": 0.3,             # Gewicht der letzten Beobachtung für die Posting-Rate
+    "target_tweets_per_poll": 1.0,      # Angestrebte Anzahl neuer Tweets pro Abfrage
+    "dormancy_factor": 0.25,            # Intervall mindestens dieser Anteil der Zeit seit dem letzten Tweet
+    "failure_backoff": 2.0,             # Intervall-Multiplikator nach einem fehlgeschlagenen Abruf
+    "jitter": 0.1,                      # Zufällige Streuung (±10%), damit Accounts nicht synchron laufen
+    "idle_sleep_seconds": 60            # Maximale Wartezeit, bevor accounts.txt erneut geprüft wird
+}
+
+# Mehrere Worker-Prozesse mit gemeinsamem State-Store (--mode worker)
+SHARDING = {
+    "worker_id": None,                   # Eindeutige Kennung des Workers; None = Rechnername:PID
+    "heartbeat_interval_seconds": 15,    # Wie oft ein Worker sich als lebendig meldet und die Verteilung prüft
+    "worker_timeout_seconds": 60,        # Ohne Lebenszeichen gilt ein Worker danach als ausgefallen
+    "virtual_nodes": 64,                 # Punkte pro Worker auf dem Hash-Ring (gleichmäßigere Verteilung)
+    "claim_lease_seconds": 900,          # Beanspruchung eines Tweets verfällt nach dieser Zeit (abgestürzter Worker)
+    "share_telegram_limits": True        # Telegram-Sendelimits gleichmäßig auf die lebenden Worker aufteilen
+}
+
+# Aufzeichnung abgerufener Tweets und Wiedergabe für Lasttests (--record / --mode replay)
+TWEET_ARCHIVE = {
+    "record_file": None,   # gzip-JSONL-Archiv, an das jeder abgerufene Tweet angehängt wird (z.B. "tweets.jsonl.gz"); None = aus
+    "replay_file": None,   # Standard-Archiv für --mode replay
+    "replay_rate": None,   # Tweets pro Sekunde bei der Wiedergabe; None = ursprüngliche Abstände bzw. so schnell wie möglich
+    "replay_speed": None   # Zeitraffer für die ursprünglichen Abstände (60 = eine Stunde pro Minute); None = ohne Pausen
+}
+
+# Laufzeit- und Durchsatzmetriken pro Pipeline-Stufe
+METRICS = {
+    "enabled": True,
+    "prometheus_file": "metrics.prom",            # Prometheus-Textformat (z.B. für den node_exporter-Textfile-Collector); None = aus
+    "json_summary_file": "metrics_summary.json",  # JSON-Zusammenfassung am Ende jedes Laufs; None = aus
+    "http_port": None,                            # Port für einen /metrics-Endpunkt (auch per --metrics-port); None = aus
+    "http_host": "127.0.0.1",
+    "buckets": [0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120],  # Histogramm-Grenzen in Sekunden
+    "max_samples": 10000                          # Gespeicherte Messwerte pro Stufe für Perzentile in der JSON-Zusammenfassung
+}
+
+# Keyword-Erkennung für Tonalitäts-Waage und Qualitätsbewertung
+KEYWORD_MATCHING = {
+    "word_boundary": False  # True: nur ganze Wörter zählen ("ki" trifft dann nicht mehr "kirche")
+}
+
 # Tonalitäts-Waage für automatische Stil-Auswahl
 TONALITY_SCALE = {
     # Themen-Kategorien und ihre bevorzugten Stile
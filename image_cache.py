@@ -0,0 +1,124 @@
+# -*- coding: utf-8 -*-
+
+"""
+Lokaler Cache für mit DALL-E generierte Bilder.
+Die temporären OpenAI-URLs laufen ab, deshalb wird jedes generierte Bild einmal
+heruntergeladen und inhaltsadressiert gespeichert. Der Index (im State-Store) bildet
+(Modell, Größe, Qualität, Stil, Prompt) auf die lokale Datei ab. Die Telegram-file_id
+verwaltet telegram_media.py nach dem Bildinhalt.
+"""
+
+import os
+import re
+import json
+import time
+import hashlib
+
+from config import IMAGE_CACHE
+from state_store import get_state_store
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS image_cache (
+    cache_key        TEXT PRIMARY KEY,
+    file_path        TEXT NOT NULL,
+    content_hash     TEXT NOT NULL,
+    created_at       REAL NOT NULL,
+    last_used        REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_image_cache_file_path ON image_cache (file_path);
+CREATE INDEX IF NOT EXISTS idx_image_cache_last_used ON image_cache (last_used);
+"""
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_prompt(prompt):
+    """Normalisiert einen Prompt, damit Varianten mit anderer Schreibweise/Leerraum denselben Schlüssel ergeben."""
+    prompt = _WHITESPACE.sub(" ", (prompt or "").lower()).strip()
+    return prompt.rstrip(".!? ")
+
+
+def make_image_key(model, size, quality, style, prompt):
+    payload = json.dumps([model, size, quality, style, normalize_prompt(prompt)], ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ImageCache:
+    """Inhaltsadressierter Speicher für generierte Bilder."""
+
+    def __init__(self, directory=None, store=None, max_entries=None):
+        self.directory = directory or IMAGE_CACHE["directory"]
+        self.max_entries = max_entries if max_entries is not None else IMAGE_CACHE["max_entries"]
+        self.store = store or get_state_store()
+        self.store.ensure_schema(_SCHEMA)
+        os.makedirs(self.directory, exist_ok=True)
+
+    def lookup(self, cache_key):
+        """
+        Sucht ein zwischengespeichertes Bild.
+
+        Returns:
+            str: Pfad der lokalen Datei oder None, wenn nichts (mehr) vorhanden ist
+        """
+        row = self.store.execute(
+            "SELECT file_path FROM image_cache WHERE cache_key = ?", (cache_key,)
+        ).fetchone()
+        if not row:
+            return None
+        file_path = row[0]
+        if not os.path.exists(file_path):
+            self.store.execute("DELETE FROM image_cache WHERE cache_key = ?", (cache_key,))
+            return None
+        self.store.execute("UPDATE image_cache SET last_used = ? WHERE cache_key = ?", (time.time(), cache_key))
+        return file_path
+
+    def store_image(self, cache_key, image_bytes, extension=".png"):
+        """Speichert die Bilddaten unter ihrem Inhalts-Hash und gibt den Dateipfad zurück."""
+        content_hash = hashlib.sha256(image_bytes).hexdigest()
+        file_path = os.path.join(self.directory, content_hash + extension)
+        if not os.path.exists(file_path):
+            tmp_path = file_path + ".tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(image_bytes)
+            os.replace(tmp_path, file_path)
+        now = time.time()
+        self.store.execute(
+            "INSERT OR REPLACE INTO image_cache (cache_key, file_path, content_hash, created_at, last_used) "
+            "VALUES (?, ?, ?, ?, ?)",
+            (cache_key, file_path, content_hash, now, now)
+        )
+        self._evict()
+        return file_path
+
+    def is_cached_file(self, file_path):
+        row = self.store.execute("SELECT 1 FROM image_cache WHERE file_path = ? LIMIT 1", (file_path,)).fetchone()
+        return bool(row)
+
+    def _evict(self):
+        """Entfernt die am längsten nicht genutzten Einträge oberhalb von max_entries."""
+        count = self.store.execute("SELECT COUNT(*) FROM image_cache").fetchone()[0]
+        overflow = count - self.max_entries
+        if overflow <= 0:
+            return
+        rows = self.store.execute(
+            "SELECT cache_key, file_path FROM image_cache ORDER BY last_used ASC LIMIT ?", (overflow,)
+        ).fetchall()
+        for cache_key, file_path in rows:
+            self.store.execute("DELETE FROM image_cache WHERE cache_key = ?", (cache_key,))
+            # Datei nur löschen, wenn kein anderer Schlüssel darauf verweist
+            if not self.is_cached_file(file_path) and os.path.exists(file_path):
+                try:
+                    os.remove(file_path)
+                except OSError as e:
+                    print(f"Konnte Bild {file_path} nicht löschen: {e}")
+
+
+_cache = None
+
+
+def get_image_cache():
+    """Gibt den prozessweiten Bild-Cache zurück."""
+    global _cache
+    if _cache is None:
+        _cache = ImageCache()
+    return _cache
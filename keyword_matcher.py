@@ -0,0 +1,164 @@
+# -*- coding: utf-8 -*-
+
+"""
+Kompilierter Keyword-Matcher für Stil- und Qualitätsklassifizierung.
+Alle Keywords aller Kategorien werden einmal zu einem einzigen regulären Ausdruck in
+Trie-Form zusammengefasst ("ki(?:rche|)|..."), der den Text in einem Durchlauf absucht
+und die Treffer pro Kategorie zählt, statt für jedes Keyword eine eigene Teilstring-Suche
+zu starten.
+
+Ohne Wortgrenzen entspricht das Ergebnis genau `keyword.lower() in text.lower()` für jedes
+Keyword (auch überlappende Treffer und Keywords, die Präfix eines anderen sind, werden
+gezählt). Mit word_boundary=True zählen nur Treffer, die an Wortgrenzen beginnen und enden.
+"""
+
+import re
+import bisect
+
+# Trennzeichen für die Batch-Suche; kommt in Keywords nicht vor und gilt als Wortgrenze
+_BATCH_SEPARATOR = "\x00"
+_WORD_CHAR = re.compile(r"\w")
+# Bis zu dieser Anzahl Keywords sind einzelne Teilstring-Suchen schneller als der Regex-Durchlauf
+_DIRECT_SEARCH_MAX_KEYWORDS = 32
+
+
+def _trie_pattern(words):
+    """Erzeugt ein Regex-Muster in Trie-Form, das an jeder Position das längste Keyword bevorzugt."""
+    trie = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[""] = True
+
+    def _build(node):
+        end = "" in node
+        branches = [re.escape(char) + _build(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ""
+        if len(branches) == 1 and not end:
+            return branches[0]
+        # Längere Fortsetzungen zuerst, die leere Alternative (Wortende) zuletzt
+        return "(?:" + "|".join(branches) + ("|)" if end else ")")
+
+    return _build(trie)
+
+
+class KeywordMatcher:
+    """
+    Zählt Keyword-Treffer pro Kategorie in einem Durchlauf.
+
+    Args:
+        categories: Dictionary {Kategorie: [Keywords]}
+        word_boundary: Nur ganze Wörter bzw. Wortfolgen zählen
+    """
+
+    def __init__(self, categories, word_boundary=False):
+        self.word_boundary = word_boundary
+        self.categories = list(categories)
+        # Keyword -> Kategorien (mehrfach, wenn ein Keyword mehrfach in einer Liste steht)
+        self._keyword_categories = {}
+        for category, keywords in categories.items():
+            for keyword in keywords:
+                keyword = keyword.lower()
+                if keyword:
+                    self._keyword_categories.setdefault(keyword, []).append(category)
+
+        keywords = list(self._keyword_categories)
+        self._direct = keywords if not word_boundary and len(keywords) <= _DIRECT_SEARCH_MAX_KEYWORDS else None
+        # Kürzere Keywords, die an derselben Position ebenfalls passen (echte Präfixe)
+        self._prefixes = {}
+        for keyword in keywords:
+            prefixes = [other for other in keywords if other != keyword and keyword.startswith(other)]
+            if prefixes:
+                self._prefixes[keyword] = prefixes
+        if keywords:
+            pattern = _trie_pattern(keywords)
+            # Der Wortanfang wird beim Durchlauf geprüft, damit das Muster mit einem Literal beginnt
+            # und die Regex-Engine Positionen ohne passenden Anfangsbuchstaben überspringen kann
+            self._regex = re.compile(pattern + r"(?!\w)" if word_boundary else pattern)
+        else:
+            self._regex = None
+
+    def _is_word_char(self, text, position):
+        return 0 <= position < len(text) and _WORD_CHAR.match(text, position) is not None
+
+    def _scan(self, text, found_at):
+        """
+        Sucht alle (auch überlappenden) Treffer im kleingeschriebenen Text.
+        Nach jedem Treffer wird ab der nächsten Position weitergesucht; found_at(start, keyword)
+        wird für das längste Keyword an der Position und alle gültigen Präfixe aufgerufen.
+        """
+        search = self._regex.search
+        word_boundary = self.word_boundary
+        position = 0
+        while True:
+            match = search(text, position)
+            if match is None:
+                return
+            start = match.start()
+            position = start + 1
+            if word_boundary and self._is_word_char(text, start - 1):
+                continue
+            keyword = match.group()
+            found_at(start, keyword)
+            for prefix in self._prefixes.get(keyword, ()):
+                if not word_boundary or not self._is_word_char(text, start + len(prefix)):
+                    found_at(start, prefix)
+
+    def find_keywords(self, text):
+        """Gibt die Menge der im Text enthaltenen Keywords zurück."""
+        if self._regex is None or not text:
+            return set()
+        if self._direct is not None:
+            text = text.lower()
+            return {keyword for keyword in self._direct if keyword in text}
+        found = set()
+        self._scan(text.lower(), lambda start, keyword: found.add(keyword))
+        return found
+
+    def _count(self, keywords):
+        counts = {}
+        for keyword in keywords:
+            for category in self._keyword_categories[keyword]:
+                counts[category] = counts.get(category, 0) + 1
+        return counts
+
+    def count(self, text):
+        """
+        Zählt pro Kategorie, wie viele verschiedene Keywords im Text vorkommen.
+
+        Returns:
+            dict: {Kategorie: Anzahl}, nur Kategorien mit mindestens einem Treffer
+        """
+        return self._count(self.find_keywords(text))
+
+    def find_keywords_batch(self, texts):
+        """
+        Wie find_keywords für viele Texte; alle Texte werden in einem einzigen Regex-Durchlauf
+        über den zusammengefügten Text durchsucht.
+        """
+        texts = list(texts)
+        results = [set() for _ in texts]
+        if self._regex is None or not texts:
+            return results
+        if self._direct is not None:
+            return [self.find_keywords(text) for text in texts]
+        lowered = [(text or "").lower() for text in texts]
+        combined = _BATCH_SEPARATOR.join(lowered)
+        # Startposition jedes Textes im zusammengefügten Text
+        offsets = []
+        position = 0
+        for text in lowered:
+            offsets.append(position)
+            position += len(text) + len(_BATCH_SEPARATOR)
+
+        def _found_at(start, keyword):
+            results[bisect.bisect_right(offsets, start) - 1].add(keyword)
+
+        self._scan(combined, _found_at)
+        return results
+
+    def count_batch(self, texts):
+        """Wie count für viele Texte; gibt eine Liste von {Kategorie: Anzahl} zurück."""
+        return [self._count(found) for found in self.find_keywords_batch(texts)]
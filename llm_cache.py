@@ -0,0 +1,141 @@
+# -*- coding: utf-8 -*-
+
+"""
+Inhaltsadressierter Cache für LLM-Antworten (Zusammenfassungen).
+Schlüssel ist ein Hash aus Modell, Instruktions-Schlüssel, Hash der Systemanweisung
+und normalisiertem Text. Einträge laufen nach einer TTL ab; wird die maximale Größe
+überschritten, werden die am längsten nicht genutzten Einträge entfernt (LRU).
+"""
+
+import re
+import time
+import json
+import hashlib
+import threading
+import unicodedata
+
+from config import LLM_CACHE
+from state_store import get_state_store
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS llm_cache (
+    cache_key   TEXT PRIMARY KEY,
+    model       TEXT,
+    response    TEXT NOT NULL,
+    created_at  REAL NOT NULL,
+    last_access REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_llm_cache_last_access ON llm_cache (last_access);
+"""
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_text(text):
+    """Normalisiert Unicode und Leerraum, damit gleiche Inhalte denselben Schlüssel ergeben."""
+    text = unicodedata.normalize("NFC", text or "")
+    return _WHITESPACE.sub(" ", text).strip()
+
+
+def make_cache_key(model, instruction_key, system_instruction, text):
+    """
+    Erzeugt den Cache-Schlüssel.
+
+    Args:
+        model: Name des GPT-Modells
+        instruction_key: Schlüssel der Instruktion (z.B. "kritisch")
+        system_instruction: Vollständiger Anweisungstext (System- und Instruktionstext),
+            der als Hash in den Schlüssel eingeht
+        text: Der zusammenzufassende Text
+    """
+    system_hash = hashlib.sha256(system_instruction.encode("utf-8")).hexdigest()
+    payload = json.dumps([model, instruction_key, system_hash, normalize_text(text)], ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class LLMResponseCache:
+    """Persistenter LLM-Antwort-Cache mit TTL, LRU-Verdrängung und Trefferzählern."""
+
+    def __init__(self, store=None, ttl_seconds=None, max_entries=None, enabled=None):
+        self.store = store or get_state_store()
+        self.ttl_seconds = ttl_seconds if ttl_seconds is not None else LLM_CACHE["ttl_seconds"]
+        self.max_entries = max_entries if max_entries is not None else LLM_CACHE["max_entries"]
+        self.enabled = enabled if enabled is not None else LLM_CACHE["enabled"]
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self.store.ensure_schema(_SCHEMA)
+        self._size = self.store.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0]
+
+    def get(self, cache_key):
+        """Gibt die gespeicherte Antwort zurück oder None (zählt Treffer/Fehlschläge)."""
+        if not self.enabled:
+            return None
+        now = time.time()
+        row = self.store.execute(
+            "SELECT response, created_at FROM llm_cache WHERE cache_key = ?", (cache_key,)
+        ).fetchone()
+        if row and now - row[1] <= self.ttl_seconds:
+            self.store.execute("UPDATE llm_cache SET last_access = ? WHERE cache_key = ?", (now, cache_key))
+            with self._lock:
+                self.hits += 1
+            return row[0]
+        if row:
+            # Abgelaufenen Eintrag entfernen
+            self.store.execute("DELETE FROM llm_cache WHERE cache_key = ?", (cache_key,))
+            with self._lock:
+                self._size -= 1
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, cache_key, model, response):
+        """Speichert eine Antwort und verdrängt bei Bedarf die ältesten Einträge."""
+        if not self.enabled:
+            return
+        now = time.time()
+        cursor = self.store.execute(
+            "INSERT OR IGNORE INTO llm_cache (cache_key, model, response, created_at, last_access) VALUES (?, ?, ?, ?, ?)",
+            (cache_key, model, response, now, now)
+        )
+        if not cursor.rowcount:
+            self.store.execute(
+                "UPDATE llm_cache SET response = ?, created_at = ?, last_access = ? WHERE cache_key = ?",
+                (response, now, now, cache_key)
+            )
+            return
+        with self._lock:
+            self._size += 1
+            overflow = self._size - self.max_entries
+        if overflow > 0:
+            self._evict(overflow)
+
+    def _evict(self, count):
+        """Entfernt die `count` am längsten nicht genutzten Einträge."""
+        cursor = self.store.execute(
+            "DELETE FROM llm_cache WHERE cache_key IN "
+            "(SELECT cache_key FROM llm_cache ORDER BY last_access ASC LIMIT ?)",
+            (count,)
+        )
+        with self._lock:
+            self._size -= cursor.rowcount
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 3) if total else 0.0,
+            "entries": self._size
+        }
+
+
+_cache = None
+
+
+def get_llm_cache():
+    """Gibt den prozessweiten LLM-Antwort-Cache zurück."""
+    global _cache
+    if _cache is None:
+        _cache = LLMResponseCache()
+    return _cache
@@ -0,0 +1,74 @@
+# -*- coding: utf-8 -*-
+
+"""
+Gemeinsamer, asynchroner OpenAI-Client für Zusammenfassungen, Bild-Prompts und DALL-E.
+Der Client nutzt einen Verbindungspool, begrenzt die Anzahl gleichzeitiger Anfragen
+pro Modell und wartet bei Fehlern mit nicht-blockierendem exponentiellem Backoff.
+"""
+
+import asyncio
+
+from config import OPENAI_CLIENT, OPENAI_CONCURRENCY
+from clients import get_client
+from metrics import get_metrics
+
+# Semaphoren gehören zum Event-Loop, in dem sie erzeugt wurden
+_semaphore_loop = None
+_model_semaphores = {}
+
+
+def _reset_for_current_loop():
+    global _semaphore_loop, _model_semaphores
+    loop = asyncio.get_running_loop()
+    if _semaphore_loop is not loop:
+        _model_semaphores = {}
+        _semaphore_loop = loop
+
+
+def get_openai_client():
+    """
+    Gibt den gemeinsamen AsyncOpenAI-Client zurück (wird beim ersten Aufruf erzeugt, siehe clients.py).
+    Muss innerhalb eines laufenden Event-Loops aufgerufen werden.
+    """
+    return get_client("openai")
+
+
+def model_slot(model):
+    """Gibt das Semaphor zurück, das die gleichzeitigen Anfragen für ein Modell begrenzt."""
+    _reset_for_current_loop()
+    semaphore = _model_semaphores.get(model)
+    if semaphore is None:
+        limit = OPENAI_CONCURRENCY.get(model, OPENAI_CONCURRENCY["default"])
+        semaphore = asyncio.Semaphore(limit)
+        _model_semaphores[model] = semaphore
+    return semaphore
+
+
+async def with_retries(request_factory, model, max_retries=None, retry_delay=None):
+    """
+    Führt eine OpenAI-Anfrage mit begrenzter Parallelität pro Modell und Retry-Logik aus.
+
+    Args:
+        request_factory: Funktion ohne Argumente, die die Anfrage-Coroutine erzeugt
+        model: Modellname, bestimmt das Limit für gleichzeitige Anfragen
+        max_retries: Anzahl der Versuche (Standard aus OPENAI_CLIENT)
+        retry_delay: Anfangswartezeit in Sekunden, verdoppelt sich pro Versuch
+
+    Returns:
+        Die Antwort der API; nach dem letzten Fehlversuch wird die Exception weitergereicht
+    """
+    max_retries = max_retries or OPENAI_CLIENT["max_retries"]
+    retry_delay = retry_delay or OPENAI_CLIENT["retry_delay_seconds"]
+
+    for attempt in range(max_retries):
+        try:
+            async with model_slot(model):
+                return await request_factory()
+        except Exception as e:
+            if attempt >= max_retries - 1:
+                raise
+            print(f"Fehler bei OpenAI-Anfrage an {model} (Versuch {attempt+1}/{max_retries}): {e}")
+            get_metrics().count("openai", "retry", model)
+            # Backoff außerhalb des Semaphors, damit andere Anfragen weiterlaufen
+            await asyncio.sleep(retry_delay)
+            retry_delay *= 2  # Exponentielles Backoff
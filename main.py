@@ -6,138 +6,132 @@ import time
 import json
 import random
 import asyncio
+import signal
+import argparse
+import contextlib
 import hashlib
 import datetime
-import requests
-import httpx
-from urllib.parse import urlparse
-from bs4 import BeautifulSoup
-from dotenv import load_dotenv
-from openai import OpenAI
-from twscrape import API, gather
-from telegram import Bot, InputFile
-from telegram.constants import ParseMode
-from telegram.request import HTTPXRequest
 
 # Importiere Konfigurationsoptionen
 from config import (
     GPT_MODELS, GPT_INSTRUCTIONS, CUSTOM_SYSTEM_INSTRUCTION,
     DALLE_MODEL, DALLE_SIZE, DALLE_QUALITY, DALLE_STYLE, DALLE_PROMPTS,
     TWEET_QUALITY_THRESHOLD, MIN_ENGAGEMENT_TOTAL, MIN_LIKES,
-    NITTER_INSTANCES, DUPLICATE_DETECTION,
+    NITTER_INSTANCES, NITTER_FETCH,
     TONALITY_SCALE, MAX_ACCOUNTS_PER_RUN, MAX_TWEETS_PER_ACCOUNT,
-    DISABLE_IMAGE_GENERATION
+    DISABLE_IMAGE_GENERATION, STATE_STORE, PIPELINE, PIPELINE_CONCURRENCY,
+    POLL_SCHEDULE, KEYWORD_MATCHING, NEAR_DUPLICATE, TWEET_ARCHIVE, SHARDING, TOKEN_BUDGET,
+    STRUCTURED_SUMMARY, BATCH_SUMMARY
 )
-
-# ENV laden - mit absolutem Pfad zur .env-Datei
-env_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.env')
-print(f"Versuche .env-Datei zu laden von: {env_path}")
-if os.path.exists(env_path):
-    print(f".env-Datei gefunden: {env_path}")
-else:
-    print(f".env-Datei nicht gefunden: {env_path}")
-    
-# Erzwinge das Laden der .env-Datei mit override=True
-load_dotenv(dotenv_path=env_path, override=True)
-
-# Umgebungsvariablen laden
-TELEGRAM_BOT_TOKEN = os.getenv('TELEGRAM_BOT_TOKEN')
-OPENAI_API_KEY = os.getenv('OPENAI_API_KEY')
-TELEGRAM_CHANNEL_ID = os.getenv('TELEGRAM_CHANNEL_ID')
-
-# Twitter-Zugangsdaten aus .env laden
-TWITTER_USERNAME = os.getenv('TWITTER_USERNAME')
-TWITTER_PASSWORD = os.getenv('TWITTER_PASSWORD')
-TWITTER_EMAIL = os.getenv('TWITTER_EMAIL')
-TWITTER_EMAIL_PASSWORD = os.getenv('TWITTER_EMAIL_PASSWORD')
-
-# Debug-Ausgabe
-print(f"Geladene Konfiguration:")
-print(f"TELEGRAM_BOT_TOKEN: {'*' * 10 if TELEGRAM_BOT_TOKEN else 'Nicht geladen'}")
-print(f"TELEGRAM_CHANNEL_ID: {TELEGRAM_CHANNEL_ID if TELEGRAM_CHANNEL_ID else 'Nicht geladen'}")
-print(f"TWITTER_USERNAME: {TWITTER_USERNAME if TWITTER_USERNAME else 'Nicht geladen'}")
-print(f"TWITTER_PASSWORD: {'*' * 8 if TWITTER_PASSWORD else 'Nicht geladen'}")
-print(f"TWITTER_EMAIL: {TWITTER_EMAIL if TWITTER_EMAIL else 'Nicht geladen'}")
-print(f"TWITTER_EMAIL_PASSWORD: {'*' * 8 if TWITTER_EMAIL_PASSWORD else 'Nicht geladen'}")
-print(f"OPENAI_API_KEY: {'*' * 10 if OPENAI_API_KEY else 'Nicht geladen'}")
-
-# Fallback für fehlende Werte
-if not TWITTER_USERNAME or not TWITTER_PASSWORD or not TWITTER_EMAIL or not TWITTER_EMAIL_PASSWORD:
-    print("WARNUNG: Twitter-Zugangsdaten fehlen oder sind unvollständig!")
-
-# OpenAI API-Key wird automatisch aus der Umgebungsvariable geladen
-
-# Telegram-Bot mit angepassten Verbindungseinstellungen initialisieren
-request = HTTPXRequest(
-    connection_pool_size=8,  # Erhöhe die Pool-Größe (Standard ist 1)
-    read_timeout=30,         # Erhöhe das Read-Timeout
-    write_timeout=30,        # Erhöhe das Write-Timeout
-    connect_timeout=30       # Erhöhe das Connect-Timeout
+from state_store import get_state_store
+from sharding import WorkerShard, get_worker_id
+from tweet_record import Tweet, as_tweet
+from near_duplicates import get_near_duplicate_index
+from clients import get_client, get_setting, has_twitter_credentials, print_environment_status
+from llm_client import get_openai_client, with_retries
+from llm_cache import get_llm_cache, make_cache_key
+from image_cache import get_image_cache, make_image_key
+from batch_summaries import get_batch_queue
+from token_budget import (
+    get_token_usage, trim_to_tokens, output_budget, finish_truncated, usage_from_response
+)
+from structured_summary import (
+    StructuredResponseError, allowed_styles, build_schema, build_messages, response_format, parse_structured_response
 )
-bot = Bot(token=TELEGRAM_BOT_TOKEN, request=request)
+from telegram_media import prepare_photo, prepare_photos, upload_slot, remember_upload, forget_upload
+from nitter_health import get_nitter_health
+from nitter_parser import parse_nitter_timeline
+from poll_scheduler import get_poll_scheduler, latest_post_time
+from telegram_queue import get_telegram_queue, close_telegram_queue
+from keyword_matcher import KeywordMatcher
+from tweet_quality import evaluate_tweet_quality, evaluate_tweet_quality_batch
+from metrics import get_metrics, start_metrics_server
+from tweet_archive import get_tweet_archive, close_tweet_archive, replay_archive
 
-## Nitter-Instanzen werden aus der Konfigurationsdatei importiert
+# Alle externen Clients (Telegram-Bot, twscrape, OpenAI, HTTP) und die .env-Einstellungen werden
+# erst bei der ersten Verwendung über clients.py erzeugt bzw. geladen; der Import dieses Moduls
+# startet keine Verbindungen und gibt nichts aus
+
+def get_telegram_bot():
+    """Gibt den gemeinsamen Telegram-Bot zurück (wird beim ersten Senden erzeugt)."""
+    return get_client("telegram_bot")
 
-# Tweets scrapen via twscrape mit Nitter-Fallback
+def get_twitter_session():
+    """Gibt die gemeinsame twscrape-Sitzung zurück (wird beim ersten Abruf erzeugt)."""
+    return get_client("twitter_session")
 
-# Twitter API-Client initialisieren
-api = API()
+# Gemeinsamer Event-Loop für synchrone Aufrufer (statt asyncio.run bzw. neuem Loop pro Tweet)
+shared_loop = None
+
+def get_shared_loop():
+    """Gibt den persistenten Event-Loop für synchrone Wrapper-Funktionen zurück."""
+    global shared_loop
+    if shared_loop is None or shared_loop.is_closed():
+        shared_loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(shared_loop)
+    return shared_loop
+
+def run_sync(coro):
+    """Führt eine Coroutine im gemeinsamen Event-Loop aus und gibt ihr Ergebnis zurück."""
+    return get_shared_loop().run_until_complete(coro)
 
 # Funktion zum Initialisieren des API-Clients
 async def init_twitter_api():
+    """Stellt eine gültige twscrape-Sitzung sicher; ein Login erfolgt nur bei Bedarf."""
+    # Ohne Zugangsdaten wird twscrape gar nicht erst geladen
+    if not has_twitter_credentials():
+        return False
     try:
-        # Prüfen, ob bereits Accounts vorhanden sind
-        # In neueren twscrape-Versionen gibt es keine accounts() Methode direkt
-        # Wir fügen einfach den Account hinzu und prüfen später
-        try:
-            # Account hinzufügen
-            print("Füge Twitter-Account hinzu...")
-            await api.pool.add_account(
-                TWITTER_USERNAME,
-                TWITTER_PASSWORD,
-                TWITTER_EMAIL,
-                TWITTER_EMAIL_PASSWORD
-            )
-            print("Account hinzugefügt!")
-        except Exception as add_error:
-            # Wenn der Fehler "Account already exists" ist, ignorieren wir ihn
-            if "already exists" in str(add_error):
-                print("Account existiert bereits.")
-            else:
-                raise add_error
-                
-        # Einloggen
-        print("Logge in Twitter ein...")
-        await api.pool.login_all()
-        print("Login erfolgreich!")
+        return await get_twitter_session().ensure_ready()
     except Exception as e:
         print(f"Fehler beim Initialisieren des Twitter-API-Clients: {e}")
+        return False
 
 # Asynchrone Funktion zum Abrufen von Tweets via twscrape
-async def get_tweets_via_twscrape(username, count=10):
+async def get_tweets_via_twscrape(username, count=10, since_id=None):
+    """
+    Holt Tweets eines Benutzers via twscrape-Suche.
+    Mit since_id werden nur Tweets abgefragt, die neuer als die High-Water-Mark sind.
+    
+    Returns:
+        list: Gefilterte Tweets; None, wenn die Abfrage fehlgeschlagen ist
+    """
+    from twscrape import gather
+
+    metrics = get_metrics()
     try:
         # Tweets direkt mit dem Benutzernamen abrufen
+        tweets = None
+        started = time.perf_counter()
         try:
             # Versuche zuerst mit der search-Methode
             # Erhöhe das Limit, da wir später filtern werden
-            tweets = await gather(api.search(f"from:{username}", limit=count))
+            query = f"from:{username} since_id:{since_id}" if since_id else f"from:{username}"
+            session = get_twitter_session()
+            tweets = await session.call(lambda: gather(session.api.search(query, limit=count)))
+            metrics.record("fetch", "success", started, "twscrape")
             if tweets:
                 print(f"Erfolgreich {len(tweets)} Tweets für {username} via twscrape search abgerufen")
                 
                 # Tweets filtern und nur Hauptbeiträge mit ausreichendem Engagement zurückgeben
+                parse_started = time.perf_counter()
                 result = []
                 # Mindestanforderungen für Engagement aus der Konfiguration verwenden
                 min_engagement = MIN_ENGAGEMENT_TOTAL
                 min_likes = MIN_LIKES
                 
                 for tweet in tweets:
+                    # Bereits bekannte Tweets überspringen
+                    if since_id and int(tweet.id) <= int(since_id):
+                        continue
+                    
                     # Prüfen, ob es sich um eine Antwort handelt (beginnt mit @)
                     raw_content = getattr(tweet, "rawContent", "")
                     is_reply = raw_content.strip().startswith("@") if raw_content else False
                     
                     # Prüfen, ob es eine Antwort auf einen anderen Tweet ist
-                    in_reply_to_status_id = getattr(tweet, "inReplyToStatusId", None)
-                    in_reply_to_user_id = getattr(tweet, "inReplyToUserId", None)
+                    in_reply_to_status_id = getattr(tweet, "inReplyToTweetId", None) or getattr(tweet, "inReplyToStatusId", None)
+                    in_reply_to_user_id = getattr(tweet, "inReplyToUser", None) or getattr(tweet, "inReplyToUserId", None)
                     
                     # Überspringe Antworten auf andere Tweets
                     if is_reply or in_reply_to_status_id or in_reply_to_user_id:
@@ -154,291 +148,499 @@ async def get_tweets_via_twscrape(username, count=10):
                     if total_engagement < min_engagement or likes < min_likes:
                         continue
                     
-                    tweet_data = {
-                        "id": tweet.id,
-                        "text": raw_content,
-                        "date": tweet.date,
-                        "images": [],
-                        "url": f"https://twitter.com/{username}/status/{tweet.id}",
-                        "likes": likes,
-                        "retweets": retweets,
-                        "replies": replies,
-                        "quotes": quotes,
-                        "engagement_total": total_engagement
-                    }
+                    tweet_data = Tweet(
+                        id=str(tweet.id),
+                        text=raw_content,
+                        username=username,
+                        url=f"https://twitter.com/{username}/status/{tweet.id}",
+                        date=tweet.date,
+                        likes=likes,
+                        retweets=retweets,
+                        replies=replies,
+                        quotes=quotes,
+                        source="twscrape"
+                    )
                     
-                    # Bilder extrahieren, wenn vorhanden
-                    if hasattr(tweet, "media") and tweet.media:
+                    # Bilder und Video-Vorschaubilder extrahieren, wenn vorhanden
+                    media = getattr(tweet, "media", None)
+                    if media:
                         try:
-                            # Überprüfen, ob media ein iterierbares Objekt ist
-                            media_items = tweet.media if hasattr(tweet.media, "__iter__") else [tweet.media]
-                            
-                            for media in media_items:
-                                if hasattr(media, "url") and media.url:
-                                    tweet_data["images"].append(media.url)
-                                elif hasattr(media, "previewUrl") and media.previewUrl:
-                                    tweet_data["images"].append(media.previewUrl)
+                            tweet_data.images.extend(photo.url for photo in getattr(media, "photos", []) if photo.url)
+                            tweet_data.video_thumbnails.extend(
+                                video.thumbnailUrl
+                                for video in list(getattr(media, "videos", [])) + list(getattr(media, "animated", []))
+                                if video.thumbnailUrl
+                            )
                         except Exception as media_error:
                             print(f"Fehler beim Extrahieren der Medien: {media_error}")
                             # Fahre fort, auch wenn die Medien nicht extrahiert werden können
                     
                     result.append(tweet_data)
+                metrics.record("parse", "success", parse_started, "twscrape")
                 return result
         except Exception as inner_e:
             print(f"Fehler beim Abrufen der Tweets mit search: {inner_e}")
+            if tweets is None:
+                metrics.record("fetch", "failure", started, "twscrape")
+            else:
+                metrics.record("parse", "failure", source="twscrape")
             # Hier könnte man alternative API-Methoden versuchen
+            return None
             
         return []
     except Exception as e:
         print(f"Fehler beim Abrufen von Tweets für {username} via twscrape: {e}")
-        return []
+        return None
 
-# Funktion zum Abrufen von Tweets via Nitter (Fallback)
-def get_tweets_via_nitter(username, count=3):
-    print(f"Versuche, Tweets für {username} via Nitter zu holen...")
-    tried_redirects = set()
-    for base_url in NITTER_INSTANCES:
-        url = f"{base_url}/{username}"
-        try:
-            r = httpx.get(url, timeout=10, follow_redirects=False)
-            # Folge Redirects (302) automatisch, wenn Ziel noch nicht versucht wurde
-            if r.status_code == 302 and 'location' in r.headers:
-                redirect_url = r.headers['location']
-                if redirect_url not in tried_redirects:
-                    print(f"Redirect von {base_url} auf {redirect_url}, folge weiter...")
-                    tried_redirects.add(redirect_url)
-                    try:
-                        r2 = httpx.get(redirect_url, timeout=10)
-                        r2.raise_for_status()
-                        soup = BeautifulSoup(r2.text, "html.parser")
-                        return extract_tweets_from_nitter(soup, username, count, redirect_url)
-                    except Exception as e2:
-                        print(f"Fehler beim Folgen von Redirect {redirect_url}: {e2}")
-                        continue
-                continue
-            if r.status_code == 429:
-                print(f"Rate Limit bei {base_url}, versuche nächste Instanz...")
-                continue
-            r.raise_for_status()
-            soup = BeautifulSoup(r.text, "html.parser")
-            return extract_tweets_from_nitter(soup, username, count, base_url)
-        except Exception as e:
-            print(f"Fehler bei {base_url} für {username}: {e}")
-            continue
-    print(f"Keine funktionierende Nitter-Instanz für {username} gefunden.")
-    return []
+# Fehler für Rate-Limits einer Nitter-Instanz (wird im Health-Tracker gesondert gewertet)
+class NitterRateLimitError(RuntimeError):
+    pass
 
-# Hilfsfunktion zum Extrahieren von Tweets und Bildern aus Nitter HTML
-def extract_tweets_from_nitter(soup, username, count=3, base_url=None):
-    result = []
-    # Finde alle Tweet-Container
-    tweet_containers = soup.find_all("div", {"class": "timeline-item"})
-    
-    # Mehr Container durchsuchen, da wir filtern werden
-    max_containers = min(len(tweet_containers), count * 3)
+# Lädt die Timeline-Seite einer Nitter-Instanz (inkl. eines Redirects)
+async def fetch_nitter_timeline(base_url, username):
+    """
+    Ruft die Timeline eines Benutzers von einer Nitter-Instanz ab.
     
-    for container in tweet_containers[:max_containers]:
-        tweet_data = {"text": "", "images": [], "url": ""}
+    Returns:
+        tuple: (HTML-Text, Basis-URL der tatsächlich gelieferten Seite)
         
-        # Tweet-ID und URL extrahieren
-        tweet_link = container.find("a", {"class": "tweet-link"})
-        if tweet_link and tweet_link.has_attr("href"):
-            tweet_path = tweet_link["href"]
-            # Tweet-ID aus dem Pfad extrahieren
-            tweet_id = tweet_path.split("/")[-1]
-            tweet_data["id"] = tweet_id
+    Raises:
+        Exception: bei Rate-Limit, HTTP-Fehlern oder Seiten ohne Timeline
+    """
+    client = get_client("nitter_http")
+    r = await client.get(f"{base_url}/{username}")
+    page_url = base_url
+    # Folge Redirects (302) einmal, wenn das Ziel eine andere URL ist
+    if r.status_code == 302 and 'location' in r.headers:
+        redirect_url = r.headers['location']
+        print(f"Redirect von {base_url} auf {redirect_url}, folge weiter...")
+        r = await client.get(redirect_url)
+        page_url = redirect_url
+    if r.status_code == 429:
+        raise NitterRateLimitError(f"Rate Limit bei {base_url}")
+    r.raise_for_status()
+    if "timeline-item" not in r.text:
+        raise ValueError(f"Keine Timeline in der Antwort von {base_url}")
+    return r.text, page_url
+
+# Funktion zum Abrufen von Tweets via Nitter (Fallback) mit gestaffelten, parallelen Anfragen
+async def get_tweets_via_nitter_async(username, count=3, since_id=None):
+    """
+    Fragt mehrere Nitter-Instanzen gleichzeitig bzw. gestaffelt an (Hedging),
+    verwendet die erste gültige Timeline und bricht die übrigen Anfragen ab.
+    
+    Es laufen höchstens NITTER_FETCH["hedge_width"] Anfragen gleichzeitig; alle
+    NITTER_FETCH["stagger_seconds"] oder sobald eine Anfrage scheitert, startet die nächste.
+    Insgesamt wird pro Account höchstens NITTER_FETCH["account_budget_seconds"] gewartet.
+    Die Reihenfolge der Instanzen bestimmt der persistente Health-Tracker; Instanzen mit
+    offenem Circuit Breaker werden übersprungen. Mit since_id bricht das Parsen beim ersten
+    bereits bekannten Tweet ab.
+    
+    Returns:
+        list: Tweets (leer, wenn es nichts Neues gibt) oder None, wenn keine Instanz eine Timeline lieferte
+    """
+    print(f"Versuche, Tweets für {username} via Nitter zu holen...")
+    metrics = get_metrics()
+    started = time.perf_counter()
+    loop = asyncio.get_running_loop()
+    health = get_nitter_health(NITTER_INSTANCES)
+    instances = health.ranked_instances()
+    hedge_width = max(1, NITTER_FETCH["hedge_width"])
+    stagger = NITTER_FETCH["stagger_seconds"]
+    deadline = loop.time() + NITTER_FETCH["account_budget_seconds"]
+    
+    pending = {}
+    next_index = 0
+    last_launch = None
+    try:
+        while pending or next_index < len(instances):
+            now = loop.time()
+            if now >= deadline:
+                print(f"Zeitbudget für Nitter-Abruf von {username} erschöpft.")
+                break
             
-            # URL erstellen
-            if base_url and tweet_path.startswith("/"):
-                parsed_url = urlparse(base_url)
-                tweet_data["url"] = f"{parsed_url.scheme}://{parsed_url.netloc}{tweet_path}"
-            else:
-                # Fallback auf Standard-Twitter-URL
-                tweet_data["url"] = f"https://twitter.com/{username}/status/{tweet_id}"
-        
-        # Text extrahieren
-        content_div = container.find("div", {"class": "tweet-content"})
-        if content_div:
-            tweet_text = content_div.get_text(strip=True)
-            tweet_data["text"] = tweet_text
+            # Neue Anfrage starten: sofort, wenn nichts läuft, sonst nach Ablauf der Staffelung
+            while (next_index < len(instances) and len(pending) < hedge_width
+                   and (not pending or last_launch is None or now - last_launch >= stagger)):
+                base_url = instances[next_index]
+                next_index += 1
+                pending[asyncio.ensure_future(fetch_nitter_timeline(base_url, username))] = (base_url, now)
+                last_launch = now
             
-            # Prüfen, ob es sich um eine Antwort handelt (beginnt mit @)
-            if tweet_text.startswith("@"):
-                continue  # Überspringe Antworten
-        
-        # Bilder extrahieren
-        images = container.find_all("a", {"class": "still-image"})
-        for img in images:
-            img_src = img.find("img")
-            if img_src and img_src.has_attr("src"):
-                # Vollständige URL erstellen
-                img_url = img_src["src"]
-                if img_url.startswith("/") and base_url:
-                    # Relative URL in absolute umwandeln mit dem bekannten base_url
-                    parsed_url = urlparse(base_url)
-                    img_url = f"{parsed_url.scheme}://{parsed_url.netloc}{img_url}"
-                tweet_data["images"].append(img_url)
-        
-        # Engagement-Metriken extrahieren (falls verfügbar)
-        tweet_stats = container.find("div", {"class": "tweet-stats"})
-        likes = 0
-        retweets = 0
-        replies = 0
-        
-        if tweet_stats:
-            # Likes extrahieren
-            likes_span = tweet_stats.find("span", {"class": "icon-heart"})
-            if likes_span and likes_span.parent and likes_span.parent.get_text():
-                likes_text = likes_span.parent.get_text().strip()
-                try:
-                    likes = int(likes_text.replace(',', ''))
-                except ValueError:
-                    pass
+            timeout = deadline - now
+            if next_index < len(instances) and len(pending) < hedge_width:
+                timeout = min(timeout, max(0.0, stagger - (now - last_launch)))
+            done, _ = await asyncio.wait(pending.keys(), timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
             
-            # Retweets extrahieren
-            retweets_span = tweet_stats.find("span", {"class": "icon-retweet"})
-            if retweets_span and retweets_span.parent and retweets_span.parent.get_text():
-                retweets_text = retweets_span.parent.get_text().strip()
+            for task in done:
+                base_url, started_at = pending.pop(task)
+                latency = loop.time() - started_at
                 try:
-                    retweets = int(retweets_text.replace(',', ''))
-                except ValueError:
-                    pass
-            
-            # Antworten extrahieren
-            replies_span = tweet_stats.find("span", {"class": "icon-comment"})
-            if replies_span and replies_span.parent and replies_span.parent.get_text():
-                replies_text = replies_span.parent.get_text().strip()
-                try:
-                    replies = int(replies_text.replace(',', ''))
-                except ValueError:
-                    pass
-        
-        # Engagement-Metriken zum Tweet-Daten-Dictionary hinzufügen
-        tweet_data["likes"] = likes
-        tweet_data["retweets"] = retweets
-        tweet_data["replies"] = replies
-        tweet_data["quotes"] = 0  # Nitter zeigt keine Quote-Tweets an
-        tweet_data["engagement_total"] = likes + retweets + replies
-        
-        # Mindestanforderungen für Engagement aus der Konfiguration verwenden
-        min_engagement = MIN_ENGAGEMENT_TOTAL
-        min_likes = MIN_LIKES
-        
-        # Überspringe Tweets mit zu geringem Engagement
-        if tweet_data["engagement_total"] < min_engagement or tweet_data["likes"] < min_likes:
-            continue
-        
-        if tweet_data["text"]:
-            result.append(tweet_data)
-            # Wenn wir genug qualitativ hochwertige Tweets haben, brechen wir ab
-            if len(result) >= count:
-                break
-    
-    if result:
-        print(f"Erfolgreich {len(result)} Tweets für {username} via Nitter abgerufen")
+                    html, page_url = task.result()
+                except NitterRateLimitError as e:
+                    print(f"{e}, versuche nächste Instanz...")
+                    health.record_rate_limited(base_url)
+                    last_launch = None
+                    continue
+                except Exception as e:
+                    print(f"Fehler bei {base_url} für {username}: {e}")
+                    health.record_failure(base_url, latency)
+                    # Nächste Instanz sofort starten statt die Staffelung abzuwarten
+                    last_launch = None
+                    continue
+                health.record_success(base_url, latency)
+                # Nicht die erste Instanz der Rangfolge: Ausweichen auf eine andere Instanz
+                metrics.record("fetch", "success" if base_url == instances[0] else "fallback", started, "nitter")
+                # Parsen außerhalb des Event-Loops, damit andere Accounts weiterlaufen
+                with metrics.timer("parse", "nitter"):
+                    return await asyncio.to_thread(parse_nitter_timeline, html, username, count, page_url, since_id=since_id)
+    finally:
+        for task in pending:
+            task.cancel()
     
-    return result
+    print(f"Keine funktionierende Nitter-Instanz für {username} gefunden.")
+    metrics.record("fetch", "failure", started, "nitter")
+    return None
+
+def get_tweets_via_nitter(username, count=3, since_id=None):
+    """Synchroner Wrapper für get_tweets_via_nitter_async."""
+    return run_sync(get_tweets_via_nitter_async(username, count, since_id))
 
 # Hybrid-Funktion zum Abrufen von Tweets (erst twscrape, dann Nitter als Fallback)
-def get_latest_tweets(username, count=3):
-    """Holt die neuesten Tweets eines Benutzers."""
+async def get_latest_tweets_async(username, count=3, use_high_water_mark=True):
+    """
+    Holt die neuesten Tweets eines Benutzers im laufenden Event-Loop.
+    Standardmäßig werden nur Tweets abgefragt, die neuer als die gespeicherte
+    High-Water-Mark des Accounts sind (siehe update_high_water_mark).
+    
+    Returns:
+        list: Tweets oder None, wenn weder twscrape noch eine Nitter-Instanz erreichbar war
+    """
+    since_id = get_dedup_store().get_high_water_mark(username) if use_high_water_mark else None
     try:
         print(f"Versuche, Tweets für {username} via twscrape zu holen...")
-        # Initialisiere API, falls nötig
-        asyncio.run(init_twitter_api())
-        # Tweets abrufen - Erhöhe die Anzahl wegen Filterung
-        fetch_count = max(10, count * 5)  # Mindestens 10 oder 5x die gewünschte Anzahl
-        tweets = asyncio.run(get_tweets_via_twscrape(username, fetch_count))
-        if tweets:
-            return tweets
+        # Initialisiere API, falls nötig (ohne gültige Sitzung direkt zu Nitter)
+        if await init_twitter_api():
+            # Tweets abrufen - Erhöhe die Anzahl wegen Filterung
+            fetch_count = max(10, count * 5)  # Mindestens 10 oder 5x die gewünschte Anzahl
+            tweets = await get_tweets_via_twscrape(username, fetch_count, since_id)
+            # Mit High-Water-Mark ist ein leeres Ergebnis kein Fehler, sondern "nichts Neues"
+            if tweets or (tweets is not None and since_id):
+                return archive_fetched_tweets(username, tweets)
     except Exception as e:
         print(f"Fehler beim Abrufen von Tweets für {username} via twscrape: {e}")
     
     # Wenn twscrape fehlschlägt, versuche es mit Nitter
     print(f"twscrape fehlgeschlagen für {username}, versuche Nitter als Fallback...")
-    return get_tweets_via_nitter(username, count)
+    get_metrics().count("fetch", "fallback", "twscrape")
+    return archive_fetched_tweets(username, await get_tweets_via_nitter_async(username, count, since_id))
+
+def archive_fetched_tweets(username, tweets):
+    """Hängt abgerufene Tweets an das Aufnahme-Archiv an, falls aufgezeichnet wird (siehe tweet_archive)."""
+    archive = get_tweet_archive()
+    if archive and tweets:
+        try:
+            archive.write(username, tweets)
+        except Exception as e:
+            print(f"Fehler beim Aufzeichnen der Tweets von {username}: {e}")
+    return tweets
+
+def get_latest_tweets(username, count=3):
+    """Holt die neuesten Tweets eines Benutzers."""
+    return run_sync(get_latest_tweets_async(username, count))
+
+# Speichert die neueste verarbeitete Tweet-ID eines Accounts
+def update_high_water_mark(username, tweets, failed_ids=()):
+    """
+    Setzt die High-Water-Mark auf die neueste ID der übergebenen (verarbeiteten) Tweets.
+    Neue Tweets, die am Engagement-Filter scheitern, liegen darüber und werden beim
+    nächsten Lauf erneut geprüft.
+    Tweets, die gerade ein anderer Worker verarbeitet, begrenzen die Mark nach oben: fällt
+    dieser Worker aus, ruft der neue Besitzer des Accounts sie erneut ab. Ebenso Tweets, deren
+    Zusammenfassung oder Versand fehlgeschlagen ist (failed_ids), damit der nächste Lauf sie erneut abruft.
+    """
+    tweet_ids = [int(tweet.id) for tweet in tweets if tweet.id.isdigit()]
+    if not tweet_ids:
+        return
+    store = get_dedup_store()
+    pending = store.claimed_elsewhere(tweet_ids, get_worker_id()) | {str(tweet_id) for tweet_id in failed_ids}
+    if pending:
+        tweet_ids = [tweet_id for tweet_id in tweet_ids if tweet_id < min(int(p) for p in pending)]
+    if tweet_ids:
+        store.set_high_water_mark(username, max(tweet_ids))
 
 # Konfiguration wurde bereits am Anfang des Skripts importiert
 
+# Systemanweisung für die Generierung von DALL-E Prompts
+IMAGE_PROMPT_SYSTEM_INSTRUCTION = (
+    "Du bist ein Experte für die Erstellung von DALL-E Prompts. "
+    "Erstelle einen kurzen, prägnanten Prompt (max. 60 Wörter) für DALL-E, "
+    "der den Inhalt des Tweets visuell darstellt. "
+    "Der Prompt sollte satirisch, überspitzt und visuell interessant sein. "
+    "Verwende keine Hashtags oder @-Erwähnungen. "
+    "Antworte NUR mit dem Prompt, ohne Einleitung oder Erklärung."
+)
+
+# Chat-Anfrage einer Zusammenfassung (direkter Aufruf und Batch-API)
+def build_summary_request(text, model_key="default", instruction_key="default", max_chars=None):
+    """
+    Baut die Anfrage für eine Zusammenfassung.
+    
+    Der Tweet-Text wird auf TOKEN_BUDGET["max_input_tokens"] gekürzt; mit max_chars (Platz
+    in der Telegram-Nachricht, siehe summary_char_budget) wird auch die Antwort begrenzt.
+    
+    Returns:
+        dict: model, messages, max_tokens (oder None), max_chars und cache_key
+    """
+    model = GPT_MODELS.get(model_key, GPT_MODELS["default"])
+    # Instruktion auswählen
+    instruction = GPT_INSTRUCTIONS.get(instruction_key, GPT_INSTRUCTIONS["default"])
+    
+    # Antwortlänge an den Platz in der Nachricht anpassen
+    max_tokens = None
+    if max_chars:
+        max_chars, max_tokens = output_budget(max_chars)
+        if TOKEN_BUDGET["length_hint"]:
+            instruction = f"{instruction} Antworte mit höchstens {max_chars} Zeichen."
+    
+    # Sehr lange Tweets (z.B. lange Posts mit X Premium) auf das Eingabebudget kürzen
+    text = trim_to_tokens(text, TOKEN_BUDGET["max_input_tokens"], model)
+    
+    # Prompt erstellen mit benutzerdefinierter Systemanweisung
+    messages = [
+        {"role": "system", "content": CUSTOM_SYSTEM_INSTRUCTION},
+        {"role": "user", "content": f"{instruction}\n\n{text}"}
+    ]
+    prompt_settings = f"{CUSTOM_SYSTEM_INSTRUCTION}\n{instruction}"
+    if max_tokens:
+        prompt_settings += f"\nmax_tokens={max_tokens}"
+    return {
+        "model": model,
+        "messages": messages,
+        "max_tokens": max_tokens,
+        "max_chars": max_chars,
+        "cache_key": make_cache_key(model, instruction_key, prompt_settings, text),
+    }
+
+def finish_summary(request, completion, account=None, instruction_key="default", stage="summarize", cache=None):
+    """
+    Liest die Zusammenfassung aus einer Chat-Antwort, erfasst den Token-Verbrauch und legt sie im Cache ab.
+    
+    Args:
+        request: Ergebnis von build_summary_request
+        completion: Antwort der API (ChatCompletion)
+        stage: Stufe für die Verbrauchserfassung (summarize oder batch)
+        cache: Optional, LLM-Cache für die Antwort
+        
+    Returns:
+        str: Die Zusammenfassung (leer, wenn die Antwort keinen Text enthält)
+    """
+    prompt_tokens, completion_tokens, estimated = usage_from_response(completion, request["messages"], request["model"])
+    get_token_usage().record(stage, request["model"], prompt_tokens, completion_tokens,
+                             account=account, style=instruction_key, estimated=estimated)
+    summary = (completion.choices[0].message.content or "").strip()
+    # Bei max_tokens abgebrochene oder zu lange Antworten am letzten vollständigen Satz beenden
+    if summary and completion.choices[0].finish_reason == "length":
+        summary = finish_truncated(summary)
+    max_chars = request["max_chars"]
+    if max_chars and len(summary) > max_chars:
+        summary = finish_truncated(summary[:max_chars - 1])
+    if cache and summary:
+        cache.put(request["cache_key"], request["model"], summary)
+    return summary
+
 # Zusammenfassen mit benutzerdefinierten GPT-Modellen und Instruktionen
-def summarize_text(text, model_key="default", instruction_key="default"):
+async def summarize_text_async(text, model_key="default", instruction_key="default", use_cache=True,
+                               account=None, max_chars=None):
+    """
+    Erstellt eine KI-Zusammenfassung über den gemeinsamen AsyncOpenAI-Client.
+    Gleichzeitige Anfragen pro Modell sind über OPENAI_CONCURRENCY begrenzt,
+    das Backoff bei Fehlern blockiert den Event-Loop nicht.
+    Bereits erzeugte Zusammenfassungen werden aus dem LLM-Cache geliefert,
+    solange use_cache nicht False ist.
+    
+    Eingabe und Antwortlänge werden über build_summary_request begrenzt; der
+    Token-Verbrauch wird pro Account und Stil (instruction_key) erfasst.
+    """
+    started = time.perf_counter()
+    model = GPT_MODELS.get(model_key, GPT_MODELS["default"])
     try:
-        # Modell und Instruktion auswählen
-        model = GPT_MODELS.get(model_key, GPT_MODELS["default"])
-        instruction = GPT_INSTRUCTIONS.get(instruction_key, GPT_INSTRUCTIONS["default"])
-        
-        # Prompt erstellen mit benutzerdefinierter Systemanweisung
-        user_prompt = f"{instruction}\n\n{text}"
+        request = build_summary_request(text, model_key, instruction_key, max_chars)
         
         print(f"Verwende Modell: {model} mit Instruktion: {instruction_key}")
         
-        # API-Aufruf mit Fehlerbehandlung und Retry-Logik
-        max_retries = 3
-        retry_delay = 2  # Sekunden
+        # Im Cache nachsehen (z.B. nach Crash, Repost oder Cross-Post desselben Texts)
+        cache = get_llm_cache() if use_cache else None
+        if cache:
+            cached_summary = cache.get(request["cache_key"])
+            if cached_summary:
+                print(f"Zusammenfassung aus dem Cache verwendet (Modell: {model})")
+                get_metrics().record("summarize", "cached", started, model)
+                return cached_summary
         
-        for attempt in range(max_retries):
-            try:
-                client = OpenAI()
-                completion = client.chat.completions.create(
-                    model=model,
-                    messages=[
-                        {"role": "system", "content": CUSTOM_SYSTEM_INSTRUCTION},
-                        {"role": "user", "content": user_prompt}
-                    ]
-                )
-                return completion.choices[0].message.content.strip()
-            except Exception as e:
-                if attempt < max_retries - 1:
-                    print(f"Fehler bei OpenAI-Anfrage (Versuch {attempt+1}/{max_retries}): {e}")
-                    time.sleep(retry_delay)
-                    retry_delay *= 2  # Exponentielles Backoff
-                else:
-                    print(f"Alle Versuche fehlgeschlagen: {e}")
-                    return f"[Zusammenfassung nicht möglich: {str(e)}]"  # Fallback-Nachricht
+        # API-Aufruf mit Fehlerbehandlung und Retry-Logik
+        options = {"max_tokens": request["max_tokens"]} if request["max_tokens"] else {}
+        completion = await with_retries(
+            lambda: get_openai_client().chat.completions.create(model=model, messages=request["messages"], **options),
+            model
+        )
+        summary = finish_summary(request, completion, account, instruction_key, cache=cache)
+        get_metrics().record("summarize", "success" if summary else "failure", started, model)
+        return summary
     except Exception as e:
         print(f"Fehler beim Zusammenfassen: {e}")
+        get_metrics().record("summarize", "failure", started, model)
         return f"[Zusammenfassung nicht möglich: {str(e)}]"  # Fallback-Nachricht
 
+def summarize_text(text, model_key="default", instruction_key="default", use_cache=True, account=None, max_chars=None):
+    """Synchroner Wrapper für summarize_text_async."""
+    return run_sync(summarize_text_async(text, model_key, instruction_key, use_cache, account, max_chars))
+
 # Funktion zur Generierung eines Bild-Prompts basierend auf dem Tweet-Text
-def generate_image_prompt(tweet_text, summary):
+async def generate_image_prompt_async(tweet_text, summary, account=None):
     """
     Generiert einen Prompt für die Bildgenerierung basierend auf dem Tweet-Text und der Zusammenfassung.
     
     Args:
         tweet_text: Der Text des Tweets
         summary: Die generierte Zusammenfassung
+        account: Optional, Account für die Verbrauchserfassung
         
     Returns:
         str: Ein Prompt für die Bildgenerierung oder None, wenn kein Prompt generiert werden konnte
     """
+    # Verwende OpenAI, um einen Bildprompt zu generieren
+    model = "gpt-3.5-turbo"
+    started = time.perf_counter()
     try:
         # Kombiniere Tweet-Text und Zusammenfassung für besseren Kontext
-        combined_text = f"{tweet_text}\n\n{summary}"
+        combined_text = f"{trim_to_tokens(tweet_text, TOKEN_BUDGET['max_input_tokens'], model)}\n\n{summary}"
+        messages = [
+            {"role": "system", "content": IMAGE_PROMPT_SYSTEM_INSTRUCTION},
+            {"role": "user", "content": combined_text}
+        ]
         
-        # Verwende OpenAI, um einen Bildprompt zu generieren
-        client = OpenAI()
-        completion = client.chat.completions.create(
-            model="gpt-3.5-turbo",
-            messages=[
-                {"role": "system", "content": "Du bist ein Experte für die Erstellung von DALL-E Prompts. "
-                                      "Erstelle einen kurzen, prägnanten Prompt (max. 60 Wörter) für DALL-E, "
-                                      "der den Inhalt des Tweets visuell darstellt. "
-                                      "Der Prompt sollte satirisch, überspitzt und visuell interessant sein. "
-                                      "Verwende keine Hashtags oder @-Erwähnungen. "
-                                      "Antworte NUR mit dem Prompt, ohne Einleitung oder Erklärung."},
-                {"role": "user", "content": combined_text}
-            ],
-            max_tokens=100
+        completion = await with_retries(
+            lambda: get_openai_client().chat.completions.create(model=model, messages=messages, max_tokens=100),
+            model
         )
+        prompt_tokens, completion_tokens, estimated = usage_from_response(completion, messages, model)
+        get_token_usage().record("image_prompt", model, prompt_tokens, completion_tokens,
+                                 account=account, estimated=estimated)
         
         prompt = completion.choices[0].message.content.strip()
+        get_metrics().record("image_prompt", "success" if prompt else "failure", started, model)
         return prompt
     except Exception as e:
         print(f"Fehler bei der Generierung des Bild-Prompts: {e}")
+        get_metrics().record("image_prompt", "failure", started, model)
         return None
 
+def generate_image_prompt(tweet_text, summary, account=None):
+    """Synchroner Wrapper für generate_image_prompt_async."""
+    return run_sync(generate_image_prompt_async(tweet_text, summary, account))
+
+# Ein Aufruf für Zusammenfassung, Kommentarstil und Bild-Prompt (STRUCTURED_SUMMARY)
+async def summarize_structured_async(text, model_key="default", suggested_style="default", use_cache=True,
+                                     account=None, max_chars=None, with_image_prompt=True):
+    """
+    Erzeugt Zusammenfassung, Kommentarstil und DALL-E-Prompt mit einem JSON-Aufruf
+    (siehe structured_summary.py) statt mit summarize_text_async und generate_image_prompt_async.
+    
+    Args:
+        text: Der Tweet-Text
+        model_key: Schlüssel in GPT_MODELS
+        suggested_style: Stil der Tonalitäts-Waage, wird dem Modell als Vorschlag übergeben
+        use_cache: False = LLM-Cache umgehen
+        account: Optional, Account für die Verbrauchserfassung
+        max_chars: Optional, Platz für die Zusammenfassung in der Telegram-Nachricht
+        with_image_prompt: True, wenn zusätzlich ein DALL-E-Prompt erzeugt werden soll
+        
+    Returns:
+        dict: {"summary", "style", "image_prompt"} oder None, wenn der Aufruf fehlschlägt oder die
+              Antwort ungültig ist; der Aufrufer verwendet dann den bisherigen Ablauf
+    """
+    started = time.perf_counter()
+    model = GPT_MODELS.get(model_key, GPT_MODELS["default"])
+    styles = allowed_styles(suggested_style)
+    try:
+        # Antwortlänge wie bei summarize_text_async, zuzüglich Bild-Prompt und JSON-Gerüst
+        max_tokens = None
+        if max_chars:
+            max_chars, max_tokens = output_budget(max_chars)
+            if with_image_prompt:
+                max_tokens += STRUCTURED_SUMMARY["image_prompt_tokens"]
+        
+        text = trim_to_tokens(text, TOKEN_BUDGET["max_input_tokens"], model)
+        messages = build_messages(text, styles, suggested_style, with_image_prompt,
+                                  max_chars if TOKEN_BUDGET["length_hint"] else None)
+        
+        cache = get_llm_cache() if use_cache else None
+        cache_key = None
+        if cache:
+            cache_key = make_cache_key(model, f"structured:{suggested_style}",
+                                       f"{messages[0]['content']}\nmax_tokens={max_tokens}", text)
+            cached = cache.get(cache_key)
+            if cached:
+                try:
+                    result = parse_structured_response(cached, styles, with_image_prompt)
+                    print(f"Strukturierte Zusammenfassung aus dem Cache verwendet (Modell: {model})")
+                    get_metrics().record("summarize", "cached", started, "structured")
+                    return result
+                except StructuredResponseError:
+                    pass
+        
+        options = {"response_format": response_format(model, build_schema(styles, with_image_prompt))}
+        if max_tokens:
+            options["max_tokens"] = max_tokens
+        print(f"Verwende Modell: {model} für Zusammenfassung, Stil und Bild-Prompt in einem Aufruf")
+        completion = await with_retries(
+            lambda: get_openai_client().chat.completions.create(model=model, messages=messages, **options),
+            model
+        )
+        choice = completion.choices[0]
+        result = None
+        try:
+            if getattr(choice.message, "refusal", None):
+                raise StructuredResponseError(f"Anfrage abgelehnt: {choice.message.refusal}")
+            if choice.finish_reason == "length":
+                raise StructuredResponseError("Antwort bei max_tokens abgeschnitten")
+            result = parse_structured_response(choice.message.content, styles, with_image_prompt)
+        finally:
+            prompt_tokens, completion_tokens, estimated = usage_from_response(completion, messages, model)
+            get_token_usage().record("structured", model, prompt_tokens, completion_tokens, account=account,
+                                     style=result["style"] if result else suggested_style, estimated=estimated)
+        
+        if max_chars and len(result["summary"]) > max_chars:
+            result["summary"] = finish_truncated(result["summary"][:max_chars - 1])
+        if cache:
+            cache.put(cache_key, model, json.dumps(result, ensure_ascii=False))
+        get_metrics().record("summarize", "success", started, "structured")
+        return result
+    except StructuredResponseError as e:
+        print(f"Ungültige strukturierte Antwort, verwende getrennte Aufrufe: {e}")
+    except Exception as e:
+        print(f"Fehler beim strukturierten Zusammenfassen, verwende getrennte Aufrufe: {e}")
+    get_metrics().record("summarize", "fallback", started, "structured")
+    return None
+
+def summarize_structured(text, model_key="default", suggested_style="default", use_cache=True,
+                         account=None, max_chars=None, with_image_prompt=True):
+    """Synchroner Wrapper für summarize_structured_async."""
+    return run_sync(summarize_structured_async(text, model_key, suggested_style, use_cache,
+                                               account, max_chars, with_image_prompt))
+
 # Beispiel: Bild generieren mit DALL-E
-def generate_image(prompt, topic_key="default"):
+async def generate_image_async(prompt, topic_key="default"):
+    """
+    Generiert ein Bild mit DALL-E und legt es im lokalen Bild-Cache ab.
+    Bei gleichem (normalisiertem) Prompt und gleichen DALL-E-Einstellungen wird kein neues Bild erzeugt.
+    
+    Returns:
+        str: Lokaler Dateipfad oder (falls der Download scheitert) die OpenAI-URL;
+             None, wenn kein Bild erzeugt werden konnte
+    """
+    started = time.perf_counter()
     try:
         # Wähle den passenden DALL-E Prompt basierend auf dem Thema
         dalle_prompt_template = DALLE_PROMPTS.get(topic_key, DALLE_PROMPTS["default"])
@@ -449,28 +651,64 @@ def generate_image(prompt, topic_key="default"):
         # Begrenze die Länge des Prompts
         if len(safe_prompt) > 1000:
             safe_prompt = safe_prompt[:997] + "..."
+        
+        # Bereits generiertes Bild wiederverwenden; die file_id findet telegram_media über den Bildinhalt
+        image_cache = get_image_cache()
+        cache_key = make_image_key(DALLE_MODEL, DALLE_SIZE, DALLE_QUALITY, DALLE_STYLE, safe_prompt)
+        cached_path = image_cache.lookup(cache_key)
+        if cached_path:
+            print("Verwende zwischengespeichertes DALL-E-Bild")
+            get_metrics().record("image", "cached", started, DALLE_MODEL)
+            return cached_path
             
-        response = OpenAI().images.generate(
-            model=DALLE_MODEL,
-            prompt=safe_prompt,
-            n=1,
-            size=DALLE_SIZE,
-            quality=DALLE_QUALITY,
-            style=DALLE_STYLE
+        response = await with_retries(
+            lambda: get_openai_client().images.generate(
+                model=DALLE_MODEL,
+                prompt=safe_prompt,
+                n=1,
+                size=DALLE_SIZE,
+                quality=DALLE_QUALITY,
+                style=DALLE_STYLE
+            ),
+            DALLE_MODEL,
+            max_retries=1
         )
-        return response.data[0].url
+        image_url = response.data[0].url
+        
+        # Temporäre OpenAI-URL sofort herunterladen, bevor sie abläuft
+        try:
+            r = await get_client("download_http").get(image_url)
+            r.raise_for_status()
+            local_path = image_cache.store_image(cache_key, r.content)
+            get_metrics().record("image", "success", started, DALLE_MODEL)
+            return local_path
+        except Exception as download_error:
+            print(f"Fehler beim Herunterladen des DALL-E-Bildes, verwende URL: {download_error}")
+            get_metrics().record("image", "fallback", started, DALLE_MODEL)
+            return image_url
     except Exception as e:
         print(f"Fehler bei der Bildgenerierung: {e}")
+        get_metrics().record("image", "failure", started, DALLE_MODEL)
         return None
 
+def generate_image(prompt, topic_key="default"):
+    """Synchroner Wrapper für generate_image_async."""
+    return run_sync(generate_image_async(prompt, topic_key))
+
 # Funktion zur Bestimmung des Kommentarstils basierend auf Tweet-Inhalt
+# Keyword-Listen einmalig zu je einem Matcher kompilieren
+style_matcher = KeywordMatcher(
+    {category: data["keywords"] for category, data in TONALITY_SCALE["categories"].items()},
+    word_boundary=KEYWORD_MATCHING["word_boundary"]
+)
+
 def determine_comment_style(tweet_text, tweet_data=None):
     """
     Bestimmt den passenden Kommentarstil basierend auf dem Tweet-Inhalt und der Tonalitäts-Waage.
     
     Args:
         tweet_text: Der Text des Tweets
-        tweet_data: Optional, ein Dictionary mit zusätzlichen Daten zum Tweet (Likes, Retweets, etc.)
+        tweet_data: Optional, der Tweet (Likes, Antworten) zur Anpassung der Intensität
         
     Returns:
         str: Der zu verwendende Kommentarstil (default, kritisch, positiv, detailliert, neutral)
@@ -478,21 +716,11 @@ def determine_comment_style(tweet_text, tweet_data=None):
     # Standardstil, falls keine Übereinstimmung gefunden wird
     default_style = "default"
     
-    # Text für Keyword-Matching vorbereiten (Kleinbuchstaben)
-    text_lower = tweet_text.lower()
-    
-    # Zähler für Kategorie-Matches
-    category_matches = {}
+    # Treffer aller Kategorien in einem Durchlauf zählen
+    counts = style_matcher.count(tweet_text)
     
-    # Prüfen, welche Kategorien im Text vorkommen
-    for category, data in TONALITY_SCALE["categories"].items():
-        matches = 0
-        for keyword in data["keywords"]:
-            if keyword.lower() in text_lower:
-                matches += 1
-        
-        if matches > 0:
-            category_matches[category] = matches
+    # Zähler für Kategorie-Matches in Konfigurationsreihenfolge (entscheidet bei Gleichstand)
+    category_matches = {category: counts[category] for category in TONALITY_SCALE["categories"] if category in counts}
     
     # Wenn keine Kategorie gefunden wurde, Standard-Stil verwenden
     if not category_matches:
@@ -505,10 +733,10 @@ def determine_comment_style(tweet_text, tweet_data=None):
     style = TONALITY_SCALE["categories"][best_category]["style"]
     
     # Wenn Tweet-Daten vorhanden sind, Intensität basierend auf Engagement anpassen
-    if tweet_data and "public_metrics" in tweet_data:
-        metrics = tweet_data["public_metrics"]
-        likes = metrics.get("like_count", 0)
-        comments = metrics.get("reply_count", 0)
+    if tweet_data is not None:
+        tweet_data = as_tweet(tweet_data)
+        likes = tweet_data.likes
+        comments = tweet_data.replies
         
         # Prüfen auf kontroverse Inhalte (viele Kommentare im Verhältnis zu Likes)
         if likes > 0 and comments / likes > TONALITY_SCALE["intensity"]["controversial_threshold"]:
@@ -523,109 +751,131 @@ def determine_comment_style(tweet_text, tweet_data=None):
 # Funktion zur Prüfung und Extraktion von Medien aus einem Tweet
 def extract_tweet_media(tweet_data):
     """
-    Extrahiert Medien (Bilder, Videos) aus einem Tweet.
-    Unterstützt verschiedene Tweet-Strukturen (twscrape und andere Quellen).
+    Extrahiert Medien (Bilder, Video-Vorschaubilder) aus einem Tweet.
     
     Args:
-        tweet_data: Dictionary mit Tweet-Daten
+        tweet_data: Der Tweet
         
     Returns:
         dict: Medien-Informationen oder None, wenn keine Medien vorhanden sind
     """
     if not tweet_data:
         return None
-        
-    # Struktur 1: twscrape Format
-    if "media" in tweet_data and tweet_data["media"]:
-        for media in tweet_data["media"]:
-            media_type = media.get("type")
-            
-            # Bild zurückgeben
-            if media_type == "photo":
-                return {
-                    "type": "photo",
-                    "url": media.get("url") or media.get("preview_image_url"),
-                    "alt_text": media.get("alt_text", "")
-                }
-            
-            # Video-Vorschaubild zurückgeben
-            elif media_type in ["video", "animated_gif"]:
-                return {
-                    "type": "video_thumbnail",
-                    "url": media.get("preview_image_url"),
-                    "alt_text": "Video-Vorschaubild"
-                }
+    tweet_data = as_tweet(tweet_data)
     
-    # Struktur 2: Alte API-Struktur mit "images"-Liste
-    if "images" in tweet_data and isinstance(tweet_data["images"], list) and tweet_data["images"]:
-        # Erstes Bild zurückgeben
+    # Erstes Bild zurückgeben
+    if tweet_data.images:
         return {
             "type": "photo",
-            "url": tweet_data["images"][0],
+            "url": tweet_data.images[0],
             "alt_text": ""
         }
     
-    # Struktur 3: Prüfen auf eingebettete URLs mit Vorschaubildern
-    if "entities" in tweet_data and "urls" in tweet_data["entities"]:
-        for url_entity in tweet_data["entities"]["urls"]:
-            if "images" in url_entity and url_entity["images"]:
-                return {
-                    "type": "link_preview",
-                    "url": url_entity["images"][0]["url"],
-                    "alt_text": url_entity.get("description", "Link-Vorschaubild")
-                }
+    # Video-Vorschaubild zurückgeben
+    if tweet_data.video_thumbnails:
+        return {
+            "type": "video_thumbnail",
+            "url": tweet_data.video_thumbnails[0],
+            "alt_text": "Video-Vorschaubild"
+        }
     
     return None
 
+# Alle Telegram-Anfragen laufen über die rate-begrenzte Sendewarteschlange
+async def queue_telegram_request(request_factory, cost=1):
+    """Sendet eine Bot-API-Anfrage an den Kanal über die Warteschlange (siehe telegram_queue)."""
+    return await get_telegram_queue().submit(get_setting("TELEGRAM_CHANNEL_ID"), request_factory, cost)
+
+async def _send_photo(prepared, caption=None):
+    """
+    Sendet ein mit telegram_media.prepare_photo vorbereitetes Bild an den Kanal und merkt sich
+    die file_id. Lehnt Telegram eine gespeicherte file_id ab, wird das Bild neu hochgeladen.
+    """
+    from telegram.error import BadRequest
+
+    def request(photo):
+        options = {"caption": caption, "parse_mode": "HTML"} if caption else {}
+        return lambda: get_telegram_bot().send_photo(chat_id=get_setting("TELEGRAM_CHANNEL_ID"), photo=photo, **options)
+
+    async with upload_slot(prepared) as prepared:
+        try:
+            sent_message = await queue_telegram_request(request(prepared.photo))
+        except BadRequest as e:
+            if not prepared.cached or "caption" in str(e).lower():
+                raise
+            print(f"Gespeicherte file_id wurde abgelehnt, lade das Bild neu hoch: {e}")
+            forget_upload(prepared)
+            prepared = await prepare_photo(prepared.source)
+            sent_message = await queue_telegram_request(request(prepared.photo))
+        remember_upload(prepared, sent_message)
+    return sent_message
+
+# Formatierung der Telegram-Nachricht (Kopfzeile, Zusammenfassung, Quellen, Fußzeile)
+def format_telegram_message(tweet_data, summary, tweet_url):
+    """
+    Baut den Text eines Posts; mit leerer Zusammenfassung ergibt sich der Platz, den alles
+    außer der Zusammenfassung belegt (siehe summary_char_budget).
+    """
+    tweet_data = as_tweet(tweet_data)
+    username = tweet_data.username or "Unbekannt"
+    
+    # Extrahiere externe URLs aus dem Tweet-Text für Quellenangaben
+    external_urls = extract_urls_from_text(tweet_data.text)
+    
+    # Formatiere die Nachricht mit Emojis und Aufzählungspunkten
+    message = f"{username}\n\n{summary}\n\n"
+    
+    # Füge Quellenangaben hinzu
+    sources = []
+    sources.append(f"Original-Tweet ({tweet_url})")
+    sources.append(f"@{username} auf X (https://twitter.com/{username})")
+    
+    # Füge externe URLs als Quellen hinzu
+    sources.extend(external_urls)
+    
+    # Formatiere die Quellenangaben
+    if sources:
+        message += "\nQuellen:\n"
+        for i, source in enumerate(sources, start=1):
+            message += f"{i} ({source}) - "
+        # Entferne das letzte " - "
+        message = message[:-3]
+    
+    # Füge die Fußzeile mit Social-Media-Links hinzu
+    message += "\n\nauf telegram (http://t.me/rabbitresearch) 👉auf substack (https://rabbitresearch.substack.com/) 👉auf youtube (https://www.youtube.com/c/RabbitResearch/videos) 👉auf odyssee (https://odysee.com/@rabbitresearch:3) 👉auf X (https://twitter.com/real___rabbit)"
+    return message
+
+def summary_char_budget(tweet_data, tweet_url, with_photo):
+    """
+    Zeichen, die in der Telegram-Nachricht für die Zusammenfassung frei bleiben
+    (Bildunterschrift bei Posts mit Bild, sonst Textnachricht).
+    """
+    limit = TOKEN_BUDGET["caption_limit"] if with_photo else TOKEN_BUDGET["message_limit"]
+    return limit - len(format_telegram_message(tweet_data, "", tweet_url))
+
 # Funktion zum Senden einer Nachricht an Telegram
-async def send_telegram_message(tweet_data, summary, tweet_url, image_url=None, media_data=None):
+async def send_telegram_message(tweet_data, summary, tweet_url, image_url=None, media_data=None, prepared_photo=None):
     """
     Sendet eine formatierte Nachricht mit dem Tweet und der KI-Zusammenfassung an den Telegram-Kanal.
     
     Args:
-        tweet_data: Dictionary mit Tweet-Daten
+        tweet_data: Der Tweet
         summary: Die KI-generierte Zusammenfassung
         tweet_url: URL zum Original-Tweet
         image_url: Optional, URL zu einem generierten Bild
         media_data: Optional, Dictionary mit Medien-Daten aus dem Tweet
+        prepared_photo: Optional, bereits mit prepare_photo vorbereitetes Bild (z.B. parallel
+                        zur Zusammenfassung geladen); sonst wird das Bild hier vorbereitet
     """
+    from telegram.error import BadRequest
+
+    started = time.perf_counter()
+    media_to_send = None
     try:
-        # Extrahiere den Benutzernamen aus dem Tweet mit verschiedenen möglichen Strukturen
-        username = "Unbekannt"
-        if "user" in tweet_data and isinstance(tweet_data["user"], dict) and "username" in tweet_data["user"]:
-            username = tweet_data["user"]["username"]
-        elif "username" in tweet_data:
-            username = tweet_data["username"]
-        
-        # Extrahiere externe URLs aus dem Tweet-Text für Quellenangaben
-        tweet_text = tweet_data.get("text", "")
-        external_urls = extract_urls_from_text(tweet_text)
-        
-        # Formatiere die Nachricht mit Emojis und Aufzählungspunkten
-        message = f"{username}\n\n{summary}\n\n"
-        
-        # Füge Quellenangaben hinzu
-        sources = []
-        sources.append(f"Original-Tweet ({tweet_url})")
-        sources.append(f"@{username} auf X (https://twitter.com/{username})")
-        
-        # Füge externe URLs als Quellen hinzu
-        for i, url in enumerate(external_urls, start=3):
-            sources.append(url)
-        
-        # Formatiere die Quellenangaben
-        if sources:
-            message += "\nQuellen:\n"
-            for i, source in enumerate(sources, start=1):
-                message += f"{i} ({source}) - "
-            # Entferne das letzte " - "
-            message = message[:-3]
-        
-        # Füge die Fußzeile mit Social-Media-Links hinzu
-        message += "\n\nauf telegram (http://t.me/rabbitresearch) 👉auf substack (https://rabbitresearch.substack.com/) 👉auf youtube (https://www.youtube.com/c/RabbitResearch/videos) 👉auf odyssee (https://odysee.com/@rabbitresearch:3) 👉auf X (https://twitter.com/real___rabbit)"
+        tweet_data = as_tweet(tweet_data)
+        message = format_telegram_message(tweet_data, summary, tweet_url)
         
         # Medien-Priorität: 1. Tweet-Medien, 2. DALL-E generiertes Bild
-        media_to_send = None
         caption = message
         
         # Prüfe, ob Tweet-Medien vorhanden sind
@@ -645,15 +895,26 @@ async def send_telegram_message(tweet_data, summary, tweet_url, image_url=None,
                 # Kürze die Caption auf 1021 Zeichen und füge "..." hinzu
                 caption = caption[:1021] + "..."
                 
-            # Sende Foto mit Caption
-            await bot.send_photo(chat_id=TELEGRAM_CHANNEL_ID, photo=media_to_send, caption=caption, parse_mode="HTML")
+            # Bild selbst laden und hochladen bzw. die gespeicherte file_id verwenden (siehe telegram_media)
+            if not (prepared_photo and prepared_photo.source == media_to_send):
+                prepared_photo = await prepare_photo(media_to_send)
+            try:
+                await _send_photo(prepared_photo, caption)
+            except BadRequest as photo_error:
+                if "caption is too long" in str(photo_error).lower():
+                    raise
+                # Telegram hat das Bild abgelehnt (nicht ladbar, ungültiges Format): Beitrag ohne Bild senden
+                print(f"Bild wurde abgelehnt, sende die Nachricht ohne Bild: {photo_error}")
+                await queue_telegram_request(lambda: get_telegram_bot().send_message(
+                    chat_id=get_setting("TELEGRAM_CHANNEL_ID"), text=message, parse_mode="HTML"))
+                get_metrics().record("send", "fallback", started, "text")
+                return True
         else:
             # Sende nur Text, wenn keine Medien vorhanden sind
-            await bot.send_message(chat_id=TELEGRAM_CHANNEL_ID, text=message, parse_mode="HTML")
-            
-        # Kurze Pause, um Telegram-API nicht zu überlasten
-        await asyncio.sleep(1)
+            await queue_telegram_request(lambda: get_telegram_bot().send_message(
+                chat_id=get_setting("TELEGRAM_CHANNEL_ID"), text=message, parse_mode="HTML"))
         
+        get_metrics().record("send", "success", started, "photo" if media_to_send else "text")
         return True
     except Exception as e:
         print(f"Fehler beim Senden der Telegram-Nachricht: {e}")
@@ -661,12 +922,15 @@ async def send_telegram_message(tweet_data, summary, tweet_url, image_url=None,
         if "caption is too long" in str(e).lower():
             try:
                 # Sende Text und Medien getrennt
-                if media_to_send:
-                    await bot.send_photo(chat_id=TELEGRAM_CHANNEL_ID, photo=media_to_send)
-                await bot.send_message(chat_id=TELEGRAM_CHANNEL_ID, text=message, parse_mode="HTML")
+                if prepared_photo:
+                    await _send_photo(prepared_photo)
+                await queue_telegram_request(lambda: get_telegram_bot().send_message(
+                    chat_id=get_setting("TELEGRAM_CHANNEL_ID"), text=message, parse_mode="HTML"))
+                get_metrics().record("send", "fallback", started, "photo" if media_to_send else "text")
                 return True
             except Exception as inner_e:
                 print(f"Auch alternativer Sendeversuch fehlgeschlagen: {inner_e}")
+        get_metrics().record("send", "failure", started, "photo" if media_to_send else "text")
         return False
 
 # Telegram-Posting mit Unterstützung für mehrere Bilder (asynchron)
@@ -686,103 +950,94 @@ async def post_to_telegram(summary, image_urls=None, tweet_images=None):
             all_images.extend(image_urls)
             
         if all_images:
+            # Alle Bilder gleichzeitig laden und vorbereiten (siehe telegram_media)
+            prepared = await prepare_photos(all_images)
             # Wenn wir mehrere Bilder haben, sende als Mediengruppe
-            if len(all_images) > 1:
+            if len(prepared) > 1:
+                from telegram import InputMediaPhoto
                 # Erstes Bild mit Caption, Rest ohne
-                media = [
-                    {"type": "photo", "media": all_images[0], "caption": summary, "parse_mode": ParseMode.HTML}
-                ]
+                media = [InputMediaPhoto(prepared[0].photo, caption=summary, parse_mode="HTML")]
                 # Weitere Bilder ohne Caption
-                for img in all_images[1:]:  
-                    media.append({"type": "photo", "media": img})
+                media.extend(InputMediaPhoto(photo.photo) for photo in prepared[1:])
                     
-                await bot.send_media_group(chat_id=TELEGRAM_CHANNEL_ID, media=media)
+                # Jedes Bild der Gruppe zählt gegen das Telegram-Limit
+                messages = await queue_telegram_request(lambda: get_telegram_bot().send_media_group(
+                    chat_id=get_setting("TELEGRAM_CHANNEL_ID"), media=media), cost=len(media))
+                for photo, sent_message in zip(prepared, messages or []):
+                    remember_upload(photo, sent_message)
             else:
                 # Nur ein Bild
-                await bot.send_photo(chat_id=TELEGRAM_CHANNEL_ID, photo=all_images[0], caption=summary, parse_mode=ParseMode.HTML)
+                await _send_photo(prepared[0], summary)
         else:
             # Kein Bild, nur Text
-            await bot.send_message(chat_id=TELEGRAM_CHANNEL_ID, text=summary, parse_mode=ParseMode.HTML)
+            await queue_telegram_request(lambda: get_telegram_bot().send_message(
+                chat_id=get_setting("TELEGRAM_CHANNEL_ID"), text=summary, parse_mode="HTML"))
             
         print(f"Erfolgreich an Telegram gesendet: {summary[:30]}...")
     except Exception as e:
         print(f"Fehler beim Senden an Telegram: {e}")
         # Versuche es mit einfacher Textnachricht, wenn Bilder fehlschlagen
         try:
-            await bot.send_message(chat_id=TELEGRAM_CHANNEL_ID, text=summary, parse_mode=ParseMode.HTML)
+            await queue_telegram_request(lambda: get_telegram_bot().send_message(
+                chat_id=get_setting("TELEGRAM_CHANNEL_ID"), text=summary, parse_mode="HTML"))
             print("Nachricht ohne Bilder gesendet.")
         except Exception as e2:
             print(f"Auch Textnachricht fehlgeschlagen: {e2}")
         
 # Synchrone Wrapper-Funktion für einfachere Integration
-# Globaler Event-Loop für Telegram-Anfragen
-telegram_loop = None
-telegram_bot_instance = None
-
-def get_telegram_bot():
-    global telegram_bot_instance
-    if telegram_bot_instance is None:
-        # Erstelle Bot-Instanz mit HTTP-Verbindungspool
-        request = HTTPXRequest(connection_pool_size=8)
-        telegram_bot_instance = Bot(token=TELEGRAM_BOT_TOKEN, request=request)
-    return telegram_bot_instance
-
 def send_to_telegram(summary, image_url=None, tweet_images=None):
-    global telegram_loop
-    
-    # Event-Loop erstellen, wenn keiner existiert
-    if telegram_loop is None or telegram_loop.is_closed():
-        telegram_loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(telegram_loop)
-    
-    # Funktion im Loop ausführen
+    # Funktion im gemeinsamen Loop ausführen
     try:
-        return telegram_loop.run_until_complete(post_to_telegram(summary, image_url, tweet_images))
+        return run_sync(post_to_telegram(summary, image_url, tweet_images))
     except Exception as e:
         print(f"Fehler beim Senden an Telegram: {e}")
         # Versuche es mit einfacher Textnachricht, wenn Bilder fehlschlagen
         try:
-            return telegram_loop.run_until_complete(get_telegram_bot().send_message(
-                chat_id=TELEGRAM_CHANNEL_ID, 
+            return run_sync(queue_telegram_request(lambda: get_telegram_bot().send_message(
+                chat_id=get_setting("TELEGRAM_CHANNEL_ID"), 
                 text=summary, 
-                parse_mode=ParseMode.HTML
-            ))
+                parse_mode="HTML"
+            )))
         except Exception as e2:
             print(f"Auch Textnachricht fehlgeschlagen: {e2}")
             return None
     
+# Funktion zum Öffnen des Duplikat-Speichers
+def get_dedup_store(cache_file=None):
+    """
+    Gibt den State-Store für die Duplikaterkennung zurück.
+    Ein alter JSON-Cache-Pfad wird auf eine gleichnamige .db-Datei abgebildet und einmalig migriert.
+    """
+    if cache_file and cache_file.endswith(".json"):
+        return get_state_store(os.path.splitext(cache_file)[0] + ".db", legacy_json_file=cache_file)
+    return get_state_store(cache_file, legacy_json_file=STATE_STORE["legacy_json_file"])
+
 # Funktion zum Markieren eines Tweets als verarbeitet
-def mark_tweet_as_processed(tweet_text, tweet_id=None, cache_file="processed_tweets.json"):
+def mark_tweet_as_processed(tweet_text, tweet_id=None, cache_file=None):
     """Markiert einen Tweet als verarbeitet, indem er zum Cache hinzugefügt wird."""
     # Hash des Tweet-Inhalts erstellen
     tweet_hash = hashlib.md5(tweet_text.encode('utf-8')).hexdigest()
     
-    # Cache laden oder erstellen
-    processed_tweets = {}
-    try:
-        if os.path.exists(cache_file):
-            with open(cache_file, "r", encoding="utf-8") as f:
-                processed_tweets = json.load(f)
-    except Exception as e:
-        print(f"Fehler beim Laden des Tweet-Caches: {e}")
-    
-    # Tweet zum Cache hinzufügen
-    processed_tweets[tweet_hash] = {
-        "timestamp": time.time(),
-        "preview": tweet_text[:50] + "..." if len(tweet_text) > 50 else tweet_text,
-        "id": tweet_id  # ID speichern, falls vorhanden
-    }
-    
-    # Cache speichern
     try:
-        with open(cache_file, "w", encoding="utf-8") as f:
-            json.dump(processed_tweets, f, ensure_ascii=False, indent=2)
+        store = get_dedup_store(cache_file)
+        store.add_processed(
+            tweet_hash,
+            tweet_id,
+            preview=tweet_text[:50] + "..." if len(tweet_text) > 50 else tweet_text
+        )
+        if NEAR_DUPLICATE["enabled"]:
+            get_near_duplicate_index(store).add(tweet_hash, tweet_text, tweet_id)
     except Exception as e:
         print(f"Fehler beim Speichern des Tweet-Caches: {e}")
 
 # Funktion zur Überprüfung von Duplikaten
-def is_duplicate_tweet(tweet_text, cache_file="processed_tweets.json", tweet_id=None):
-    """Überprüft, ob ein Tweet bereits verarbeitet wurde, basierend auf einem Hash des Inhalts oder der Tweet-ID."""
+def is_duplicate_tweet(tweet_text, cache_file=None, tweet_id=None):
+    """
+    Überprüft, ob ein Tweet bereits verarbeitet wurde, basierend auf einem Hash des Inhalts oder der Tweet-ID.
+    Zusätzlich werden Beinahe-Duplikate über den MinHash-LSH-Index erkannt (NEAR_DUPLICATE).
+    Ein neuer Tweet wird für diesen Prozess beansprucht; finish_tweet_claim bzw. release_tweet_claim
+    schließen die Beanspruchung ab. Verarbeitet ihn gerade ein anderer Worker, gilt er als Duplikat.
+    """
     # Wenn der Tweet-Text zu kurz ist oder nur eine URL enthält, ist er nicht aussagekräftig genug
     if len(tweet_text) < 10 or tweet_text.startswith('http'):
         if not tweet_id:  # Wenn keine ID verfügbar ist, können wir nicht sicher prüfen
@@ -792,142 +1047,91 @@ def is_duplicate_tweet(tweet_text, cache_file="processed_tweets.json", tweet_id=
     # Hash des Tweet-Inhalts erstellen
     tweet_hash = hashlib.md5(tweet_text.encode('utf-8')).hexdigest()
     
-    # Cache laden oder erstellen
-    processed_tweets = {}
     try:
-        if os.path.exists(cache_file):
-            with open(cache_file, "r", encoding="utf-8") as f:
-                processed_tweets = json.load(f)
-                
-                # Alte Einträge entfernen (älter als die konfigurierte Anzahl von Tagen)
-                current_time = time.time()
-                cache_expiry = current_time - (DUPLICATE_DETECTION["cache_days"] * 24 * 60 * 60)
-                processed_tweets = {k: v for k, v in processed_tweets.items() 
-                                   if v.get("timestamp", 0) > cache_expiry}
+        store = get_dedup_store(cache_file)
+        # Prüfen und beanspruchen in einer Transaktion, damit ein Tweet auch bei mehreren
+        # Prozessen nur einmal verarbeitet wird; abgelaufene Einträge werden ignoriert
+        match = store.claim_tweet(tweet_hash, tweet_id, get_worker_id(), SHARDING["claim_lease_seconds"])
     except Exception as e:
         print(f"Fehler beim Laden des Tweet-Caches: {e}")
-        # Bei Fehler Cache neu erstellen
-        processed_tweets = {}
-    
-    # Prüfen, ob der Hash oder die ID bereits im Cache ist
-    is_duplicate = False
+        return False
     
-    # Prüfung nach Hash
-    if tweet_hash in processed_tweets:
-        is_duplicate = True
+    if match == "hash":
         print(f"Tweet als Duplikat erkannt (Hash-Match): {tweet_text[:30]}...")
+        return True
+    if match == "id":
+        print(f"Tweet als Duplikat erkannt (ID-Match): {tweet_id}")
+        return True
+    if match == "claimed":
+        print(f"Tweet {tweet_id} wird bereits von einem anderen Worker verarbeitet: {tweet_text[:30]}...")
+        return True
     
-    # Prüfung nach ID, falls vorhanden
-    elif tweet_id:
-        # Suche nach der ID in allen gespeicherten Tweet-Daten
-        for stored_hash, data in processed_tweets.items():
-            if data.get("id") == tweet_id:
-                is_duplicate = True
-                print(f"Tweet als Duplikat erkannt (ID-Match): {tweet_id}")
-                break
-    
-    if not is_duplicate:
-        # Neuen Tweet zum Cache hinzufügen
-        processed_tweets[tweet_hash] = {
-            "timestamp": time.time(),
-            "preview": tweet_text[:50] + "..." if len(tweet_text) > 50 else tweet_text,
-            "id": tweet_id  # ID speichern, falls vorhanden
-        }
-        
-        # Cache speichern
+    # Beinahe-Duplikate: leicht bearbeitet, mit neuer URL erneut gepostet oder von einem anderen Account kopiert
+    signature = None
+    if NEAR_DUPLICATE["enabled"]:
         try:
-            with open(cache_file, "w", encoding="utf-8") as f:
-                json.dump(processed_tweets, f, ensure_ascii=False, indent=2)
+            near_duplicates = get_near_duplicate_index(store)
+            signature = near_duplicates.signature(tweet_text)
+            similar = near_duplicates.find_similar(tweet_text, signature, exclude=tweet_hash)
         except Exception as e:
-            print(f"Fehler beim Speichern des Tweet-Caches: {e}")
+            print(f"Fehler bei der Ähnlichkeitsprüfung: {e}")
+            similar = None
+        if similar:
+            _, similar_id, similarity = similar
+            print(f"Tweet als Duplikat erkannt (Ähnlichkeit {similarity:.0%} zu Tweet {similar_id}): {tweet_text[:30]}...")
+            release_tweet_claim(tweet_text, cache_file)
+            return True
+    
+    # Signatur sofort eintragen, damit auch Beinahe-Duplikate aus parallelen Abrufen erkannt werden;
+    # als verarbeitet gilt der Tweet erst mit finish_tweet_claim, release_tweet_claim entfernt sie wieder
+    try:
+        if signature:
+            near_duplicates.add(tweet_hash, tweet_text, tweet_id, signature=signature)
+    except Exception as e:
+        print(f"Fehler beim Speichern des Tweet-Caches: {e}")
     
-    return is_duplicate
+    return False
+
+# Beanspruchung eines Tweets aus is_duplicate_tweet (siehe StateStore.claim_tweet)
+def renew_tweet_claim(tweet_text, cache_file=None, tweet_id=None):
+    """Verlängert die Beanspruchung vor dem Versand; False, wenn der Tweet inzwischen einem anderen Worker gehört."""
+    tweet_hash = hashlib.md5(tweet_text.encode('utf-8')).hexdigest()
+    try:
+        return get_dedup_store(cache_file).renew_claim(
+            tweet_hash, get_worker_id(), SHARDING["claim_lease_seconds"], tweet_id=tweet_id
+        )
+    except Exception as e:
+        print(f"Fehler beim Verlängern der Tweet-Beanspruchung: {e}")
+        return True
 
-# Funktion zur Bewertung der Tweet-Qualität
-def evaluate_tweet_quality(tweet_text, tweet_data=None):
+def finish_tweet_claim(tweet_text, cache_file=None, tweet_id=None):
     """
-    Bewertet die Qualität eines Tweets basierend auf Inhalt und Engagement-Metriken.
-    
-    Args:
-        tweet_text: Der Text des Tweets
-        tweet_data: Optional, ein Dictionary mit zusätzlichen Daten zum Tweet (Likes, Retweets, etc.)
-        
-    Returns: 
-        float: Qualitätswert zwischen 0 und 1
-        str: Begründung für die Bewertung
-    """
-    score = 0.5  # Startwert
-    reasons = []
-    
-    # Länge des Tweets bewerten
-    if len(tweet_text) < 30:
-        score -= 0.2
-        reasons.append("Tweet ist sehr kurz")
-    elif len(tweet_text) > 100:
-        score += 0.1
-        reasons.append("Tweet hat gute Länge")
-    
-    # Prüfen auf reine URLs oder zu viele Hashtags
-    if tweet_text.startswith('http'):
-        score -= 0.3
-        reasons.append("Tweet enthält nur URL")
-    
-    hashtag_count = tweet_text.count('#')
-    if hashtag_count > 5:
-        score -= 0.1
-        reasons.append(f"Tweet enthält viele Hashtags ({hashtag_count})")
-    
-    # Prüfen auf Schlüsselwörter, die auf Qualität hindeuten könnten
-    quality_keywords = ['analyse', 'studie', 'forschung', 'erklärt', 'wichtig', 'neu']
-    for keyword in quality_keywords:
-        if keyword.lower() in tweet_text.lower():
-            score += 0.05
-            reasons.append(f"Enthält Qualitätsbegriff: {keyword}")
-    
-    # Prüfen auf Fragen oder Diskussionsanregungen
-    if '?' in tweet_text:
-        score += 0.05
-        reasons.append("Tweet enthält Frage/Diskussionsanregung")
-    
-    # Engagement-Metriken bewerten, wenn verfügbar
-    if tweet_data and isinstance(tweet_data, dict):
-        # Likes bewerten
-        likes = tweet_data.get("likes", 0)
-        if likes >= 100:
-            score += 0.2
-            reasons.append(f"Hohe Anzahl an Likes: {likes}")
-        elif likes >= 20:
-            score += 0.1
-            reasons.append(f"Gute Anzahl an Likes: {likes}")
-        
-        # Retweets bewerten
-        retweets = tweet_data.get("retweets", 0)
-        if retweets >= 50:
-            score += 0.2
-            reasons.append(f"Hohe Anzahl an Retweets: {retweets}")
-        elif retweets >= 10:
-            score += 0.1
-            reasons.append(f"Gute Anzahl an Retweets: {retweets}")
-        
-        # Kommentare bewerten
-        replies = tweet_data.get("replies", 0)
-        if replies >= 20:
-            score += 0.15
-            reasons.append(f"Hohe Anzahl an Kommentaren: {replies}")
-        elif replies >= 5:
-            score += 0.05
-            reasons.append(f"Gute Anzahl an Kommentaren: {replies}")
-        
-        # Gesamtes Engagement bewerten
-        total_engagement = tweet_data.get("engagement_total", 0)
-        if total_engagement >= 200:
-            score += 0.1
-            reasons.append(f"Sehr hohes Gesamtengagement: {total_engagement}")
-    
-    # Begrenzung des Scores auf 0-1
-    score = max(0, min(1, score))
-    
-    return score, ", ".join(reasons)
+    Schließt die Beanspruchung ab und trägt den Tweet als verarbeitet ein. Nur für gesendete oder
+    bewusst aussortierte Tweets; nach einem Fehler gibt release_tweet_claim den Tweet wieder frei.
+    """
+    tweet_hash = hashlib.md5(tweet_text.encode('utf-8')).hexdigest()
+    try:
+        get_dedup_store(cache_file).finish_claim(
+            tweet_hash, get_worker_id(),
+            preview=tweet_text[:50] + "..." if len(tweet_text) > 50 else tweet_text,
+            tweet_id=tweet_id
+        )
+    except Exception as e:
+        print(f"Fehler beim Speichern des Tweet-Caches: {e}")
+
+def release_tweet_claim(tweet_text, cache_file=None):
+    """
+    Gibt die Beanspruchung frei, ohne den Tweet als verarbeitet einzutragen. Seine Signatur wird
+    aus dem Beinahe-Duplikat-Index entfernt, damit ein nie gesendeter Tweet keine Kopien unterdrückt.
+    """
+    tweet_hash = hashlib.md5(tweet_text.encode('utf-8')).hexdigest()
+    try:
+        store = get_dedup_store(cache_file)
+        # Nur die eigene Signatur entfernen: gehört der Tweet inzwischen einem anderen Worker, bleibt sie
+        if store.release_claim(tweet_hash, get_worker_id()) and NEAR_DUPLICATE["enabled"]:
+            get_near_duplicate_index(store).remove(tweet_hash)
+    except Exception as e:
+        print(f"Fehler beim Freigeben der Tweet-Beanspruchung: {e}")
 
 # Funktion zum Extrahieren von URLs aus einem Text
 def extract_urls_from_text(text):
@@ -935,57 +1139,114 @@ def extract_urls_from_text(text):
     url_pattern = r'https?://(?:[-\w.]|(?:%[\da-fA-F]{2}))+[\w/\-?=%.#+&;]*'
     return re.findall(url_pattern, text)
 
+# Begrenzung der gleichzeitigen Arbeit pro Pipeline-Stufe
+class StageLimiter:
+    """
+    Hält je Pipeline-Stufe (fetch, summarize, image, send, ...) ein Semaphor,
+    das die Anzahl gleichzeitig laufender Aufrufe dieser Stufe begrenzt.
+    Muss innerhalb des laufenden Event-Loops erzeugt werden.
+    """
+    
+    def __init__(self, limits=None):
+        self.limits = dict(PIPELINE_CONCURRENCY if limits is None else limits)
+        self._semaphores = {
+            stage: asyncio.Semaphore(limit)
+            for stage, limit in self.limits.items()
+            if limit and limit > 0
+        }
+    
+    def stage(self, name):
+        """Gibt den Kontextmanager für eine Stufe zurück (ohne Limit: kein Warten)."""
+        return self._semaphores.get(name) or contextlib.nullcontext()
+
+def _stage(limiter, name):
+    """Hilfsfunktion: Stufen-Kontextmanager auch ohne Limiter."""
+    return limiter.stage(name) if limiter else contextlib.nullcontext()
+
+async def _prepare_tweet_media(media_url, limiter=None):
+    """Lädt und bereitet ein Tweet-Bild für Telegram vor (Stufe "media", siehe telegram_media)."""
+    async with _stage(limiter, "media"):
+        return await prepare_photo(media_url)
+
+# Gemeinsamer Abschluss: Bild erzeugen (falls nötig) und an Telegram senden
+async def _send_summary_async(tweet_data, tweet_url, summary, media_data, username, limiter=None,
+                              image_prompt=None, media_task=None, before_send=None):
+    """
+    Erzeugt bei Bedarf ein DALL-E-Bild und sendet den Tweet mit Zusammenfassung an Telegram.
+    
+    Args:
+        image_prompt: Optional, bereits erzeugter Bild-Prompt (z.B. aus summarize_structured_async)
+        media_task: Optional, Task von _prepare_tweet_media für die Tweet-Medien
+        before_send: Optional, Funktion, die direkt vor dem Versand prüft, ob noch gesendet werden darf
+        
+    Returns:
+        bool: True, wenn gesendet wurde; None, wenn before_send den Versand verhindert hat
+    """
+    image_url = None
+    if not media_data and not DISABLE_IMAGE_GENERATION:
+        async with _stage(limiter, "image"):
+            if not image_prompt:
+                image_prompt = await generate_image_prompt_async(tweet_data.text, summary, account=username)
+            if image_prompt:
+                image_url = await generate_image_async(image_prompt)
+    
+    async with _stage(limiter, "send"):
+        if before_send and not before_send():
+            return None
+        prepared_photo = await media_task if media_task else None
+        return await send_telegram_message(tweet_data, summary, tweet_url, image_url, media_data, prepared_photo)
+
 # Funktion zum Verarbeiten eines Tweets
-def process_tweet(tweet_data, account_config):
+async def process_tweet_async(tweet_data, account_config, limiter=None, quality=None):
     """
-    Verarbeitet einen einzelnen Tweet und sendet ihn an Telegram.
+    Verarbeitet einen einzelnen Tweet im laufenden Event-Loop und sendet ihn an Telegram.
     
     Args:
-        tweet_data: Dictionary mit Tweet-Daten
+        tweet_data: Der Tweet (Dictionaries werden einmalig umgewandelt)
         account_config: Konfiguration für den Account
+        limiter: Optional, StageLimiter zur Begrenzung gleichzeitiger Aufrufe pro Stufe
+        quality: Optional, bereits berechnetes Ergebnis von evaluate_tweet_quality
         
     Returns:
-        bool: True, wenn der Tweet erfolgreich verarbeitet wurde
+        bool: True, wenn der Tweet erfolgreich verarbeitet wurde, False, wenn er übersprungen wurde;
+              None, wenn Zusammenfassung oder Versand fehlgeschlagen sind (der Tweet wird erneut versucht)
     """
+    claimed = False
+    handled = False  # True: gesendet oder bewusst aussortiert, sonst wird die Beanspruchung nur freigegeben
+    media_task = None
     try:
-        tweet_id = tweet_data.get("id")
-        tweet_text = tweet_data.get("text", "")
+        tweet_data = as_tweet(tweet_data)
+        tweet_id = tweet_data.id
+        tweet_text = tweet_data.text
         
         print(f"DEBUG: Tweet-ID: {tweet_id}, Tweet-Text-Länge: {len(tweet_text)}")
         
-        # Benutzername aus verschiedenen möglichen Strukturen extrahieren
-        username = "RabbitResearch"  # Standardwert, wenn kein Benutzername gefunden wird
-        
-        # Versuche, den Benutzernamen aus verschiedenen möglichen Strukturen zu extrahieren
-        if "user" in tweet_data:
-            if isinstance(tweet_data["user"], dict):
-                if "username" in tweet_data["user"]:
-                    username = tweet_data["user"]["username"]
-                elif "screen_name" in tweet_data["user"]:
-                    username = tweet_data["user"]["screen_name"]
-        elif "username" in tweet_data:
-            username = tweet_data["username"]
-        elif "screen_name" in tweet_data:
-            username = tweet_data["screen_name"]
-        elif "author" in tweet_data and isinstance(tweet_data["author"], dict):
-            if "username" in tweet_data["author"]:
-                username = tweet_data["author"]["username"]
-            elif "screen_name" in tweet_data["author"]:
-                username = tweet_data["author"]["screen_name"]
+        username = tweet_data.username or "RabbitResearch"  # Standardwert, wenn kein Benutzername bekannt ist
         
         print(f"DEBUG: Extrahierter Benutzername: {username}")
         
         tweet_url = f"https://twitter.com/{username}/status/{tweet_id}"
         
         # Prüfe, ob der Tweet bereits verarbeitet wurde
-        if is_duplicate_tweet(tweet_text, tweet_id=tweet_id):
+        metrics = get_metrics()
+        started = time.perf_counter()
+        is_duplicate = is_duplicate_tweet(tweet_text, tweet_id=tweet_id)
+        metrics.record("dedup", "skipped" if is_duplicate else "success", started)
+        if is_duplicate:
             print(f"Tweet {tweet_id} wurde bereits verarbeitet. Überspringe.")
             return False
+        claimed = True
             
-        # Bewerte die Qualität des Tweets
-        quality_score, quality_reason = evaluate_tweet_quality(tweet_text, tweet_data)
+        # Bewerte die Qualität des Tweets (falls der Aufrufer das nicht bereits getan hat)
+        if quality:
+            quality_score, quality_reason = quality
+        else:
+            started = time.perf_counter()
+            quality_score, quality_reason = evaluate_tweet_quality(tweet_text, tweet_data)
+            metrics.record("quality", "success" if quality_score >= TWEET_QUALITY_THRESHOLD else "skipped", started, "scalar")
         if quality_score < TWEET_QUALITY_THRESHOLD:
             print(f"Tweet {tweet_id} hat eine zu niedrige Qualität ({quality_score}): {quality_reason}")
+            handled = True
             return False
             
         # Bestimme den Kommentarstil basierend auf dem Tweet-Inhalt
@@ -1001,45 +1262,203 @@ def process_tweet(tweet_data, account_config):
         media_data = extract_tweet_media(tweet_data)
         
         # Generiere eine KI-Zusammenfassung
-        summary = summarize_text(tweet_text, account_config.get("model", "default"), instruction)
+        # Die Antwort muss neben Quellen und Fußzeile in die Nachricht passen (mit Bild: Bildunterschrift)
+        max_chars = summary_char_budget(tweet_data, tweet_url, bool(media_data) or not DISABLE_IMAGE_GENERATION)
+        # Ein Bild wird nur generiert, wenn keine Tweet-Medien vorhanden sind
+        wants_image = not media_data and not DISABLE_IMAGE_GENERATION
+        model_key = account_config.get("model", "default")
+        summary = image_prompt = None
+        
+        # Nicht eilige Accounts: Zusammenfassung über die Batch-API anfordern (außer sie liegt im Cache);
+        # gesendet wird der Tweet von run_batches_async, sobald der Batch fertig ist
+        batch_queue = get_batch_queue()
+        if batch_queue.applies_to(account_config):
+            request = build_summary_request(tweet_text, model_key, instruction, max_chars)
+            summary = get_llm_cache().get(request["cache_key"])
+            if not summary:
+                custom_id = hashlib.md5(tweet_text.encode('utf-8')).hexdigest()
+                if batch_queue.enqueue(custom_id, tweet_data, account_config, instruction, request):
+                    print(f"Zusammenfassung für Tweet {tweet_id} in den nächsten Batch eingereiht")
+                mark_tweet_as_processed(tweet_text, tweet_id)
+                handled = True
+                return False
+        
+        # Medien schon während der Zusammenfassung laden
+        if media_data and media_data.get("url"):
+            media_task = asyncio.ensure_future(_prepare_tweet_media(media_data["url"], limiter))
+        
+        async with _stage(limiter, "summarize"):
+            # Optional Zusammenfassung, Stil und Bild-Prompt in einem Aufruf; sonst (oder bei
+            # ungültiger Antwort) Zusammenfassung und Bild-Prompt nacheinander
+            if STRUCTURED_SUMMARY["enabled"] and not summary:
+                structured = await summarize_structured_async(tweet_text, model_key, instruction, account=username,
+                                                              max_chars=max_chars, with_image_prompt=wants_image)
+                if structured:
+                    summary, image_prompt = structured["summary"], structured["image_prompt"]
+                    if structured["style"] != instruction:
+                        print(f"Kommentarstil vom Modell angepasst: {instruction} -> {structured['style']}")
+                        instruction = structured["style"]
+            if not summary:
+                summary = await summarize_text_async(tweet_text, model_key, instruction,
+                                                     account=username, max_chars=max_chars)
         if not summary:
             print(f"Konnte keine Zusammenfassung für Tweet {tweet_id} generieren.")
+            return None
+        
+        # Bild erzeugen und senden, sofern der Tweet noch diesem Worker gehört
+        success = await _send_summary_async(
+            tweet_data, tweet_url, summary, media_data, username, limiter, image_prompt, media_task,
+            before_send=lambda: renew_tweet_claim(tweet_text, tweet_id=tweet_id)
+        )
+        if success is None:
+            print(f"Tweet {tweet_id} wurde inzwischen von einem anderen Worker übernommen. Überspringe.")
+            claimed = False
             return False
-            
-        # Generiere nur ein Bild, wenn keine Tweet-Medien vorhanden sind
-        image_url = None
-        if not media_data and not DISABLE_IMAGE_GENERATION:
-            image_prompt = generate_image_prompt(tweet_text, summary)
-            if image_prompt:
-                image_url = generate_image(image_prompt)
-                
-        # Sende die Nachricht an Telegram
-        # Da send_telegram_message asynchron ist, müssen wir es mit asyncio ausführen
-        # Wir erstellen einen neuen Event-Loop für jeden Tweet, um Probleme mit geschlossenen Loops zu vermeiden
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        try:
-            success = loop.run_until_complete(send_telegram_message(tweet_data, summary, tweet_url, image_url, media_data))
-        finally:
-            loop.close()
         
-        # Markiere den Tweet als verarbeitet
-        if success:
-            mark_tweet_as_processed(tweet_text, tweet_id)
-            
-        return success
+        # Markiere den Tweet als verarbeitet; bei einem fehlgeschlagenen Versand folgt ein neuer Versuch im nächsten Lauf
+        if not success:
+            return None
+        mark_tweet_as_processed(tweet_text, tweet_id)
+        handled = True
+        return True
+    except asyncio.CancelledError:
+        # Beim Beenden nicht als verarbeitet eintragen, damit ein anderer Worker den Tweet übernehmen kann
+        if claimed:
+            release_tweet_claim(tweet_text)
+            claimed = False
+        raise
     except Exception as e:
         import traceback
         print(f"Fehler bei der Verarbeitung des Tweets: {e}")
         print("Detaillierter Fehler:")
         traceback.print_exc()
+        return None
+    finally:
+        if media_task and not media_task.done():
+            media_task.cancel()
+        if claimed and handled:
+            finish_tweet_claim(tweet_text, tweet_id=tweet_id)
+        elif claimed:
+            release_tweet_claim(tweet_text)
+
+def process_tweet(tweet_data, account_config, quality=None):
+    """
+    Verarbeitet einen einzelnen Tweet und sendet ihn an Telegram (synchroner Wrapper).
+    
+    Args:
+        tweet_data: Dictionary mit Tweet-Daten
+        account_config: Konfiguration für den Account
+        quality: Optional, bereits berechnetes Ergebnis von evaluate_tweet_quality
+        
+    Returns:
+        bool: wie process_tweet_async (None, wenn der Tweet erneut versucht werden soll)
+    """
+    return run_sync(process_tweet_async(tweet_data, account_config, quality=quality))
+
+# Ergebnisse der Batch-API veröffentlichen
+async def _publish_batch_result(item, limiter=None):
+    """
+    Sendet einen Tweet, dessen Zusammenfassung über die Batch-API erzeugt wurde. Ist die
+    Anfrage endgültig fehlgeschlagen, wird die Zusammenfassung direkt angefordert. Scheitert
+    der Versand, gibt BatchQueue.finish die Anfrage für einen späteren Versuch frei.
+    
+    Returns:
+        bool: True, wenn der Tweet gesendet wurde
+    """
+    queue = get_batch_queue()
+    sent = False
+    started = time.perf_counter()
+    
+    def _finish(sent):
+        state = queue.finish(item["custom_id"], sent)
+        if state in ("done", "failed"):
+            print(f"Batch-Ergebnis {item['custom_id']} nicht gesendet, wird erneut versucht")
+        elif state == "dropped":
+            print(f"Batch-Ergebnis {item['custom_id']} nach {queue.settings['max_send_attempts']} Versuchen verworfen")
+    
+    try:
+        tweet_data = Tweet.from_dict(item["tweet"])
+        account_config = item["account"]
+        username = tweet_data.username or account_config["username"]
+        tweet_url = f"https://twitter.com/{username}/status/{tweet_data.id}"
+        body = item["body"]
+        summary = None
+        # Bei einem erneuten Versand liegt die Zusammenfassung im Cache (der Verbrauch ist schon erfasst)
+        if item["send_attempts"] and item["cache_key"]:
+            summary = get_llm_cache().get(item["cache_key"])
+        if item["response"] and not summary:
+            from openai.types.chat import ChatCompletion
+            request = {"model": body["model"], "messages": body["messages"],
+                       "max_chars": item["max_chars"], "cache_key": item["cache_key"]}
+            summary = finish_summary(request, ChatCompletion.model_validate(item["response"]), username,
+                                     item["instruction"], stage="batch", cache=get_llm_cache())
+        if summary:
+            get_metrics().record("batch", "success", started, body["model"])
+        else:
+            print(f"Batch-Anfrage für Tweet {tweet_data.id} fehlgeschlagen ({item['error']}), fasse direkt zusammen")
+            async with _stage(limiter, "summarize"):
+                summary = await summarize_text_async(tweet_data.text, account_config.get("model", "default"),
+                                                     item["instruction"], account=username, max_chars=item["max_chars"])
+            get_metrics().record("batch", "fallback" if summary else "failure", started, body["model"])
+            if not summary:
+                # Wie ein gescheiterter Versand werten statt in 'posting' hängen zu lassen
+                _finish(False)
+                return False
+        sent = bool(await _send_summary_async(tweet_data, tweet_url, summary, extract_tweet_media(tweet_data),
+                                              username, limiter))
+        _finish(sent)
+        return sent
+    except asyncio.CancelledError:
+        # Beim Beenden offen lassen; nach Ablauf der Lease sendet ein anderer Prozess den Tweet
+        raise
+    except Exception as e:
+        print(f"Fehler beim Senden eines Batch-Ergebnisses: {e}")
+        _finish(sent)
         return False
 
+async def run_batches_async(limiter=None, flush=False, wait=False):
+    """
+    Reicht fällige Batch-Anfragen ein, fragt laufende Batches ab und sendet fertige Ergebnisse.
+    
+    Args:
+        limiter: Optional, StageLimiter der laufenden Pipeline
+        flush: True = eingereihte Anfragen sofort einreichen, auch wenn der Batch nicht voll ist
+        wait: True = wiederholen, bis keine Anfrage mehr offen ist (im Abstand von poll_interval_seconds)
+        
+    Returns:
+        int: Anzahl gesendeter Tweets
+    """
+    queue = get_batch_queue()
+    if not queue.has_work():
+        return 0
+    limiter = limiter or StageLimiter()
+    sent = 0
+    while True:
+        client = get_openai_client()
+        try:
+            await queue.submit_due(client, force=flush)
+            await queue.poll(client)
+        except Exception as e:
+            print(f"Fehler bei der Batch-Verarbeitung: {e}")
+        results = await asyncio.gather(*(_publish_batch_result(item, limiter) for item in queue.claim_results()),
+                                       return_exceptions=True)
+        sent += sum(1 for result in results if result is True)
+        if not wait or not queue.has_work():
+            break
+        counts = queue.counts()
+        print(f"Warte auf Batches: {counts.get('submitted', 0)} Anfragen laufen, {counts.get('queued', 0)} eingereiht")
+        await asyncio.sleep(queue.settings["poll_interval_seconds"])
+    if sent:
+        print(f"{sent} Tweets aus Batch-Ergebnissen an Telegram gesendet.")
+    return sent
+
 # Funktion zum Laden der Account-Konfiguration
 def load_account_config(filename="accounts.txt"):
     """Lädt Twitter-Accounts mit optionalen GPT-Einstellungen aus einer Datei.
-    Format: username,model_key,instruction_key
+    Format: username,model_key,instruction_key[,batch]
     Beispiel: elonmusk,default,neutral
+    Mit "batch" als viertem Feld laufen die Zusammenfassungen des Accounts über die
+    Batch-API (BATCH_SUMMARY["enabled"] muss aktiv sein).
     """
     accounts_config = []
     try:
@@ -1065,6 +1484,8 @@ def load_account_config(filename="accounts.txt"):
                     config["model"] = parts[1].strip()
                 if len(parts) >= 3:
                     config["instruction"] = parts[2].strip()
+                if len(parts) >= 4 and parts[3].strip().lower() == "batch":
+                    config["batch"] = True
                     
                 accounts_config.append(config)
         return accounts_config
@@ -1072,22 +1493,9 @@ def load_account_config(filename="accounts.txt"):
         print(f"Fehler beim Laden der Account-Konfiguration: {e}")
         return []
 
-if __name__ == "__main__":
-    # Accounts mit Konfiguration laden
-    accounts_config = load_account_config()
-    
-    # Wenn keine Accounts gefunden wurden, Standardaccounts verwenden
-    if not accounts_config:
-        accounts_config = [
-            {"username": "elonmusk", "model": "default", "instruction": "default"},
-            {"username": "BillGates", "model": "default", "instruction": "default"}
-        ]
-    
-    # Zufällige Reihenfolge der Accounts
-    random.shuffle(accounts_config)
-    
-    print(f"Verarbeite {len(accounts_config)} Twitter-Accounts in zufälliger Reihenfolge\n")
-    
+# Sequentieller Durchlauf (bisheriges Verhalten)
+def run_sequential(accounts_config):
+    """Verarbeitet die Accounts nacheinander, begrenzt durch MAX_ACCOUNTS_PER_RUN."""
     # Begrenze die Anzahl der zu verarbeitenden Accounts
     accounts_to_process = accounts_config[:MAX_ACCOUNTS_PER_RUN]
     
@@ -1110,26 +1518,23 @@ if __name__ == "__main__":
             print(f"Gefundene Tweets für {username}: {len(tweets)}")
             
             # Verarbeite die neuesten Tweets (begrenzt durch MAX_TWEETS_PER_ACCOUNT)
+            failed_ids = set()
             for j, tweet in enumerate(tweets[:MAX_TWEETS_PER_ACCOUNT], 1):
-                tweet_text = tweet.get("text", "")
-                tweet_id = tweet.get("id")
+                tweet_text = tweet.text
+                tweet_id = tweet.id
                 
                 print(f"\n  Tweet {j}/{min(len(tweets), MAX_TWEETS_PER_ACCOUNT)} verarbeiten:")
                 print(f"  Tweet-Text: {tweet_text[:80]}...")
                 
                 # Bewerte die Qualität des Tweets
+                started = time.perf_counter()
                 quality_score, quality_reason = evaluate_tweet_quality(tweet_text, tweet)
+                get_metrics().record("quality", "success" if quality_score >= TWEET_QUALITY_THRESHOLD else "skipped",
+                                     started, "scalar")
                 
                 # Engagement-Metriken anzeigen
-                engagement = 0
-                if "public_metrics" in tweet:
-                    likes = tweet["public_metrics"].get("like_count", 0)
-                    retweets = tweet["public_metrics"].get("retweet_count", 0)
-                    replies = tweet["public_metrics"].get("reply_count", 0)
-                    engagement = likes + retweets + replies
-                    print(f"  Qualitätsbewertung: {quality_score:.2f} ({quality_reason}) | Engagement: {engagement} (👍 {likes}, 🔄 {retweets}, 💬 {replies})")
-                else:
-                    print(f"  Qualitätsbewertung: {quality_score:.2f} ({quality_reason})")
+                print(f"  Qualitätsbewertung: {quality_score:.2f} ({quality_reason}) | Engagement: {tweet.engagement_total} "
+                      f"(👍 {tweet.likes}, 🔄 {tweet.retweets}, 💬 {tweet.replies})")
                 
                 # Wenn die Qualität zu niedrig ist, überspringe diesen Tweet
                 if quality_score < TWEET_QUALITY_THRESHOLD:
@@ -1141,24 +1546,396 @@ if __name__ == "__main__":
                     print(f"  Verarbeite Tweet mit der neuen Medien-Priorisierung und Tonalitäts-Waage...")
                     
                     # Direkter Aufruf der synchronen process_tweet-Funktion
-                    success = process_tweet(tweet, account_config)
+                    success = process_tweet(tweet, account_config, quality=(quality_score, quality_reason))
                     
                     if success:
                         print("  Tweet erfolgreich verarbeitet und an Telegram gesendet!")
                     else:
                         print("  Fehler bei der Verarbeitung des Tweets.")
-                    
-                    # Kurze Pause zwischen Tweets
-                    time.sleep(2)
+                        if success is None:
+                            failed_ids.add(tweet_id)
                         
                 except Exception as tweet_error:
                     print(f"  Fehler bei der Verarbeitung des Tweets: {tweet_error}")
                     print(f"  Überspringe diesen Tweet und fahre mit dem nächsten fort.")
+                    failed_ids.add(tweet_id)
                     continue
+            
+            update_high_water_mark(username, tweets[:MAX_TWEETS_PER_ACCOUNT], failed_ids)
                     
         except Exception as account_error:
             print(f"Fehler bei der Verarbeitung des Accounts: {account_error}")
             print(f"Überspringe diesen Account und fahre mit dem nächsten fort.")
             continue
+
+# Verarbeitung eines Accounts im gemeinsamen Event-Loop
+async def process_account_async(account_config, limiter, index=None, total=None, poll_scheduler=None):
+    """
+    Holt die Tweets eines Accounts und verarbeitet sie nebenläufig.
+    
+    Args:
+        account_config: Konfiguration für den Account
+        limiter: StageLimiter für die Pipeline-Stufen
+        poll_scheduler: Optional, Abfrageplan des Daemon-Modus, der über das Ergebnis informiert wird
+        
+    Returns:
+        int: Anzahl erfolgreich gesendeter Tweets
+    """
+    username = account_config["username"]
+    prefix = f"[{index}/{total}] " if index else ""
+    print(f"{prefix}Account: {username} | Modell: {account_config.get('model', 'default')} | Instruktion: {account_config.get('instruction', 'default')}")
+    
+    try:
+        async with limiter.stage("fetch"):
+            tweets = await get_latest_tweets_async(username)
+    except Exception as account_error:
+        print(f"Fehler beim Abrufen der Tweets für {username}: {account_error}")
+        if poll_scheduler:
+            poll_scheduler.record_failure(username)
+        return 0
+    
+    if tweets is None:
+        # Kein Abruf möglich: als Fehler werten, nicht als leeren Poll (der die Rate des Accounts senken würde)
+        print(f"Tweets für {username} konnten nicht abgerufen werden.")
+        if poll_scheduler:
+            poll_scheduler.record_failure(username)
+        return 0
+    
+    if poll_scheduler:
+        interval = poll_scheduler.record_poll(username, len(tweets), latest_post_time(tweets))
+        print(f"Nächste Abfrage von {username} in ca. {interval / 60:.0f} Minuten")
+    
+    if not tweets:
+        print(f"Keine Tweets für {username} gefunden. Überspringe diesen Account.")
+        return 0
+    
+    print(f"Gefundene Tweets für {username}: {len(tweets)}")
+    tweets_to_process = tweets[:MAX_TWEETS_PER_ACCOUNT]
+    failed_ids = set()
+    sent = await process_tweets_async(account_config, tweets_to_process, limiter, failed_ids)
+    update_high_water_mark(username, tweets_to_process, failed_ids)
+    return sent
+
+# Filter, Zusammenfassung und Versand der abgerufenen (oder wiedergegebenen) Tweets eines Accounts
+async def process_tweets_async(account_config, tweets_to_process, limiter, failed_ids=None):
+    """
+    Bewertet die Tweets eines Accounts und verarbeitet die geeigneten nebenläufig.
+    
+    Args:
+        failed_ids: Optional, Menge, in die die IDs der fehlgeschlagenen Tweets eingetragen werden
+                    (für update_high_water_mark)
+        
+    Returns:
+        int: Anzahl erfolgreich gesendeter Tweets
+    """
+    username = account_config["username"]
+    
+    # Qualität aller Tweets in einem vektorisierten Durchlauf bewerten (Begründungen nur bei Bedarf)
+    metrics = get_metrics()
+    started = time.perf_counter()
+    scores, _ = evaluate_tweet_quality_batch(tweets_to_process)
+    metrics.observe("quality", time.perf_counter() - started, "batch")
+    candidates = []
+    for tweet, score in zip(tweets_to_process, scores):
+        if score < TWEET_QUALITY_THRESHOLD:
+            print(f"Tweet {tweet.id} hat eine zu niedrige Qualität ({score:.2f}). Überspringe.")
+        else:
+            candidates.append((tweet, float(score)))
+    metrics.count("quality", "success", "batch", len(candidates))
+    metrics.count("quality", "skipped", "batch", len(tweets_to_process) - len(candidates))
+    
+    # Tweets des Accounts nebenläufig verarbeiten; die Stufen-Limits begrenzen die Last
+    results = await asyncio.gather(
+        *(process_tweet_async(tweet, account_config, limiter, quality=(score, "")) for tweet, score in candidates),
+        return_exceptions=True
+    )
+    sent = 0
+    for (tweet, _), result in zip(candidates, results):
+        if isinstance(result, Exception):
+            print(f"  Fehler bei der Verarbeitung eines Tweets von {username}: {result}")
+        if result is None or isinstance(result, Exception):
+            if failed_ids is not None:
+                failed_ids.add(tweet.id)
+        elif result:
+            sent += 1
+    return sent
+
+async def run_pipeline_async(accounts_config, limits=None):
+    """
+    Verarbeitet alle Accounts nebenläufig in einem einzigen Event-Loop.
+    Der Durchsatz wird über die Stufen-Limits in PIPELINE_CONCURRENCY gesteuert.
+    
+    Returns:
+        int: Anzahl erfolgreich gesendeter Tweets
+    """
+    limiter = StageLimiter(limits)
+    max_accounts = PIPELINE["max_accounts_per_run"]
+    accounts_to_process = accounts_config[:max_accounts] if max_accounts else accounts_config
+    total = len(accounts_to_process)
+    
+    async def _run_account(index, account_config):
+        async with limiter.stage("accounts"):
+            return await process_account_async(account_config, limiter, index, total)
+    
+    results = await asyncio.gather(
+        *(_run_account(i, account_config) for i, account_config in enumerate(accounts_to_process, 1)),
+        return_exceptions=True
+    )
+    sent = sum(result for result in results if isinstance(result, int))
+    print(f"\n{sent} Tweets aus {total} Accounts an Telegram gesendet.")
+    return sent
+
+# Wiedergabe-Modus: aufgezeichnete Tweets ohne Scraping durch die Pipeline schicken
+async def run_replay_async(accounts_config, archive_file, rate=None, speed=None, limits=None):
+    """
+    Spielt ein mit --record aufgezeichnetes Archiv durch Filter, Zusammenfassung und Versand.
+    Jeder aufgezeichnete Abruf wird wie ein frischer Abruf des Accounts verarbeitet
+    (Modell und Instruktion aus accounts_config, sonst Standardwerte); High-Water-Marks
+    und Abfrageplan bleiben unverändert.
+    
+    Args:
+        accounts_config: Account-Konfigurationen für Modell und Instruktion
+        archive_file: Pfad des gzip-JSONL-Archivs
+        rate: Optional, Tweets pro Sekunde
+        speed: Optional, Zeitraffer-Faktor für die ursprünglichen Abstände
+        limits: Optional, Stufen-Limits statt PIPELINE_CONCURRENCY
+        
+    Returns:
+        int: Anzahl erfolgreich gesendeter Tweets
+    """
+    limiter = StageLimiter(limits)
+    accounts = {config["username"].lower(): config for config in accounts_config}
+    replayed = 0
+    
+    async def _replay_fetch(account_config, tweets):
+        async with limiter.stage("accounts"):
+            return await process_tweets_async(account_config, tweets[:MAX_TWEETS_PER_ACCOUNT], limiter)
+    
+    print(f"Wiedergabe von {archive_file}" + (f" mit {rate} Tweets/s" if rate else f" im Zeitraffer x{speed}" if speed else ""))
+    tasks = []
+    async for username, tweets in replay_archive(archive_file, rate, speed):
+        account_config = accounts.get(username.lower()) or {"username": username, "model": "default", "instruction": "default"}
+        replayed += len(tweets)
+        tasks.append(asyncio.create_task(_replay_fetch(account_config, tweets)))
+    
+    results = await asyncio.gather(*tasks, return_exceptions=True)
+    sent = sum(result for result in results if isinstance(result, int))
+    print(f"\n{sent} von {replayed} wiedergegebenen Tweets an Telegram gesendet.")
+    return sent
+
+# Daemon-Modus: dauerhafter Betrieb mit adaptivem Abfrageplan
+async def run_daemon_async(accounts_config, accounts_file="accounts.txt", limits=None, shard=None):
+    """
+    Fragt die Accounts dauerhaft nach ihrem persistenten Abfrageplan ab (siehe poll_scheduler).
+    Imports, Telegram-Bot und Twitter-Sitzung bleiben über alle Abfragen hinweg erhalten;
+    Änderungen an der Accounts-Datei werden im laufenden Betrieb übernommen.
+    SIGINT/SIGTERM beenden den Daemon, nachdem laufende Abfragen abgeschlossen sind.
+    
+    Args:
+        shard: Optional, WorkerShard (--mode worker); dann fragt dieser Prozess nur die ihm auf dem
+            Hash-Ring zugeordneten Accounts ab und verteilt neu, wenn Worker hinzukommen oder ausfallen
+    """
+    limiter = StageLimiter(limits)
+    scheduler = get_poll_scheduler()
+    idle_sleep = POLL_SCHEDULE["idle_sleep_seconds"]
+    if shard:
+        # Lebenszeichen häufiger senden, als andere Worker auf einen Ausfall schließen
+        idle_sleep = min(idle_sleep, SHARDING["heartbeat_interval_seconds"])
+    stop_event = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        with contextlib.suppress(NotImplementedError, RuntimeError, ValueError):
+            loop.add_signal_handler(sig, stop_event.set)
+    
+    accounts = {config["username"].lower(): config for config in accounts_config}
+    accounts_mtime = os.path.getmtime(accounts_file) if os.path.exists(accounts_file) else None
+    running = {}
+    owned_keys = None
+    # Batch-API: fällige Anfragen einreichen und fertige Batches abholen, höchstens ein Durchlauf gleichzeitig
+    batch_task = None
+    next_batch_run = 0.0
+    
+    async def _poll_account(key, account_config):
+        try:
+            async with limiter.stage("accounts"):
+                await process_account_async(account_config, limiter, poll_scheduler=scheduler)
+        except Exception as account_error:
+            print(f"Fehler bei der Verarbeitung von {account_config['username']}: {account_error}")
+            scheduler.record_failure(account_config["username"])
+        finally:
+            running.pop(key, None)
+    
+    if shard:
+        shard.heartbeat(force=True)
+        print(f"Worker {shard.worker_id} gestartet, {len(shard.workers)} lebende Worker")
+    print(f"Daemon gestartet mit {len(accounts)} Accounts (Beenden mit Strg+C)")
+    try:
+        while not stop_event.is_set():
+            # Accounts-Datei bei Änderung neu laden
+            if os.path.exists(accounts_file) and os.path.getmtime(accounts_file) != accounts_mtime:
+                accounts_mtime = os.path.getmtime(accounts_file)
+                reloaded = load_account_config(accounts_file)
+                if reloaded:
+                    accounts = {config["username"].lower(): config for config in reloaded}
+                    print(f"Accounts-Datei neu geladen: {len(accounts)} Accounts")
+            
+            # Eigenen Anteil der Accounts bestimmen (ohne Worker-Modus: alle)
+            if shard:
+                if shard.heartbeat() and SHARDING["share_telegram_limits"]:
+                    get_telegram_queue().set_share(1.0 / len(shard.workers))
+                keys = shard.owned(accounts)
+            else:
+                keys = list(accounts)
+            if shard and owned_keys is not None and set(keys) != owned_keys:
+                acquired = set(keys) - owned_keys
+                # Übernommene Accounts mit dem zuletzt von ihrem vorherigen Worker gespeicherten Plan fortsetzen
+                scheduler.reload(acquired)
+                print(f"Neu verteilt auf {len(shard.workers)} Worker: {len(acquired)} Accounts übernommen, "
+                      f"{len(owned_keys - set(keys))} abgegeben, {len(keys)} von {len(accounts)} zugeordnet")
+            elif shard and owned_keys is None:
+                if SHARDING["share_telegram_limits"]:
+                    get_telegram_queue().set_share(1.0 / len(shard.workers))
+                print(f"{len(keys)} von {len(accounts)} Accounts diesem Worker zugeordnet")
+            owned_keys = set(keys)
+            
+            scheduler.sync_accounts(keys)
+            for key in scheduler.due_accounts([k for k in keys if k not in running]):
+                running[key] = asyncio.create_task(_poll_account(key, accounts[key]))
+            
+            if (batch_task is None or batch_task.done()) and time.monotonic() >= next_batch_run:
+                batch_task = asyncio.create_task(run_batches_async(limiter))
+                next_batch_run = time.monotonic() + BATCH_SUMMARY["poll_interval_seconds"]
+            
+            wait = scheduler.seconds_until_next([k for k in keys if k not in running])
+            wait = idle_sleep if wait is None else min(max(wait, 1.0), idle_sleep)
+            
+            # Prometheus-Datei regelmäßig aktualisieren (der Daemon hat kein Laufende)
+            try:
+                get_metrics().write_prometheus_file()
+            except OSError as e:
+                print(f"Fehler beim Schreiben der Metriken: {e}")
+            with contextlib.suppress(asyncio.TimeoutError):
+                await asyncio.wait_for(stop_event.wait(), timeout=wait)
+    finally:
+        if running:
+            print(f"Warte auf {len(running)} laufende Abfragen...")
+            await asyncio.gather(*running.values(), return_exceptions=True)
+        if batch_task:
+            await asyncio.gather(batch_task, return_exceptions=True)
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            with contextlib.suppress(NotImplementedError, RuntimeError, ValueError):
+                loop.remove_signal_handler(sig)
+        if shard:
+            # Abmelden, damit die übrigen Worker die Accounts sofort übernehmen
+            shard.leave()
+    print("Daemon beendet.")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Twitter → Telegram KI-Bot")
+    parser.add_argument("--mode", choices=["async", "sequential", "daemon", "worker", "replay"], default=PIPELINE["mode"],
+                        help="async: alle Accounts nebenläufig in einem Event-Loop, sequential: bisheriger Ablauf, "
+                             "daemon: dauerhafter Betrieb mit adaptivem Abfrageplan pro Account, "
+                             "worker: wie daemon, die Accounts werden aber auf alle laufenden Worker verteilt, "
+                             "replay: aufgezeichnete Tweets (--replay-file) ohne Scraping verarbeiten")
+    parser.add_argument("--worker-id", default=SHARDING["worker_id"],
+                        help="Kennung dieses Workers für --mode worker (Standard: Rechnername:PID)")
+    parser.add_argument("--record", default=TWEET_ARCHIVE["record_file"], metavar="ARCHIV",
+                        help="Jeden abgerufenen Tweet an dieses gzip-JSONL-Archiv anhängen (z.B. tweets.jsonl.gz)")
+    parser.add_argument("--replay-file", default=TWEET_ARCHIVE["replay_file"], metavar="ARCHIV",
+                        help="Archiv für --mode replay")
+    parser.add_argument("--replay-rate", type=float, default=TWEET_ARCHIVE["replay_rate"],
+                        help="Wiedergabe mit dieser Rate (Tweets pro Sekunde)")
+    parser.add_argument("--replay-speed", type=float, default=TWEET_ARCHIVE["replay_speed"],
+                        help="Wiedergabe in den ursprünglichen Abständen, beschleunigt um diesen Faktor")
+    parser.add_argument("--no-llm-cache", action="store_true",
+                        help="LLM-Antwort-Cache umgehen und jede Zusammenfassung neu erzeugen")
+    parser.add_argument("--structured-summary", action="store_true",
+                        help="Zusammenfassung, Kommentarstil und DALL-E-Prompt in einem JSON-Aufruf erzeugen (STRUCTURED_SUMMARY)")
+    parser.add_argument("--batch-wait", action="store_true",
+                        help="Nach dem Lauf auf laufende Batches (BATCH_SUMMARY) warten und ihre Ergebnisse senden")
+    parser.add_argument("--metrics-port", type=int, default=None,
+                        help="Prometheus-Metriken unter http://127.0.0.1:PORT/metrics bereitstellen (Standard: METRICS in config.py)")
+    args = parser.parse_args()
+    
+    # Zugangsdaten aus der .env-Datei laden und ihren Status ausgeben (Clients entstehen erst bei Bedarf)
+    print_environment_status()
+    
+    if args.no_llm_cache:
+        get_llm_cache().enabled = False
+    
+    if args.structured_summary:
+        STRUCTURED_SUMMARY["enabled"] = True
+    
+    if args.worker_id:
+        SHARDING["worker_id"] = args.worker_id
+    
+    if args.mode == "replay" and not args.replay_file:
+        parser.error("--mode replay benötigt --replay-file")
+    if args.record and args.mode != "replay":
+        get_tweet_archive(args.record)
+    
+    start_metrics_server(args.metrics_port)
+    
+    # Accounts mit Konfiguration laden
+    accounts_config = load_account_config()
+    
+    # Wenn keine Accounts gefunden wurden, Standardaccounts verwenden
+    if not accounts_config:
+        accounts_config = [
+            {"username": "elonmusk", "model": "default", "instruction": "default"},
+            {"username": "BillGates", "model": "default", "instruction": "default"}
+        ]
+    
+    # Zufällige Reihenfolge der Accounts
+    random.shuffle(accounts_config)
+    
+    print(f"Verarbeite {len(accounts_config)} Twitter-Accounts in zufälliger Reihenfolge\n")
+    
+    if args.mode == "replay":
+        run_sync(run_replay_async(accounts_config, args.replay_file, args.replay_rate, args.replay_speed))
+    elif args.mode == "daemon":
+        run_sync(run_daemon_async(accounts_config))
+    elif args.mode == "worker":
+        run_sync(run_daemon_async(accounts_config, shard=WorkerShard()))
+    elif args.mode == "async":
+        run_sync(run_pipeline_async(accounts_config))
+    else:
+        run_sequential(accounts_config)
+    
+    # Eingereihte Batch-Anfragen einreichen und fertige Batches (auch aus früheren Läufen) senden
+    if args.mode not in ("daemon", "worker"):
+        run_sync(run_batches_async(flush=True, wait=args.batch_wait))
+    
+    recorded = close_tweet_archive()
+    if recorded is not None:
+        print(f"{recorded} abgerufene Tweets aufgezeichnet in {args.record}")
+    
+    send_stats = run_sync(close_telegram_queue())
+    if send_stats:
+        print(f"Telegram-Warteschlange: {send_stats['sent']} gesendet, {send_stats['failed']} fehlgeschlagen, "
+              f"{send_stats['retries']} RetryAfter ({send_stats['retry_after_seconds']:.0f}s), "
+              f"max. Tiefe {send_stats['max_depth']}, Wartezeit Ø {send_stats['avg_wait_seconds']:.1f}s / "
+              f"max. {send_stats['max_wait_seconds']:.1f}s")
+    
+    cache_stats = get_llm_cache().stats()
+    print(f"LLM-Cache: {cache_stats['hits']} Treffer, {cache_stats['misses']} Fehlschläge, {cache_stats['entries']} Einträge")
+    
+    token_lines = get_token_usage().summary_lines()
+    if token_lines:
+        print("Token-Verbrauch:")
+        for line in token_lines:
+            print(line)
+    
+    # Metriken pro Stufe ausgeben und exportieren
+    metrics = get_metrics()
+    print("Pipeline-Stufen:")
+    for line in metrics.summary_lines():
+        print(line)
+    try:
+        written = [path for path in (metrics.write_prometheus_file(), metrics.write_json_summary()) if path]
+        if written:
+            print(f"Metriken gespeichert: {', '.join(written)}")
+    except OSError as e:
+        print(f"Fehler beim Schreiben der Metriken: {e}")
             
     print("\nVerarbeitung aller Accounts abgeschlossen.")
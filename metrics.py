@@ -0,0 +1,309 @@
+# -*- coding: utf-8 -*-
+
+"""
+Laufzeit- und Durchsatzmetriken der Pipeline-Stufen.
+Jede Stufe (fetch, parse, dedup, quality, summarize, image_prompt, image, media, batch, send) meldet
+Dauer und Ergebnis pro Quelle, z.B. fetch/twscrape, fetch/nitter oder summarize/gpt-4o.
+Ergebnisse sind success, failure, fallback (Ausweichweg genutzt), cached (aus einem Cache
+bedient) und skipped (Tweet aussortiert).
+
+Die Werte werden als Histogramme und Zähler im Prometheus-Textformat ausgegeben
+(als Datei für den Textfile-Collector oder über einen /metrics-Endpunkt) und am Ende
+eines Laufs als JSON-Zusammenfassung mit Perzentilen geschrieben.
+"""
+
+import os
+import json
+import math
+import time
+import bisect
+import datetime
+import threading
+from collections import deque
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+from config import METRICS
+
+_PREFIX = "xnewsagent"
+
+
+def _escape_label(value):
+    return str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def _labels(**labels):
+    return "{" + ",".join(f'{key}="{_escape_label(value)}"' for key, value in labels.items()) + "}"
+
+
+def _percentile(sorted_values, fraction):
+    """Perzentil nach dem Nearest-Rank-Verfahren."""
+    if not sorted_values:
+        return None
+    rank = max(1, math.ceil(fraction * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+class _Series:
+    """Messwerte einer Kombination aus Stufe und Quelle."""
+
+    def __init__(self, num_buckets, max_samples):
+        self.bucket_counts = [0] * num_buckets
+        self.duration_count = 0
+        self.duration_sum = 0.0
+        self.duration_max = 0.0
+        self.samples = deque(maxlen=max_samples)
+        self.outcomes = {}
+
+
+class _Timer:
+    """Kontextmanager für PipelineMetrics.timer; das Ergebnis lässt sich über outcome setzen."""
+
+    def __init__(self, metrics, stage, source):
+        self.metrics = metrics
+        self.stage = stage
+        self.source = source
+        self.outcome = "success"
+        self.started = None
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.metrics.record(self.stage, "failure" if exc_type else self.outcome, self.started, self.source)
+        return False
+
+
+class PipelineMetrics:
+    """Prozessweite Histogramme und Zähler pro Pipeline-Stufe und Quelle (threadsicher)."""
+
+    def __init__(self, settings=None):
+        self.settings = dict(METRICS if settings is None else settings)
+        self.enabled = self.settings["enabled"]
+        self.buckets = sorted(self.settings["buckets"])
+        self.started_at = time.time()
+        self._series = {}
+        self._tokens = {}
+        self._lock = threading.Lock()
+
+    def _get_series(self, stage, source):
+        series = self._series.get((stage, source))
+        if series is None:
+            series = _Series(len(self.buckets), self.settings["max_samples"])
+            self._series[(stage, source)] = series
+        return series
+
+    def observe(self, stage, seconds, source=""):
+        """Erfasst eine Dauer (in Sekunden), ohne ein Ergebnis zu zählen."""
+        if not self.enabled:
+            return
+        with self._lock:
+            series = self._get_series(stage, source)
+            index = bisect.bisect_left(self.buckets, seconds)
+            if index < len(self.buckets):
+                series.bucket_counts[index] += 1
+            series.duration_count += 1
+            series.duration_sum += seconds
+            series.duration_max = max(series.duration_max, seconds)
+            series.samples.append(seconds)
+
+    def count(self, stage, outcome, source="", amount=1):
+        """Zählt ein Ergebnis, ohne eine Dauer zu erfassen."""
+        if not self.enabled or not amount:
+            return
+        with self._lock:
+            outcomes = self._get_series(stage, source).outcomes
+            outcomes[outcome] = outcomes.get(outcome, 0) + amount
+
+    def record(self, stage, outcome="success", started=None, source=""):
+        """
+        Zählt ein Ergebnis einer Stufe und erfasst ihre Dauer.
+
+        Args:
+            stage: Name der Stufe (z.B. "fetch")
+            outcome: success, failure, fallback, cached oder skipped
+            started: Startzeitpunkt aus time.perf_counter(); ohne Startzeit wird nur gezählt
+            source: Quelle bzw. Variante der Stufe (z.B. "twscrape" oder der Modellname)
+        """
+        if started is not None:
+            self.observe(stage, time.perf_counter() - started, source)
+        self.count(stage, outcome, source)
+
+    def count_tokens(self, stage, model, prompt_tokens, completion_tokens):
+        """Zählt den Token-Verbrauch eines LLM-Aufrufs (pro Stufe und Modell, siehe token_budget)."""
+        if not self.enabled:
+            return
+        with self._lock:
+            prompt, completion = self._tokens.get((stage, model), (0, 0))
+            self._tokens[(stage, model)] = (prompt + prompt_tokens, completion + completion_tokens)
+
+    def timer(self, stage, source=""):
+        """Misst einen Block; Ausnahmen werden als failure gezählt und weitergereicht."""
+        return _Timer(self, stage, source)
+
+    def render_prometheus(self):
+        """Gibt alle Metriken im Prometheus-Textformat zurück."""
+        with self._lock:
+            series = sorted(self._series.items())
+            lines = [
+                f"# HELP {_PREFIX}_stage_duration_seconds Dauer eines Aufrufs der Pipeline-Stufe",
+                f"# TYPE {_PREFIX}_stage_duration_seconds histogram",
+            ]
+            for (stage, source), values in series:
+                if not values.duration_count:
+                    continue
+                cumulative = 0
+                for bound, bucket_count in zip(self.buckets, values.bucket_counts):
+                    cumulative += bucket_count
+                    lines.append(f"{_PREFIX}_stage_duration_seconds_bucket"
+                                 f"{_labels(stage=stage, source=source, le=repr(float(bound)))} {cumulative}")
+                lines.append(f"{_PREFIX}_stage_duration_seconds_bucket"
+                             f"{_labels(stage=stage, source=source, le='+Inf')} {values.duration_count}")
+                lines.append(f"{_PREFIX}_stage_duration_seconds_sum{_labels(stage=stage, source=source)} "
+                             f"{values.duration_sum!r}")
+                lines.append(f"{_PREFIX}_stage_duration_seconds_count{_labels(stage=stage, source=source)} "
+                             f"{values.duration_count}")
+
+            lines += [
+                f"# HELP {_PREFIX}_stage_results_total Ergebnisse der Pipeline-Stufe (success, failure, fallback, cached, skipped)",
+                f"# TYPE {_PREFIX}_stage_results_total counter",
+            ]
+            for (stage, source), values in series:
+                for outcome, value in sorted(values.outcomes.items()):
+                    lines.append(f"{_PREFIX}_stage_results_total"
+                                 f"{_labels(stage=stage, source=source, outcome=outcome)} {value}")
+
+            lines += [
+                f"# HELP {_PREFIX}_llm_tokens_total Verbrauchte Tokens der LLM-Aufrufe (prompt, completion)",
+                f"# TYPE {_PREFIX}_llm_tokens_total counter",
+            ]
+            for (stage, model), (prompt, completion) in sorted(self._tokens.items()):
+                lines.append(f"{_PREFIX}_llm_tokens_total{_labels(stage=stage, model=model, kind='prompt')} {prompt}")
+                lines.append(f"{_PREFIX}_llm_tokens_total{_labels(stage=stage, model=model, kind='completion')} {completion}")
+
+        lines += [
+            f"# HELP {_PREFIX}_process_start_time_seconds Startzeitpunkt des Prozesses (Unix-Zeit)",
+            f"# TYPE {_PREFIX}_process_start_time_seconds gauge",
+            f"{_PREFIX}_process_start_time_seconds {self.started_at!r}",
+        ]
+        return "\n".join(lines) + "\n"
+
+    def summary(self):
+        """
+        Fasst die bisherigen Messwerte pro Stufe und Quelle zusammen.
+
+        Returns:
+            dict: {"stages": {stage: {source: {"calls", "outcomes", "total_seconds",
+                   "mean_seconds", "p50_seconds", "p95_seconds", "max_seconds"}}},
+                   "tokens": {stage: {model: {"prompt", "completion"}}}, ...}
+        """
+        finished_at = time.time()
+        stages = {}
+        with self._lock:
+            for (stage, source), values in sorted(self._series.items()):
+                samples = sorted(values.samples)
+                stages.setdefault(stage, {})[source or "-"] = {
+                    "calls": values.duration_count,
+                    "outcomes": dict(sorted(values.outcomes.items())),
+                    "total_seconds": round(values.duration_sum, 6),
+                    "mean_seconds": round(values.duration_sum / values.duration_count, 6) if values.duration_count else None,
+                    "p50_seconds": _percentile(samples, 0.5),
+                    "p95_seconds": _percentile(samples, 0.95),
+                    "max_seconds": values.duration_max if values.duration_count else None,
+                }
+            tokens = {}
+            for (stage, model), (prompt, completion) in sorted(self._tokens.items()):
+                tokens.setdefault(stage, {})[model] = {"prompt": prompt, "completion": completion}
+        return {
+            "started_at": datetime.datetime.fromtimestamp(self.started_at, datetime.timezone.utc).isoformat(),
+            "finished_at": datetime.datetime.fromtimestamp(finished_at, datetime.timezone.utc).isoformat(),
+            "duration_seconds": round(finished_at - self.started_at, 3),
+            "stages": stages,
+            "tokens": tokens,
+        }
+
+    def summary_lines(self):
+        """Kurzfassung der Zusammenfassung für die Konsolenausgabe (eine Zeile pro Stufe und Quelle)."""
+        lines = []
+        for stage, sources in self.summary()["stages"].items():
+            for source, values in sources.items():
+                outcomes = ", ".join(f"{outcome} {value}" for outcome, value in values["outcomes"].items())
+                timing = ""
+                if values["calls"]:
+                    timing = f" | Ø {values['mean_seconds']:.3f}s, p95 {values['p95_seconds']:.3f}s"
+                lines.append(f"  {stage:<13} {source:<20} {outcomes}{timing}")
+        return lines
+
+    @staticmethod
+    def _write_atomic(path, content):
+        # Erst vollständig schreiben, dann ersetzen, damit Leser nie eine halbe Datei sehen
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(content)
+        os.replace(tmp_path, path)
+
+    def write_prometheus_file(self, path=None):
+        """
+        Schreibt die Metriken im Prometheus-Textformat (Standard: METRICS["prometheus_file"]).
+
+        Returns:
+            str: Pfad der geschriebenen Datei oder None, wenn der Export deaktiviert ist
+        """
+        path = path or self.settings["prometheus_file"]
+        if not (self.enabled and path):
+            return None
+        self._write_atomic(path, self.render_prometheus())
+        return path
+
+    def write_json_summary(self, path=None):
+        """Schreibt die Zusammenfassung als JSON (Standard: METRICS["json_summary_file"]); Rückgabe wie oben."""
+        path = path or self.settings["json_summary_file"]
+        if not (self.enabled and path):
+            return None
+        self._write_atomic(path, json.dumps(self.summary(), ensure_ascii=False, indent=2))
+        return path
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] not in ("/metrics", "/"):
+            self.send_error(404)
+            return
+        body = get_metrics().render_prometheus().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass  # Abfragen des Scrapers nicht protokollieren
+
+
+def start_metrics_server(port=None, host=None):
+    """
+    Startet den /metrics-Endpunkt in einem Hintergrund-Thread.
+
+    Returns:
+        Den laufenden Server oder None, wenn kein Port konfiguriert ist (Port 0 = beliebiger freier Port)
+    """
+    port = port if port is not None else METRICS["http_port"]
+    if port is None:
+        return None
+    server = ThreadingHTTPServer((host or METRICS["http_host"], port), _MetricsHandler)
+    threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+    print(f"Metriken unter http://{server.server_address[0]}:{server.server_address[1]}/metrics")
+    return server
+
+
+_metrics = None
+_metrics_lock = threading.Lock()
+
+
+def get_metrics():
+    """Gibt die prozessweiten Pipeline-Metriken zurück."""
+    global _metrics
+    with _metrics_lock:
+        if _metrics is None:
+            _metrics = PipelineMetrics()
+        return _metrics
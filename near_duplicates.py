@@ -0,0 +1,214 @@
+# -*- coding: utf-8 -*-
+
+"""
+Erkennung von Beinahe-Duplikaten über MinHash und Locality-Sensitive Hashing (LSH).
+Jeder Tweet wird normalisiert (Kleinschreibung, ohne URLs und Satzzeichen) und in
+Zeichen-Shingles zerlegt; daraus entsteht eine MinHash-Signatur, deren Bänder als
+Buckets im State-Store indiziert werden. Eine Abfrage liest nur die Tweets, die mindestens
+ein Band teilen (Index-Lookup statt Vergleich mit dem gesamten Cache), und bestätigt
+Kandidaten über die geschätzte Jaccard-Ähnlichkeit der Signaturen.
+
+Damit werden leicht bearbeitete Tweets, Reposts mit neuer URL und über mehrere
+Accounts kopierte Texte als Duplikate erkannt.
+"""
+
+import re
+import time
+import struct
+import random
+import hashlib
+import threading
+import unicodedata
+
+from config import NEAR_DUPLICATE
+from state_store import get_state_store
+
+try:
+    import numpy as np
+except ImportError:  # NumPy ist optional
+    np = None
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS near_duplicate_signatures (
+    tweet_hash TEXT PRIMARY KEY,
+    tweet_id   TEXT,
+    signature  BLOB NOT NULL,
+    timestamp  REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_near_duplicate_timestamp ON near_duplicate_signatures (timestamp);
+CREATE TABLE IF NOT EXISTS near_duplicate_bands (
+    band       INTEGER NOT NULL,
+    bucket     INTEGER NOT NULL,
+    tweet_hash TEXT NOT NULL,
+    PRIMARY KEY (band, bucket, tweet_hash)
+);
+CREATE INDEX IF NOT EXISTS idx_near_duplicate_bands_hash ON near_duplicate_bands (tweet_hash);
+"""
+
+# Größte Primzahl unter 2^32; Koeffizienten < 2^32 halten a*x im uint64-Bereich
+_PRIME = 4294967291
+_URL = re.compile(r"https?://\S+|www\.\S+")
+_NON_WORD = re.compile(r"[^\w]+")
+
+
+def normalize_for_shingles(text):
+    """Entfernt URLs, Satzzeichen, Groß-/Kleinschreibung und überflüssigen Leerraum."""
+    text = unicodedata.normalize("NFKC", text or "").lower()
+    text = _URL.sub(" ", text)
+    return _NON_WORD.sub(" ", text).strip()
+
+
+def shingle_hashes(text, size):
+    """Gibt die 32-Bit-Hashes aller Zeichen-Shingles der Länge size zurück (prozessunabhängig stabil)."""
+    text = normalize_for_shingles(text)
+    shingles = {text[i:i + size] for i in range(max(len(text) - size + 1, 0))}
+    return [int.from_bytes(hashlib.blake2b(s.encode("utf-8"), digest_size=4).digest(), "little") for s in shingles]
+
+
+class NearDuplicateIndex:
+    """Persistenter MinHash-LSH-Index der zuletzt verarbeiteten Tweets."""
+
+    def __init__(self, store=None, settings=None):
+        self.settings = dict(NEAR_DUPLICATE if settings is None else settings)
+        self.store = store or get_state_store()
+        self.bands = self.settings["num_bands"]
+        self.rows = self.settings["rows_per_band"]
+        self.num_perm = self.bands * self.rows
+        self.threshold = self.settings["similarity_threshold"]
+        rng = random.Random(self.settings["seed"])
+        self._a = [rng.randrange(1, 2 ** 32) for _ in range(self.num_perm)]
+        self._b = [rng.randrange(0, _PRIME) for _ in range(self.num_perm)]
+        if np is not None:
+            self._a_np = np.array(self._a, dtype=np.uint64)[:, None]
+            self._b_np = np.array(self._b, dtype=np.uint64)[:, None]
+        self._lock = threading.Lock()
+        self.store.ensure_schema(_SCHEMA)
+        self._reset_if_parameters_changed()
+        self.store.add_compaction_hook(self.compact)
+
+    def _reset_if_parameters_changed(self):
+        """Signaturen mit anderen Parametern sind nicht vergleichbar und werden verworfen."""
+        params = f"{self.bands}x{self.rows}/{self.settings['shingle_size']}/{self.settings['seed']}"
+        if self.store.get_meta("near_duplicate_params") != params:
+            with self.store.transaction() as conn:
+                conn.execute("DELETE FROM near_duplicate_bands")
+                conn.execute("DELETE FROM near_duplicate_signatures")
+            self.store.set_meta("near_duplicate_params", params)
+
+    def signature(self, text):
+        """
+        Berechnet die MinHash-Signatur eines Textes.
+
+        Returns:
+            tuple: num_perm Minima oder None, wenn der Text zu wenige Shingles enthält
+        """
+        hashes = shingle_hashes(text, self.settings["shingle_size"])
+        if len(hashes) < self.settings["min_shingles"]:
+            return None
+        if np is not None:
+            x = np.array(hashes, dtype=np.uint64)[None, :]
+            values = ((self._a_np * x) % _PRIME + self._b_np) % _PRIME
+            return tuple(int(v) for v in values.min(axis=1))
+        return tuple(min((a * x + b) % _PRIME for x in hashes) for a, b in zip(self._a, self._b))
+
+    def _buckets(self, signature):
+        """Ein Bucket-Schlüssel (vorzeichenbehafteter 64-Bit-Hash) pro Band."""
+        buckets = []
+        for band in range(self.bands):
+            rows = signature[band * self.rows:(band + 1) * self.rows]
+            digest = hashlib.blake2b(struct.pack(f"<{self.rows}I", *rows), digest_size=8).digest()
+            buckets.append((band, int.from_bytes(digest, "little", signed=True)))
+        return buckets
+
+    @staticmethod
+    def similarity(signature_a, signature_b):
+        """Geschätzte Jaccard-Ähnlichkeit: Anteil übereinstimmender Minima."""
+        return sum(1 for a, b in zip(signature_a, signature_b) if a == b) / len(signature_a)
+
+    def _cutoff(self):
+        return time.time() - self.store.cache_days * 24 * 60 * 60
+
+    def find_similar(self, text, signature=None, exclude=None):
+        """
+        Sucht einen nicht abgelaufenen, ähnlichen Tweet im Index.
+
+        Args:
+            exclude: Optional, Hash des Tweets selbst (z.B. wenn seine Signatur schon eingetragen
+                     wurde, bevor ein anderer Worker ihn übernommen hat)
+
+        Returns:
+            tuple: (tweet_hash, tweet_id, Ähnlichkeit) des ähnlichsten Treffers oder None
+        """
+        signature = signature or self.signature(text)
+        if signature is None:
+            return None
+        buckets = self._buckets(signature)
+        condition = " OR ".join(["(b.band = ? AND b.bucket = ?)"] * len(buckets))
+        params = [value for bucket in buckets for value in bucket] + [self._cutoff()]
+        rows = self.store.execute(
+            "SELECT DISTINCT s.tweet_hash, s.tweet_id, s.signature FROM near_duplicate_bands b "
+            "JOIN near_duplicate_signatures s ON s.tweet_hash = b.tweet_hash "
+            f"WHERE ({condition}) AND s.timestamp > ?",
+            params
+        ).fetchall()
+        best = None
+        for tweet_hash, tweet_id, blob in rows:
+            if tweet_hash == exclude:
+                continue
+            similarity = self.similarity(signature, struct.unpack(f"<{self.num_perm}I", blob))
+            if similarity >= self.threshold and (best is None or similarity > best[2]):
+                best = (tweet_hash, tweet_id, similarity)
+        return best
+
+    def add(self, tweet_hash, text, tweet_id=None, signature=None, timestamp=None):
+        """Nimmt einen Tweet in den Index auf (bzw. aktualisiert seinen Zeitstempel)."""
+        signature = signature or self.signature(text)
+        if signature is None:
+            return False
+        blob = struct.pack(f"<{self.num_perm}I", *signature)
+        with self._lock, self.store.transaction() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO near_duplicate_signatures (tweet_hash, tweet_id, signature, timestamp) "
+                "VALUES (?, ?, ?, ?)",
+                (tweet_hash, str(tweet_id) if tweet_id else None, blob, timestamp or time.time())
+            )
+            conn.executemany(
+                "INSERT OR IGNORE INTO near_duplicate_bands (band, bucket, tweet_hash) VALUES (?, ?, ?)",
+                [(band, bucket, tweet_hash) for band, bucket in self._buckets(signature)]
+            )
+        return True
+
+    def remove(self, tweet_hash):
+        """Nimmt einen Tweet wieder aus dem Index (z.B. wenn er doch nicht gesendet wurde)."""
+        with self._lock, self.store.transaction() as conn:
+            conn.execute("DELETE FROM near_duplicate_bands WHERE tweet_hash = ?", (tweet_hash,))
+            conn.execute("DELETE FROM near_duplicate_signatures WHERE tweet_hash = ?", (tweet_hash,))
+
+    def count(self):
+        return self.store.execute("SELECT COUNT(*) FROM near_duplicate_signatures").fetchone()[0]
+
+    def compact(self):
+        """Entfernt abgelaufene Signaturen samt ihrer Buckets."""
+        with self._lock, self.store.transaction() as conn:
+            conn.execute(
+                "DELETE FROM near_duplicate_bands WHERE tweet_hash IN "
+                "(SELECT tweet_hash FROM near_duplicate_signatures WHERE timestamp <= ?)",
+                (self._cutoff(),)
+            )
+            conn.execute("DELETE FROM near_duplicate_signatures WHERE timestamp <= ?", (self._cutoff(),))
+
+
+# Geöffnete Indizes pro State-Store
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+
+def get_near_duplicate_index(store=None):
+    """Gibt den Beinahe-Duplikat-Index für einen State-Store zurück (Standard: prozessweiter Store)."""
+    store = store or get_state_store()
+    with _indexes_lock:
+        index = _indexes.get(id(store))
+        if index is None:
+            index = NearDuplicateIndex(store)
+            _indexes[id(store)] = index
+        return index
@@ -0,0 +1,173 @@
+# -*- coding: utf-8 -*-
+
+"""
+Gesundheitsbewertung der Nitter-Instanzen mit Circuit Breakern.
+Pro Instanz werden ein gleitender Mittelwert (EWMA) der Latenz und der Erfolgsquote,
+der Zeitpunkt des letzten 429 und der Zustand des Circuit Breakers geführt und im
+State-Store gespeichert, damit ein neuer Lauf nicht wieder bei null beginnt.
+
+Zustände des Circuit Breakers:
+    closed    - Instanz wird normal verwendet
+    open      - Instanz wird bis zum Ablauf der Sperrzeit übersprungen
+    half_open - Sperrzeit abgelaufen, die nächste Anfrage dient als Probe
+"""
+
+import time
+import threading
+
+from config import NITTER_HEALTH
+from state_store import get_state_store
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS nitter_health (
+    instance             TEXT PRIMARY KEY,
+    latency_ewma         REAL,
+    success_ewma         REAL NOT NULL,
+    last_429             REAL,
+    consecutive_failures INTEGER NOT NULL,
+    state                TEXT NOT NULL,
+    opened_at            REAL,
+    open_seconds         REAL,
+    updated_at           REAL NOT NULL
+);
+"""
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class NitterHealthTracker:
+    """Führt Latenz, Erfolgsquote und Circuit-Breaker-Zustand pro Nitter-Instanz."""
+
+    def __init__(self, instances, store=None, settings=None):
+        self.settings = dict(NITTER_HEALTH if settings is None else settings)
+        self.store = store or get_state_store()
+        self.store.ensure_schema(_SCHEMA)
+        self._lock = threading.Lock()
+        self._health = {}
+        rows = self.store.execute(
+            "SELECT instance, latency_ewma, success_ewma, last_429, consecutive_failures, state, opened_at, open_seconds "
+            "FROM nitter_health"
+        ).fetchall()
+        for row in rows:
+            self._health[row[0]] = {
+                "latency_ewma": row[1], "success_ewma": row[2], "last_429": row[3],
+                "consecutive_failures": row[4], "state": row[5], "opened_at": row[6], "open_seconds": row[7]
+            }
+        for instance in instances:
+            self._health.setdefault(instance, self._new_entry())
+        self.instances = list(instances)
+
+    def _new_entry(self):
+        return {
+            "latency_ewma": None, "success_ewma": self.settings["initial_success_rate"], "last_429": None,
+            "consecutive_failures": 0, "state": CLOSED, "opened_at": None, "open_seconds": None
+        }
+
+    def _save(self, instance, entry):
+        self.store.execute(
+            "INSERT OR REPLACE INTO nitter_health (instance, latency_ewma, success_ewma, last_429, consecutive_failures, "
+            "state, opened_at, open_seconds, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (instance, entry["latency_ewma"], entry["success_ewma"], entry["last_429"], entry["consecutive_failures"],
+             entry["state"], entry["opened_at"], entry["open_seconds"], time.time())
+        )
+
+    def _current_state(self, entry, now):
+        """Wechselt von open nach half_open, sobald die Sperrzeit abgelaufen ist."""
+        if entry["state"] == OPEN and now - (entry["opened_at"] or 0) >= (entry["open_seconds"] or 0):
+            entry["state"] = HALF_OPEN
+        return entry["state"]
+
+    def _score(self, entry):
+        """Höher ist besser: Erfolgsquote geteilt durch erwartete Latenz."""
+        latency = entry["latency_ewma"] if entry["latency_ewma"] is not None else self.settings["assumed_latency_seconds"]
+        return entry["success_ewma"] / (latency + 0.1)
+
+    def ranked_instances(self):
+        """
+        Gibt die Instanzen in der Reihenfolge zurück, in der sie angefragt werden sollen.
+        Geschlossene Instanzen nach Score, danach halb offene als Probe; offene werden übersprungen.
+        Sind alle Instanzen offen, werden sie nach dem ältesten Öffnungszeitpunkt zurückgegeben.
+        """
+        now = time.time()
+        with self._lock:
+            closed, half_open, opened = [], [], []
+            for instance in self.instances:
+                entry = self._health[instance]
+                state = self._current_state(entry, now)
+                if state == CLOSED:
+                    closed.append(instance)
+                elif state == HALF_OPEN:
+                    half_open.append(instance)
+                else:
+                    opened.append(instance)
+            closed.sort(key=lambda i: self._score(self._health[i]), reverse=True)
+            half_open.sort(key=lambda i: self._score(self._health[i]), reverse=True)
+            if closed or half_open:
+                return closed + half_open
+            return sorted(opened, key=lambda i: self._health[i]["opened_at"] or 0)
+
+    def _update_ewma(self, entry, success, latency=None):
+        alpha = self.settings["ewma_alpha"]
+        entry["success_ewma"] = (1 - alpha) * entry["success_ewma"] + alpha * (1.0 if success else 0.0)
+        if latency is not None:
+            if entry["latency_ewma"] is None:
+                entry["latency_ewma"] = latency
+            else:
+                entry["latency_ewma"] = (1 - alpha) * entry["latency_ewma"] + alpha * latency
+
+    def _open(self, entry, now, open_seconds):
+        entry["state"] = OPEN
+        entry["opened_at"] = now
+        entry["open_seconds"] = min(open_seconds, self.settings["max_open_seconds"])
+
+    def record_success(self, instance, latency):
+        with self._lock:
+            entry = self._health.setdefault(instance, self._new_entry())
+            self._update_ewma(entry, True, latency)
+            entry["consecutive_failures"] = 0
+            entry["state"] = CLOSED
+            entry["opened_at"] = None
+            entry["open_seconds"] = None
+            self._save(instance, entry)
+
+    def record_failure(self, instance, latency=None):
+        now = time.time()
+        with self._lock:
+            entry = self._health.setdefault(instance, self._new_entry())
+            previous_state = self._current_state(entry, now)
+            self._update_ewma(entry, False, latency)
+            entry["consecutive_failures"] += 1
+            if previous_state == HALF_OPEN:
+                # Probe gescheitert: Sperrzeit verdoppeln
+                self._open(entry, now, (entry["open_seconds"] or self.settings["open_seconds"]) * 2)
+            elif entry["consecutive_failures"] >= self.settings["failure_threshold"]:
+                self._open(entry, now, self.settings["open_seconds"])
+            self._save(instance, entry)
+
+    def record_rate_limited(self, instance):
+        """Ein 429 öffnet den Circuit Breaker sofort für die Rate-Limit-Sperrzeit."""
+        now = time.time()
+        with self._lock:
+            entry = self._health.setdefault(instance, self._new_entry())
+            self._update_ewma(entry, False)
+            entry["consecutive_failures"] += 1
+            entry["last_429"] = now
+            self._open(entry, now, self.settings["rate_limit_open_seconds"])
+            self._save(instance, entry)
+
+    def snapshot(self):
+        with self._lock:
+            return {instance: dict(entry) for instance, entry in self._health.items()}
+
+
+_tracker = None
+
+
+def get_nitter_health(instances):
+    """Gibt den prozessweiten Health-Tracker für die konfigurierten Instanzen zurück."""
+    global _tracker
+    if _tracker is None:
+        _tracker = NitterHealthTracker(instances)
+    return _tracker
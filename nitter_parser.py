@@ -0,0 +1,324 @@
+# -*- coding: utf-8 -*-
+
+"""
+Parser für Nitter-Timeline-Seiten.
+Enthält den bisherigen BeautifulSoup-Extraktor und ein schnelleres lxml-Backend mit
+vorkompilierten XPath-Ausdrücken, das die Seite inkrementell parst und abbricht,
+sobald genügend Tweet-Container gelesen wurden. Ist lxml nicht installiert, wird
+automatisch BeautifulSoup verwendet.
+"""
+
+import io
+from urllib.parse import urlparse
+
+from bs4 import BeautifulSoup
+
+from config import MIN_ENGAGEMENT_TOTAL, MIN_LIKES, NITTER_PARSER
+from tweet_record import Tweet
+
+try:
+    from lxml import etree
+except ImportError:  # lxml ist optional
+    etree = None
+
+
+# Hilfsfunktion zum Extrahieren von Tweets und Bildern aus Nitter HTML
+def tweet_id_from_path(tweet_path):
+    """Extrahiert die Tweet-ID aus einem Nitter-Pfad wie /user/status/123#m."""
+    return tweet_path.split("#")[0].split("?")[0].rstrip("/").split("/")[-1]
+
+
+def is_known_tweet_id(tweet_id, since_id):
+    """Prüft, ob eine Tweet-ID nicht neuer als die High-Water-Mark ist."""
+    try:
+        return int(tweet_id) <= int(since_id)
+    except (TypeError, ValueError):
+        return False
+
+
+def _nitter_tweet(tweet_data, username):
+    """Erzeugt den Tweet-Datensatz aus den ausgelesenen Feldern eines Containers."""
+    return Tweet(
+        id=tweet_data.get("id", ""), text=tweet_data["text"], username=username, url=tweet_data["url"],
+        images=tweet_data["images"], likes=tweet_data["likes"], retweets=tweet_data["retweets"],
+        replies=tweet_data["replies"], quotes=tweet_data["quotes"], source="nitter"
+    )
+
+
+def extract_tweets_from_nitter(soup, username, count=3, base_url=None, since_id=None):
+    result = []
+    # Finde alle Tweet-Container
+    tweet_containers = soup.find_all("div", {"class": "timeline-item"})
+    
+    # Mehr Container durchsuchen, da wir filtern werden
+    max_containers = min(len(tweet_containers), count * 3)
+    
+    for container in tweet_containers[:max_containers]:
+        tweet_data = {"text": "", "images": [], "url": ""}
+        
+        # Tweet-ID und URL extrahieren
+        tweet_link = container.find("a", {"class": "tweet-link"})
+        if tweet_link and tweet_link.has_attr("href"):
+            tweet_path = tweet_link["href"]
+            # Tweet-ID aus dem Pfad extrahieren
+            tweet_id = tweet_id_from_path(tweet_path)
+            tweet_data["id"] = tweet_id
+            
+            # URL erstellen
+            if base_url and tweet_path.startswith("/"):
+                parsed_url = urlparse(base_url)
+                tweet_data["url"] = f"{parsed_url.scheme}://{parsed_url.netloc}{tweet_path}"
+            else:
+                # Fallback auf Standard-Twitter-URL
+                tweet_data["url"] = f"https://twitter.com/{username}/status/{tweet_id}"
+        
+        # Bekannte Tweets: angeheftete und Retweets (ID des älteren Originals) überspringen,
+        # sonst abbrechen (die Timeline ist absteigend sortiert)
+        if since_id and is_known_tweet_id(tweet_data.get("id"), since_id):
+            if container.find("div", {"class": "pinned"}) or container.find("div", {"class": "retweet-header"}):
+                continue
+            break
+        
+        # Text extrahieren
+        content_div = container.find("div", {"class": "tweet-content"})
+        if content_div:
+            tweet_text = content_div.get_text(strip=True)
+            tweet_data["text"] = tweet_text
+            
+            # Prüfen, ob es sich um eine Antwort handelt (beginnt mit @)
+            if tweet_text.startswith("@"):
+                continue  # Überspringe Antworten
+        
+        # Bilder extrahieren
+        images = container.find_all("a", {"class": "still-image"})
+        for img in images:
+            img_src = img.find("img")
+            if img_src and img_src.has_attr("src"):
+                # Vollständige URL erstellen
+                img_url = img_src["src"]
+                if img_url.startswith("/") and base_url:
+                    # Relative URL in absolute umwandeln mit dem bekannten base_url
+                    parsed_url = urlparse(base_url)
+                    img_url = f"{parsed_url.scheme}://{parsed_url.netloc}{img_url}"
+                tweet_data["images"].append(img_url)
+        
+        # Engagement-Metriken extrahieren (falls verfügbar)
+        tweet_stats = container.find("div", {"class": "tweet-stats"})
+        likes = 0
+        retweets = 0
+        replies = 0
+        
+        if tweet_stats:
+            # Likes extrahieren
+            likes_span = tweet_stats.find("span", {"class": "icon-heart"})
+            if likes_span and likes_span.parent and likes_span.parent.get_text():
+                likes_text = likes_span.parent.get_text().strip()
+                try:
+                    likes = int(likes_text.replace(',', ''))
+                except ValueError:
+                    pass
+            
+            # Retweets extrahieren
+            retweets_span = tweet_stats.find("span", {"class": "icon-retweet"})
+            if retweets_span and retweets_span.parent and retweets_span.parent.get_text():
+                retweets_text = retweets_span.parent.get_text().strip()
+                try:
+                    retweets = int(retweets_text.replace(',', ''))
+                except ValueError:
+                    pass
+            
+            # Antworten extrahieren
+            replies_span = tweet_stats.find("span", {"class": "icon-comment"})
+            if replies_span and replies_span.parent and replies_span.parent.get_text():
+                replies_text = replies_span.parent.get_text().strip()
+                try:
+                    replies = int(replies_text.replace(',', ''))
+                except ValueError:
+                    pass
+        
+        # Engagement-Metriken zum Tweet-Daten-Dictionary hinzufügen
+        tweet_data["likes"] = likes
+        tweet_data["retweets"] = retweets
+        tweet_data["replies"] = replies
+        tweet_data["quotes"] = 0  # Nitter zeigt keine Quote-Tweets an
+        tweet_data["engagement_total"] = likes + retweets + replies
+        
+        # Mindestanforderungen für Engagement aus der Konfiguration verwenden
+        min_engagement = MIN_ENGAGEMENT_TOTAL
+        min_likes = MIN_LIKES
+        
+        # Überspringe Tweets mit zu geringem Engagement
+        if tweet_data["engagement_total"] < min_engagement or tweet_data["likes"] < min_likes:
+            continue
+        
+        if tweet_data["text"]:
+            result.append(_nitter_tweet(tweet_data, username))
+            # Wenn wir genug qualitativ hochwertige Tweets haben, brechen wir ab
+            if len(result) >= count:
+                break
+    
+    if result:
+        print(f"Erfolgreich {len(result)} Tweets für {username} via Nitter abgerufen")
+    
+    return result
+
+# Vorkompilierte XPath-Ausdrücke für das lxml-Backend
+def _has_class(name):
+    return f"contains(concat(' ', normalize-space(@class), ' '), ' {name} ')"
+
+if etree is not None:
+    _XP_TWEET_LINK = etree.XPath(f"(.//a[{_has_class('tweet-link')}])[1]")
+    _XP_CONTENT = etree.XPath(f"(.//div[{_has_class('tweet-content')}])[1]")
+    _XP_STILL_IMAGES = etree.XPath(f".//a[{_has_class('still-image')}]")
+    _XP_FIRST_IMG = etree.XPath("(.//img)[1]")
+    _XP_PINNED = etree.XPath(f"(.//div[{_has_class('pinned')}])[1]")
+    _XP_RETWEET_HEADER = etree.XPath(f"(.//div[{_has_class('retweet-header')}])[1]")
+    _XP_STATS = etree.XPath(f"(.//div[{_has_class('tweet-stats')}])[1]")
+    _XP_STAT_ICONS = {
+        key: etree.XPath(f"(.//span[{_has_class(icon)}])[1]")
+        for key, icon in (("likes", "icon-heart"), ("retweets", "icon-retweet"), ("replies", "icon-comment"))
+    }
+
+
+def _is_timeline_item(element):
+    return "timeline-item" in (element.get("class") or "").split()
+
+
+def _text(element, strip_parts=False):
+    """
+    Entspricht BeautifulSoup.get_text(): mit strip_parts=True wie get_text(strip=True),
+    d.h. jeder Textteil wird einzeln gekürzt und leere Teile entfallen.
+    """
+    if strip_parts:
+        return "".join(part.strip() for part in element.itertext() if part.strip())
+    return "".join(element.itertext())
+
+
+def _stat_value(stats, key):
+    icons = _XP_STAT_ICONS[key](stats)
+    if not icons:
+        return 0
+    parent = icons[0].getparent()
+    if parent is None:
+        return 0
+    text = _text(parent)
+    if not text:
+        return 0
+    try:
+        return int(text.strip().replace(',', ''))
+    except ValueError:
+        return 0
+
+
+def _absolute(url, base_url):
+    parsed_url = urlparse(base_url)
+    return f"{parsed_url.scheme}://{parsed_url.netloc}{url}"
+
+
+def _extract_container(container, username, base_url):
+    """Liest einen Tweet-Container aus; liefert None für Antworten (wie der BeautifulSoup-Extraktor)."""
+    tweet_data = {"text": "", "images": [], "url": ""}
+
+    links = _XP_TWEET_LINK(container)
+    if links and links[0].get("href") is not None:
+        tweet_path = links[0].get("href")
+        tweet_id = tweet_id_from_path(tweet_path)
+        tweet_data["id"] = tweet_id
+        if base_url and tweet_path.startswith("/"):
+            tweet_data["url"] = _absolute(tweet_path, base_url)
+        else:
+            tweet_data["url"] = f"https://twitter.com/{username}/status/{tweet_id}"
+
+    content = _XP_CONTENT(container)
+    if content:
+        tweet_text = _text(content[0], strip_parts=True)
+        tweet_data["text"] = tweet_text
+        if tweet_text.startswith("@"):
+            return None
+
+    for link in _XP_STILL_IMAGES(container):
+        img = _XP_FIRST_IMG(link)
+        if img and img[0].get("src") is not None:
+            img_url = img[0].get("src")
+            if img_url.startswith("/") and base_url:
+                img_url = _absolute(img_url, base_url)
+            tweet_data["images"].append(img_url)
+
+    likes = retweets = replies = 0
+    stats = _XP_STATS(container)
+    if stats:
+        likes = _stat_value(stats[0], "likes")
+        retweets = _stat_value(stats[0], "retweets")
+        replies = _stat_value(stats[0], "replies")
+
+    tweet_data["likes"] = likes
+    tweet_data["retweets"] = retweets
+    tweet_data["replies"] = replies
+    tweet_data["quotes"] = 0  # Nitter zeigt keine Quote-Tweets an
+    tweet_data["engagement_total"] = likes + retweets + replies
+    return tweet_data
+
+
+def _container_tweet_id(container):
+    links = _XP_TWEET_LINK(container)
+    if links and links[0].get("href") is not None:
+        return tweet_id_from_path(links[0].get("href"))
+    return None
+
+
+def extract_tweets_from_nitter_lxml(html, username, count=3, base_url=None, since_id=None):
+    """
+    Schnelle Variante von extract_tweets_from_nitter auf Basis von lxml.
+    Die Seite wird inkrementell geparst; nach count * 3 Tweet-Containern oder beim ersten
+    bereits bekannten Tweet (since_id) wird abgebrochen, ohne den Rest des Dokuments zu
+    verarbeiten. Das Ergebnis entspricht dem BeautifulSoup-Extraktor.
+
+    Args:
+        html: HTML der Timeline-Seite (str oder bytes)
+        since_id: Optional, High-Water-Mark; nur neuere Tweets werden gelesen
+    """
+    if isinstance(html, str):
+        html = html.encode("utf-8")
+
+    result = []
+    max_containers = count * 3
+    seen_containers = 0
+    for _, element in etree.iterparse(io.BytesIO(html), events=("end",), tag="div", html=True,
+                                      encoding="utf-8", recover=True):
+        if not _is_timeline_item(element):
+            continue
+        if seen_containers >= max_containers:
+            break
+        seen_containers += 1
+        if since_id and is_known_tweet_id(_container_tweet_id(element), since_id):
+            if _XP_PINNED(element) or _XP_RETWEET_HEADER(element):
+                continue
+            break
+        tweet_data = _extract_container(element, username, base_url)
+        if tweet_data is not None:
+            # Überspringe Tweets mit zu geringem Engagement
+            if tweet_data["engagement_total"] >= MIN_ENGAGEMENT_TOTAL and tweet_data["likes"] >= MIN_LIKES and tweet_data["text"]:
+                result.append(_nitter_tweet(tweet_data, username))
+                # Wenn wir genug qualitativ hochwertige Tweets haben, brechen wir ab
+                if len(result) >= count:
+                    break
+
+    if result:
+        print(f"Erfolgreich {len(result)} Tweets für {username} via Nitter abgerufen")
+
+    return result
+
+
+def parse_nitter_timeline(html, username, count=3, base_url=None, backend=None, since_id=None):
+    """
+    Extrahiert Tweets aus dem HTML einer Nitter-Timeline mit dem konfigurierten Backend.
+
+    Args:
+        backend: "lxml" oder "bs4" (Standard aus NITTER_PARSER["backend"]); ohne lxml immer "bs4"
+        since_id: Optional, High-Water-Mark; ältere Tweets werden nicht mehr gelesen
+    """
+    backend = backend or NITTER_PARSER["backend"]
+    if backend == "lxml" and etree is not None:
+        return extract_tweets_from_nitter_lxml(html, username, count, base_url, since_id)
+    soup = BeautifulSoup(html, "html.parser")
+    return extract_tweets_from_nitter(soup, username, count, base_url, since_id)
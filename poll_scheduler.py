@@ -0,0 +1,205 @@
+# -*- coding: utf-8 -*-
+
+"""
+Adaptiver Abfrageplan für den Daemon-Modus.
+Pro Account werden eine geglättete Posting-Rate (EWMA, neue Tweets pro Stunde), der
+Zeitpunkt des letzten Tweets und der nächste Abfragezeitpunkt geführt und im
+State-Store gespeichert, damit der Plan einen Neustart übersteht.
+
+Das Intervall ergibt sich aus der Rate (aktive Accounts werden häufiger abgefragt)
+und wird durch die Zeit seit dem letzten Tweet nach unten begrenzt (ruhende Accounts
+werden seltener abgefragt), jeweils innerhalb von min/max_interval_seconds.
+"""
+
+import time
+import random
+import datetime
+import threading
+
+from config import POLL_SCHEDULE
+from state_store import get_state_store
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS poll_schedule (
+    username     TEXT PRIMARY KEY,
+    next_poll    REAL NOT NULL,
+    interval     REAL NOT NULL,
+    rate_ewma    REAL,
+    last_post_at REAL,
+    last_polled  REAL,
+    failures     INTEGER NOT NULL,
+    updated_at   REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_poll_schedule_next_poll ON poll_schedule (next_poll);
+"""
+
+
+def latest_post_time(tweets):
+    """Gibt den Zeitstempel des neuesten Tweets zurück (nur twscrape liefert ein Datum), sonst None."""
+    timestamps = []
+    for tweet in tweets or []:
+        date = tweet.date
+        if isinstance(date, datetime.datetime):
+            if date.tzinfo is None:
+                date = date.replace(tzinfo=datetime.timezone.utc)
+            timestamps.append(date.timestamp())
+    return max(timestamps) if timestamps else None
+
+
+class PollScheduler:
+    """Plant die nächste Abfrage jedes Accounts anhand seiner beobachteten Aktivität."""
+
+    def __init__(self, store=None, settings=None):
+        self.settings = dict(POLL_SCHEDULE if settings is None else settings)
+        self.store = store or get_state_store()
+        self.store.ensure_schema(_SCHEMA)
+        self._lock = threading.Lock()
+        self._schedule = {}
+        self.reload()
+
+    def reload(self, usernames=None):
+        """
+        Liest den Plan (oder nur den der angegebenen Accounts) aus dem State-Store, z.B. wenn ein
+        Worker Accounts übernimmt, deren Plan zuletzt ein anderer Prozess fortgeschrieben hat.
+        """
+        query = "SELECT username, next_poll, interval, rate_ewma, last_post_at, last_polled, failures FROM poll_schedule"
+        if usernames is None:
+            rows = self.store.execute(query).fetchall()
+        else:
+            keys = [username.lower() for username in usernames]
+            rows = []
+            for start in range(0, len(keys), 500):
+                chunk = keys[start:start + 500]
+                rows += self.store.execute(f"{query} WHERE username IN ({','.join('?' * len(chunk))})", chunk).fetchall()
+        with self._lock:
+            for row in rows:
+                self._schedule[row[0]] = {
+                    "next_poll": row[1], "interval": row[2], "rate_ewma": row[3],
+                    "last_post_at": row[4], "last_polled": row[5], "failures": row[6]
+                }
+
+    def _save(self, username, entry):
+        self.store.execute(
+            "INSERT OR REPLACE INTO poll_schedule (username, next_poll, interval, rate_ewma, last_post_at, last_polled, "
+            "failures, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (username, entry["next_poll"], entry["interval"], entry["rate_ewma"], entry["last_post_at"],
+             entry["last_polled"], entry["failures"], time.time())
+        )
+
+    def sync_accounts(self, usernames):
+        """Nimmt neue Accounts in den Plan auf; sie sind sofort fällig."""
+        now = time.time()
+        with self._lock:
+            for username in usernames:
+                key = username.lower()
+                if key not in self._schedule:
+                    entry = {
+                        "next_poll": now, "interval": float(self.settings["initial_interval_seconds"]),
+                        "rate_ewma": None, "last_post_at": None, "last_polled": None, "failures": 0
+                    }
+                    self._schedule[key] = entry
+                    self._save(key, entry)
+
+    def due_accounts(self, usernames, now=None):
+        """Gibt die fälligen Accounts zurück, am längsten überfällige zuerst."""
+        now = now or time.time()
+        with self._lock:
+            due = [u for u in usernames if self._schedule.get(u.lower(), {"next_poll": 0})["next_poll"] <= now]
+            return sorted(due, key=lambda u: self._schedule.get(u.lower(), {"next_poll": 0})["next_poll"])
+
+    def seconds_until_next(self, usernames, now=None):
+        """Sekunden bis zur nächsten fälligen Abfrage unter den angegebenen Accounts (None ohne Accounts)."""
+        now = now or time.time()
+        with self._lock:
+            times = [self._schedule[u.lower()]["next_poll"] for u in usernames if u.lower() in self._schedule]
+        if not times:
+            return None
+        return max(0.0, min(times) - now)
+
+    def _interval(self, entry, now):
+        settings = self.settings
+        if entry["rate_ewma"] is None:
+            interval = settings["initial_interval_seconds"]
+        elif entry["rate_ewma"] > 0:
+            # Rate in Tweets pro Stunde -> Wartezeit bis zur angestrebten Anzahl neuer Tweets
+            interval = settings["target_tweets_per_poll"] / entry["rate_ewma"] * 3600
+        else:
+            interval = settings["max_interval_seconds"]
+        if entry["last_post_at"]:
+            interval = max(interval, settings["dormancy_factor"] * (now - entry["last_post_at"]))
+        return min(max(interval, settings["min_interval_seconds"]), settings["max_interval_seconds"])
+
+    def _schedule_next(self, entry, now, interval):
+        jitter = self.settings["jitter"]
+        entry["interval"] = interval
+        entry["next_poll"] = now + interval * random.uniform(1 - jitter, 1 + jitter)
+
+    def record_poll(self, username, new_tweets, newest_post_at=None):
+        """
+        Verbucht eine erfolgreiche Abfrage und plant die nächste.
+
+        Args:
+            username: Account-Name
+            new_tweets: Anzahl neuer Tweets seit der letzten Abfrage
+            newest_post_at: Optional, Zeitstempel des neuesten Tweets (sonst: jetzt, falls neue Tweets vorliegen)
+
+        Returns:
+            float: Das neue Abfrageintervall in Sekunden
+        """
+        now = time.time()
+        key = username.lower()
+        with self._lock:
+            entry = self._schedule.get(key)
+            if entry is None:
+                entry = {"next_poll": now, "interval": float(self.settings["initial_interval_seconds"]),
+                         "rate_ewma": None, "last_post_at": None, "last_polled": None, "failures": 0}
+                self._schedule[key] = entry
+
+            # Die erste Abfrage liefert ältere Tweets und sagt nichts über die Rate aus
+            if entry["last_polled"] is not None:
+                elapsed_hours = max(now - entry["last_polled"], 1.0) / 3600
+                observed_rate = new_tweets / elapsed_hours
+                if entry["rate_ewma"] is None:
+                    entry["rate_ewma"] = observed_rate
+                else:
+                    alpha = self.settings["rate_ewma_alpha"]
+                    entry["rate_ewma"] = (1 - alpha) * entry["rate_ewma"] + alpha * observed_rate
+            if newest_post_at:
+                entry["last_post_at"] = max(entry["last_post_at"] or 0, newest_post_at)
+            elif new_tweets and entry["last_polled"] is not None:
+                entry["last_post_at"] = now
+
+            entry["last_polled"] = now
+            entry["failures"] = 0
+            self._schedule_next(entry, now, self._interval(entry, now))
+            self._save(key, entry)
+            return entry["interval"]
+
+    def record_failure(self, username):
+        """Ein fehlgeschlagener Abruf verlängert das Intervall, ohne die Rate zu verändern."""
+        now = time.time()
+        key = username.lower()
+        with self._lock:
+            entry = self._schedule.get(key)
+            if entry is None:
+                return None
+            entry["failures"] += 1
+            interval = min(entry["interval"] * self.settings["failure_backoff"], self.settings["max_interval_seconds"])
+            self._schedule_next(entry, now, interval)
+            self._save(key, entry)
+            return interval
+
+    def snapshot(self):
+        with self._lock:
+            return {username: dict(entry) for username, entry in self._schedule.items()}
+
+
+_scheduler = None
+
+
+def get_poll_scheduler():
+    """Gibt den prozessweiten Abfrageplan zurück."""
+    global _scheduler
+    if _scheduler is None:
+        _scheduler = PollScheduler()
+    return _scheduler
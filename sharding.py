@@ -0,0 +1,140 @@
+# -*- coding: utf-8 -*-
+
+"""
+Verteilung der Accounts auf mehrere Worker-Prozesse über einen gemeinsamen State-Store.
+Jeder Worker trägt sich mit einem regelmäßigen Lebenszeichen in die Tabelle workers ein;
+die lebenden Worker bilden einen Hash-Ring (Consistent Hashing mit virtuellen Knoten),
+der jedem Account genau einen Worker zuordnet. Kommt ein Worker hinzu oder fällt einer
+aus, wandert nur der Anteil der Accounts, der den betroffenen Worker betrifft.
+
+Während einer Umverteilung können zwei Worker kurz denselben Account abfragen; doppelte
+Posts verhindert die Beanspruchung jedes Tweets im State-Store (StateStore.claim_tweet).
+Die offenen Beanspruchungen eines ausgefallenen Workers werden beim Austragen freigegeben,
+sodass der neue Besitzer seiner Accounts die betroffenen Tweets verarbeitet. Nur ein
+Absturz zwischen dem Versand und dem Eintragen als verarbeitet kann einen Post wiederholen.
+Alle Worker müssen dieselbe SQLite-Datei nutzen, also auf demselben Rechner laufen oder
+ein Dateisystem mit funktionierenden SQLite-Sperren teilen (kein NFS/SMB).
+"""
+
+import os
+import time
+import bisect
+import socket
+import hashlib
+import threading
+
+from config import SHARDING
+from state_store import get_state_store
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS workers (
+    worker_id    TEXT PRIMARY KEY,
+    host         TEXT,
+    pid          INTEGER,
+    started_at   REAL NOT NULL,
+    heartbeat_at REAL NOT NULL
+);
+"""
+
+
+def get_worker_id():
+    """Kennung dieses Prozesses (SHARDING["worker_id"] oder Rechnername:PID)."""
+    return SHARDING["worker_id"] or f"{socket.gethostname()}:{os.getpid()}"
+
+
+def _ring_hash(value):
+    return int.from_bytes(hashlib.blake2b(value.encode("utf-8"), digest_size=8).digest(), "big")
+
+
+class HashRing:
+    """Consistent-Hashing-Ring: ordnet Schlüssel stabil einem der Mitglieder zu."""
+
+    def __init__(self, members, virtual_nodes=None):
+        self.members = sorted(set(members))
+        virtual_nodes = virtual_nodes or SHARDING["virtual_nodes"]
+        points = sorted((_ring_hash(f"{member}#{i}"), member) for member in self.members for i in range(virtual_nodes))
+        self._hashes = [point for point, _ in points]
+        self._owners = [member for _, member in points]
+
+    def owner(self, key):
+        """Gibt das Mitglied zurück, dem der Schlüssel gehört (None bei leerem Ring)."""
+        if not self._hashes:
+            return None
+        index = bisect.bisect(self._hashes, _ring_hash(key.lower())) % len(self._hashes)
+        return self._owners[index]
+
+
+class WorkerShard:
+    """
+    Mitgliedschaft eines Workers und sein Anteil an den Accounts.
+
+    heartbeat() muss regelmäßig aufgerufen werden; es meldet den Worker als lebendig,
+    liest die lebenden Worker und baut den Ring neu, wenn sich die Menge geändert hat.
+    """
+
+    def __init__(self, store=None, worker_id=None, settings=None):
+        self.settings = dict(SHARDING if settings is None else settings)
+        self.store = store or get_state_store()
+        self.store.ensure_schema(_SCHEMA)
+        self.worker_id = worker_id or get_worker_id()
+        self.started_at = time.time()
+        self.ring = HashRing([self.worker_id], self.settings["virtual_nodes"])
+        self._last_heartbeat = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def workers(self):
+        return self.ring.members
+
+    def live_workers(self, now=None):
+        """Liest die Worker, deren letztes Lebenszeichen nicht älter als worker_timeout_seconds ist."""
+        cutoff = (now or time.time()) - self.settings["worker_timeout_seconds"]
+        rows = self.store.execute("SELECT worker_id FROM workers WHERE heartbeat_at > ?", (cutoff,)).fetchall()
+        return sorted({row[0] for row in rows} | {self.worker_id})
+
+    def heartbeat(self, force=False):
+        """
+        Meldet den Worker als lebendig und prüft die Verteilung (höchstens einmal pro Intervall).
+
+        Returns:
+            bool: True, wenn sich die Menge der lebenden Worker geändert hat
+        """
+        now = time.time()
+        with self._lock:
+            if not force and now - self._last_heartbeat < self.settings["heartbeat_interval_seconds"]:
+                return False
+            self._last_heartbeat = now
+            self.store.execute(
+                "INSERT INTO workers (worker_id, host, pid, started_at, heartbeat_at) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT(worker_id) DO UPDATE SET heartbeat_at = excluded.heartbeat_at",
+                (self.worker_id, socket.gethostname(), os.getpid(), self.started_at, now)
+            )
+            # Ausgefallene Worker austragen und ihre offenen Tweets freigeben, damit der neue
+            # Besitzer ihrer Accounts sie nicht bis zum Ablauf der Lease für vergeben hält
+            cutoff = now - self.settings["worker_timeout_seconds"]
+            for (worker_id,) in self.store.execute(
+                    "SELECT worker_id FROM workers WHERE heartbeat_at <= ?", (cutoff,)).fetchall():
+                self.store.execute("DELETE FROM workers WHERE worker_id = ? AND heartbeat_at <= ?", (worker_id, cutoff))
+                released = self.store.release_claims(worker_id)
+                print(f"Worker {worker_id} ohne Lebenszeichen ausgetragen, {released} offene Tweets freigegeben")
+            members = self.live_workers(now)
+            if members == self.ring.members:
+                return False
+            self.ring = HashRing(members, self.settings["virtual_nodes"])
+            return True
+
+    def owns(self, account):
+        """Prüft, ob der Account (Benutzername) diesem Worker zugeordnet ist."""
+        return self.ring.owner(account) == self.worker_id
+
+    def owned(self, accounts):
+        """Filtert eine Liste von Benutzernamen auf die Accounts dieses Workers."""
+        return [account for account in accounts if self.owns(account)]
+
+    def leave(self):
+        """Meldet den Worker ab und gibt seine offenen Tweet-Beanspruchungen frei."""
+        with self._lock:
+            self.store.execute("DELETE FROM workers WHERE worker_id = ?", (self.worker_id,))
+            released = self.store.release_claims(self.worker_id)
+        if released:
+            print(f"{released} offene Tweet-Beanspruchungen von {self.worker_id} freigegeben")
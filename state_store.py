@@ -0,0 +1,360 @@
+# -*- coding: utf-8 -*-
+
+"""
+Persistenter Zustandsspeicher für den Twitter-Telegram-Bot.
+Ersetzt die bisherige processed_tweets.json durch eine SQLite-Datenbank im WAL-Modus
+mit Indizes für Hash- und ID-Abfragen. Abgelaufene Einträge werden bei Abfragen
+ausgeblendet und periodisch im Hintergrund physisch entfernt (Kompaktierung).
+
+Mehrere Prozesse können denselben Store nutzen: ein Tweet wird vor der Verarbeitung
+mit einer zeitlich begrenzten Lease beansprucht (claim_tweet), sodass ihn nur ein
+Prozess zusammenfasst und sendet; stirbt der Prozess, läuft die Lease ab.
+"""
+
+import os
+import json
+import time
+import sqlite3
+import threading
+
+from config import STATE_STORE, DUPLICATE_DETECTION
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS processed_tweets (
+    tweet_hash TEXT PRIMARY KEY,
+    tweet_id   TEXT,
+    timestamp  REAL NOT NULL,
+    preview    TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_processed_tweet_id ON processed_tweets (tweet_id);
+CREATE INDEX IF NOT EXISTS idx_processed_timestamp ON processed_tweets (timestamp);
+CREATE TABLE IF NOT EXISTS high_water_marks (
+    username   TEXT PRIMARY KEY,
+    since_id   INTEGER NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS tweet_claims (
+    tweet_hash  TEXT PRIMARY KEY,
+    tweet_id    TEXT,
+    owner       TEXT NOT NULL,
+    lease_until REAL NOT NULL,
+    claimed_at  REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_tweet_claims_tweet_id ON tweet_claims (tweet_id);
+CREATE TABLE IF NOT EXISTS meta (
+    key   TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+
+class StateStore:
+    """
+    SQLite-basierter Speicher für verarbeitete Tweets.
+
+    Abfragen nach Hash und Tweet-ID laufen über Indizes (O(1) statt linearer Suche),
+    neue Einträge werden einzeln eingefügt statt die gesamte Datei neu zu schreiben.
+    """
+
+    def __init__(self, db_file, legacy_json_file=None, cache_days=None, compaction_interval=None):
+        self.db_file = db_file
+        self.cache_days = cache_days if cache_days is not None else DUPLICATE_DETECTION["cache_days"]
+        self.compaction_interval = (compaction_interval if compaction_interval is not None
+                                    else STATE_STORE["compaction_interval_seconds"])
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(db_file, timeout=30, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        self._compaction_thread = None
+        self._compaction_hooks = []
+        self._closed = threading.Event()
+
+        if legacy_json_file:
+            self.migrate_legacy_json(legacy_json_file)
+
+        # Beim Öffnen einmal kompaktieren, danach periodisch im Hintergrund
+        self.compact()
+        self._start_background_compaction()
+
+    def _expiry_cutoff(self):
+        """Zeitstempel, ab dem Einträge als abgelaufen gelten."""
+        return time.time() - (self.cache_days * 24 * 60 * 60)
+
+    def execute(self, sql, params=()):
+        """Führt eine SQL-Anweisung threadsicher aus und gibt den Cursor zurück."""
+        with self._lock:
+            return self._conn.execute(sql, params)
+
+    def ensure_schema(self, schema_sql):
+        """Legt zusätzliche Tabellen/Indizes an (für Module, die den Store mitbenutzen)."""
+        with self._lock:
+            self._conn.executescript(schema_sql)
+
+    def transaction(self):
+        """Gibt einen Kontextmanager für eine explizite Transaktion zurück."""
+        return _Transaction(self)
+
+    def get_meta(self, key, default=None):
+        row = self.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else default
+
+    def set_meta(self, key, value):
+        self.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, str(value)))
+
+    def find_processed(self, tweet_hash, tweet_id=None):
+        """
+        Sucht einen nicht abgelaufenen Eintrag nach Hash oder Tweet-ID.
+
+        Returns:
+            str: "hash" oder "id", je nachdem welcher Schlüssel getroffen wurde, sonst None
+        """
+        cutoff = self._expiry_cutoff()
+        row = self.execute(
+            "SELECT 1 FROM processed_tweets WHERE tweet_hash = ? AND timestamp > ?",
+            (tweet_hash, cutoff)
+        ).fetchone()
+        if row:
+            return "hash"
+        if tweet_id:
+            row = self.execute(
+                "SELECT 1 FROM processed_tweets WHERE tweet_id = ? AND timestamp > ? LIMIT 1",
+                (str(tweet_id), cutoff)
+            ).fetchone()
+            if row:
+                return "id"
+        return None
+
+    def add_processed(self, tweet_hash, tweet_id=None, preview="", timestamp=None):
+        """Fügt einen Tweet hinzu oder aktualisiert dessen Zeitstempel."""
+        self.execute(
+            "INSERT OR REPLACE INTO processed_tweets (tweet_hash, tweet_id, timestamp, preview) VALUES (?, ?, ?, ?)",
+            (tweet_hash, str(tweet_id) if tweet_id else None, timestamp or time.time(), preview)
+        )
+
+    def claim_tweet(self, tweet_hash, tweet_id, owner, lease_seconds):
+        """
+        Beansprucht einen Tweet für die Verarbeitung durch owner (atomar über alle Prozesse).
+
+        Args:
+            tweet_hash: Hash des Tweet-Inhalts
+            tweet_id: Optional, Tweet-ID
+            owner: Kennung des Prozesses (siehe sharding.get_worker_id)
+            lease_seconds: Dauer, nach der eine nicht abgeschlossene Beanspruchung verfällt
+
+        Returns:
+            str: "hash" oder "id", wenn der Tweet bereits verarbeitet wurde, "claimed", wenn
+                 ein anderer Prozess ihn gerade verarbeitet, sonst None (Tweet gehört owner)
+        """
+        now = time.time()
+        with self.transaction() as conn:
+            match = self.find_processed(tweet_hash, tweet_id)
+            if match:
+                return match
+            row = conn.execute(
+                "SELECT 1 FROM tweet_claims WHERE (tweet_hash = ? OR tweet_id = ?) AND owner != ? AND lease_until > ? LIMIT 1",
+                (tweet_hash, str(tweet_id) if tweet_id else None, owner, now)
+            ).fetchone()
+            if row:
+                return "claimed"
+            conn.execute(
+                "INSERT OR REPLACE INTO tweet_claims (tweet_hash, tweet_id, owner, lease_until, claimed_at) VALUES (?, ?, ?, ?, ?)",
+                (tweet_hash, str(tweet_id) if tweet_id else None, owner, now + lease_seconds, now)
+            )
+        return None
+
+    def renew_claim(self, tweet_hash, owner, lease_seconds, tweet_id=None):
+        """
+        Verlängert die Lease. Wurde die Beanspruchung inzwischen freigegeben (z.B. weil owner
+        kurz als ausgefallen galt), wird der Tweet erneut beansprucht.
+
+        Returns:
+            bool: False, wenn der Tweet inzwischen einem anderen Prozess gehört oder verarbeitet wurde
+        """
+        with self.transaction() as conn:
+            if self.find_processed(tweet_hash, tweet_id):
+                conn.execute("DELETE FROM tweet_claims WHERE tweet_hash = ? AND owner = ?", (tweet_hash, owner))
+                return False
+            cursor = conn.execute(
+                "UPDATE tweet_claims SET lease_until = ? WHERE tweet_hash = ? AND owner = ?",
+                (time.time() + lease_seconds, tweet_hash, owner)
+            )
+            if cursor.rowcount == 1:
+                return True
+        return self.claim_tweet(tweet_hash, tweet_id, owner, lease_seconds) is None
+
+    def finish_claim(self, tweet_hash, owner, preview="", tweet_id=None):
+        """
+        Gibt die Beanspruchung von owner auf und trägt den Tweet als verarbeitet ein. Das gilt
+        auch, wenn die Beanspruchung inzwischen freigegeben wurde: owner hat den Tweet dann
+        trotzdem verarbeitet, und ein anderer Prozess soll ihn nicht erneut senden.
+        """
+        with self.transaction() as conn:
+            row = conn.execute(
+                "SELECT tweet_id FROM tweet_claims WHERE tweet_hash = ? AND owner = ?", (tweet_hash, owner)
+            ).fetchone()
+            conn.execute("DELETE FROM tweet_claims WHERE tweet_hash = ? AND owner = ?", (tweet_hash, owner))
+            conn.execute(
+                "INSERT OR IGNORE INTO processed_tweets (tweet_hash, tweet_id, timestamp, preview) VALUES (?, ?, ?, ?)",
+                (tweet_hash, row[0] if row else (str(tweet_id) if tweet_id else None), time.time(), preview)
+            )
+        return row is not None
+
+    def release_claim(self, tweet_hash, owner):
+        """
+        Gibt die Beanspruchung auf, ohne den Tweet als verarbeitet einzutragen (z.B. beim Beenden).
+
+        Returns:
+            bool: True, wenn owner den Tweet noch beansprucht hatte
+        """
+        cursor = self.execute("DELETE FROM tweet_claims WHERE tweet_hash = ? AND owner = ?", (tweet_hash, owner))
+        return cursor.rowcount == 1
+
+    def claimed_elsewhere(self, tweet_ids, owner):
+        """Gibt die Tweet-IDs zurück, die gerade ein anderer Prozess als owner beansprucht."""
+        tweet_ids = [str(tweet_id) for tweet_id in tweet_ids if tweet_id]
+        if not tweet_ids:
+            return set()
+        rows = self.execute(
+            f"SELECT tweet_id FROM tweet_claims WHERE owner != ? AND tweet_id IN ({','.join('?' * len(tweet_ids))})",
+            [owner] + tweet_ids
+        ).fetchall()
+        return {row[0] for row in rows}
+
+    def release_claims(self, owner):
+        """Gibt alle Beanspruchungen eines Prozesses auf."""
+        return self.execute("DELETE FROM tweet_claims WHERE owner = ?", (owner,)).rowcount
+
+    def get_high_water_mark(self, username):
+        """Gibt die neueste bereits gesehene Tweet-ID eines Accounts zurück (oder None)."""
+        row = self.execute(
+            "SELECT since_id FROM high_water_marks WHERE username = ?", (username.lower(),)
+        ).fetchone()
+        return row[0] if row else None
+
+    def set_high_water_mark(self, username, tweet_id):
+        """Setzt die High-Water-Mark eines Accounts, ohne sie je zurückzusetzen."""
+        self.execute(
+            "INSERT INTO high_water_marks (username, since_id, updated_at) VALUES (?, ?, ?) "
+            "ON CONFLICT(username) DO UPDATE SET since_id = MAX(since_id, excluded.since_id), "
+            "updated_at = excluded.updated_at",
+            (username.lower(), int(tweet_id), time.time())
+        )
+
+    def count_processed(self):
+        return self.execute("SELECT COUNT(*) FROM processed_tweets").fetchone()[0]
+
+    def add_compaction_hook(self, hook):
+        """Registriert eine Funktion, die bei jeder Kompaktierung mit aufgerufen wird (z.B. für Indizes)."""
+        if hook not in self._compaction_hooks:
+            self._compaction_hooks.append(hook)
+
+    def compact(self):
+        """Entfernt abgelaufene Einträge physisch aus der Datenbank."""
+        try:
+            cursor = self.execute("DELETE FROM processed_tweets WHERE timestamp <= ?", (self._expiry_cutoff(),))
+            if cursor.rowcount:
+                print(f"State-Store kompaktiert: {cursor.rowcount} abgelaufene Einträge entfernt")
+            self.execute("DELETE FROM tweet_claims WHERE lease_until <= ?", (time.time(),))
+            for hook in self._compaction_hooks:
+                hook()
+            self.set_meta("last_compaction", time.time())
+        except sqlite3.Error as e:
+            print(f"Fehler bei der Kompaktierung des State-Stores: {e}")
+
+    def _start_background_compaction(self):
+        if not self.compaction_interval or self.compaction_interval <= 0:
+            return
+
+        def _run():
+            while not self._closed.wait(self.compaction_interval):
+                self.compact()
+
+        self._compaction_thread = threading.Thread(target=_run, name="state-store-compaction", daemon=True)
+        self._compaction_thread.start()
+
+    def migrate_legacy_json(self, json_file):
+        """
+        Einmalige Migration der alten processed_tweets.json in die Datenbank.
+        Die JSON-Datei wird danach in *.migrated umbenannt und bleibt als Backup erhalten.
+        """
+        if self.get_meta("legacy_json_migrated") or not os.path.exists(json_file):
+            return 0
+
+        try:
+            with open(json_file, "r", encoding="utf-8") as f:
+                processed_tweets = json.load(f)
+        except Exception as e:
+            print(f"Fehler beim Laden des alten Tweet-Caches für die Migration: {e}")
+            return 0
+
+        cutoff = self._expiry_cutoff()
+        rows = [
+            (tweet_hash, str(data.get("id")) if data.get("id") else None,
+             data.get("timestamp", 0), data.get("preview", ""))
+            for tweet_hash, data in processed_tweets.items()
+            if isinstance(data, dict) and data.get("timestamp", 0) > cutoff
+        ]
+        with self.transaction():
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO processed_tweets (tweet_hash, tweet_id, timestamp, preview) VALUES (?, ?, ?, ?)",
+                rows
+            )
+            self.set_meta("legacy_json_migrated", time.time())
+
+        try:
+            os.replace(json_file, json_file + ".migrated")
+        except OSError as e:
+            print(f"Konnte alten Tweet-Cache nicht umbenennen: {e}")
+
+        print(f"{len(rows)} Einträge aus {json_file} in den State-Store migriert")
+        return len(rows)
+
+    def close(self):
+        self._closed.set()
+        with self._lock:
+            self._conn.close()
+
+
+class _Transaction:
+    """Kontextmanager für BEGIN IMMEDIATE / COMMIT / ROLLBACK."""
+
+    def __init__(self, store):
+        self.store = store
+
+    def __enter__(self):
+        self.store._lock.acquire()
+        self.store._conn.execute("BEGIN IMMEDIATE")
+        return self.store._conn
+
+    def __exit__(self, exc_type, exc, tb):
+        try:
+            if exc_type is None:
+                self.store._conn.execute("COMMIT")
+            else:
+                self.store._conn.execute("ROLLBACK")
+        finally:
+            self.store._lock.release()
+        return False
+
+
+# Geöffnete Stores pro Datenbankdatei
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def get_state_store(db_file=None, legacy_json_file=None):
+    """
+    Gibt den (einmal pro Prozess geöffneten) State-Store für eine Datenbankdatei zurück.
+
+    Args:
+        db_file: Pfad zur SQLite-Datei (Standard aus STATE_STORE["db_file"])
+        legacy_json_file: Optional, alte JSON-Cache-Datei für die einmalige Migration
+    """
+    db_file = db_file or STATE_STORE["db_file"]
+    with _stores_lock:
+        store = _stores.get(db_file)
+        if store is None:
+            store = StateStore(db_file, legacy_json_file=legacy_json_file)
+            _stores[db_file] = store
+        return store
@@ -0,0 +1,143 @@
+# -*- coding: utf-8 -*-
+
+"""
+Kombinierter LLM-Aufruf für Zusammenfassung, Kommentarstil und DALL-E-Prompt.
+
+Statt zweier aufeinanderfolgender Aufrufe (Zusammenfassung, danach der Bild-Prompt mit
+gpt-3.5-turbo) liefert ein einziger Aufruf alle drei Felder als JSON-Objekt. Modelle aus
+STRUCTURED_SUMMARY["schema_models"] bekommen das Schema als response_format (json_schema,
+strict), alle anderen den JSON-Modus (json_object) mit dem Schema in der Anweisung.
+
+Der Stil der Tonalitäts-Waage wird als Vorschlag übergeben; das Modell wählt einen der
+Stile aus GPT_INSTRUCTIONS. Jede Antwort wird mit parse_structured_response geprüft;
+ungültige Antworten lösen StructuredResponseError aus, main.py fällt dann auf den
+bisherigen Ablauf zurück.
+"""
+
+import json
+
+from config import GPT_INSTRUCTIONS, CUSTOM_SYSTEM_INSTRUCTION, STRUCTURED_SUMMARY
+
+
+class StructuredResponseError(ValueError):
+    """Die Antwort des kombinierten Aufrufs ist kein gültiges Ergebnis."""
+
+
+def allowed_styles(suggested_style):
+    """
+    Stile, zwischen denen das Modell wählen darf.
+
+    Returns:
+        list: Alle Stile aus GPT_INSTRUCTIONS oder, wenn STRUCTURED_SUMMARY["choose_style"]
+              aus ist, nur der vorgeschlagene (unbekannte Stile werden zu "default")
+    """
+    suggested_style = suggested_style if suggested_style in GPT_INSTRUCTIONS else "default"
+    if not STRUCTURED_SUMMARY["choose_style"]:
+        return [suggested_style]
+    return list(GPT_INSTRUCTIONS)
+
+
+def build_schema(styles, with_image_prompt):
+    """JSON-Schema der Antwort (strict-kompatibel: alle Felder Pflicht, keine weiteren)."""
+    properties = {
+        "summary": {"type": "string", "description": "Die Zusammenfassung im gewählten Stil"},
+        "style": {"type": "string", "enum": list(styles), "description": "Der gewählte Kommentarstil"},
+    }
+    if with_image_prompt:
+        properties["image_prompt"] = {
+            "type": "string",
+            "description": f"DALL-E-Prompt (max. {STRUCTURED_SUMMARY['max_image_prompt_words']} Wörter)",
+        }
+    return {
+        "type": "object",
+        "properties": properties,
+        "required": list(properties),
+        "additionalProperties": False,
+    }
+
+
+def response_format(model, schema):
+    """response_format für den Aufruf: json_schema für unterstützte Modelle, sonst json_object."""
+    if model in STRUCTURED_SUMMARY["schema_models"]:
+        return {"type": "json_schema", "json_schema": {"name": "tweet_summary", "strict": True, "schema": schema}}
+    return {"type": "json_object"}
+
+
+def build_messages(text, styles, suggested_style, with_image_prompt, max_chars=None):
+    """
+    Erstellt System- und Benutzernachricht für den kombinierten Aufruf.
+
+    Args:
+        text: Der (bereits gekürzte) Tweet-Text
+        styles: Erlaubte Stile (siehe allowed_styles)
+        suggested_style: Vorschlag der Tonalitäts-Waage
+        with_image_prompt: True, wenn zusätzlich ein DALL-E-Prompt erzeugt werden soll
+        max_chars: Optional, Höchstlänge der Zusammenfassung in Zeichen
+
+    Returns:
+        list: Chat-Nachrichten
+    """
+    suggested_style = suggested_style if suggested_style in styles else styles[0]
+    style_lines = "\n".join(f"- {style}: {GPT_INSTRUCTIONS[style]}" for style in styles)
+    fields = ['"summary": die Zusammenfassung im gewählten Stil',
+              '"style": der Name des gewählten Stils']
+    if max_chars:
+        fields[0] += f" (höchstens {max_chars} Zeichen)"
+    if with_image_prompt:
+        fields.append(
+            f'"image_prompt": ein kurzer, prägnanter DALL-E-Prompt (max. {STRUCTURED_SUMMARY["max_image_prompt_words"]} '
+            "Wörter), der den Inhalt satirisch, überspitzt und visuell interessant darstellt, "
+            "ohne Hashtags oder @-Erwähnungen"
+        )
+    system = (
+        f"{CUSTOM_SYSTEM_INSTRUCTION.strip()}\n\n"
+        f"Wähle einen dieser Kommentarstile:\n{style_lines}\n"
+        f'Vorschlag anhand von Schlüsselwörtern und Engagement: "{suggested_style}". '
+        "Weiche nur ab, wenn ein anderer Stil deutlich besser passt.\n\n"
+        "Antworte ausschließlich mit einem JSON-Objekt mit den Feldern:\n"
+        + "\n".join(f"- {field}" for field in fields)
+    )
+    return [
+        {"role": "system", "content": system},
+        {"role": "user", "content": text},
+    ]
+
+
+def parse_structured_response(content, styles, with_image_prompt):
+    """
+    Prüft die Antwort des kombinierten Aufrufs.
+
+    Args:
+        content: Inhalt der Antwort (JSON-Text)
+        styles: Erlaubte Stile
+        with_image_prompt: True, wenn ein DALL-E-Prompt erwartet wird
+
+    Returns:
+        dict: {"summary": str, "style": str, "image_prompt": str oder None}
+
+    Raises:
+        StructuredResponseError: Bei ungültigem JSON, fehlenden oder leeren Feldern oder unbekanntem Stil
+    """
+    try:
+        data = json.loads(content or "")
+    except ValueError as e:
+        raise StructuredResponseError(f"kein gültiges JSON: {e}") from None
+    if not isinstance(data, dict):
+        raise StructuredResponseError("Antwort ist kein JSON-Objekt")
+
+    summary = data.get("summary")
+    if not isinstance(summary, str) or not summary.strip():
+        raise StructuredResponseError("Feld summary fehlt oder ist leer")
+    style = data.get("style")
+    if style not in styles:
+        raise StructuredResponseError(f"unbekannter Stil: {style!r}")
+
+    image_prompt = None
+    if with_image_prompt:
+        image_prompt = data.get("image_prompt")
+        if not isinstance(image_prompt, str) or not image_prompt.strip():
+            raise StructuredResponseError("Feld image_prompt fehlt oder ist leer")
+        # Zu lange Prompts auf die vorgegebene Wortzahl kürzen statt zu verwerfen
+        image_prompt = " ".join(image_prompt.split()[:STRUCTURED_SUMMARY["max_image_prompt_words"]])
+
+    return {"summary": summary.strip(), "style": style, "image_prompt": image_prompt}
@@ -0,0 +1,322 @@
+# -*- coding: utf-8 -*-
+
+"""
+Medien-Stufe für den Telegram-Versand.
+Bisher wurden Bild-URLs direkt an send_photo übergeben, und Telegram musste sie selbst
+laden; bei Nitter-, pbs.twimg.com- und DALL-E-URLs scheitert das häufig. Stattdessen lädt
+diese Stufe jedes Bild selbst (mehrere Bilder gleichzeitig), passt es bei Bedarf an die
+Foto-Limits von Telegram an (mit Pillow, falls installiert) und lädt es als Datei hoch.
+
+Die file_id, die Telegram für ein hochgeladenes Foto zurückgibt, wird unter dem Hash des
+Bildinhalts im State-Store gespeichert, zusätzlich die Zuordnung URL -> Inhalt. Ein
+erneut geteiltes Bild (anderer Tweet, gleiche Datei) kostet so keinen Upload mehr, eine
+bereits bekannte URL nicht einmal einen Download.
+"""
+
+import io
+import os
+import time
+import weakref
+import asyncio
+import hashlib
+import contextlib
+from dataclasses import dataclass, replace
+
+from config import TELEGRAM_MEDIA
+from state_store import get_state_store
+from metrics import get_metrics
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS telegram_media (
+    content_hash TEXT PRIMARY KEY,
+    file_id      TEXT NOT NULL,
+    uploaded_at  REAL NOT NULL,
+    last_used    REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_telegram_media_last_used ON telegram_media (last_used);
+CREATE TABLE IF NOT EXISTS telegram_media_urls (
+    url          TEXT PRIMARY KEY,
+    content_hash TEXT NOT NULL,
+    seen_at      REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_telegram_media_urls_seen_at ON telegram_media_urls (seen_at);
+"""
+
+
+@dataclass(slots=True)
+class PreparedPhoto:
+    """Ergebnis von prepare_photo: was an send_photo übergeben wird und woher es stammt."""
+    source: str                # Ursprüngliche URL, Datei oder file_id
+    photo: object              # file_id (str), Bilddaten (bytes) oder als Ausweichweg die URL
+    content_hash: str = ""     # Hash der geladenen Bilddaten (leer, wenn nichts geladen wurde)
+    cached: bool = False       # True, wenn photo eine gespeicherte file_id ist
+    resized: bool = False      # True, wenn das Bild für Telegram verkleinert/neu komprimiert wurde
+
+
+def _load_pillow():
+    """Importiert Pillow erst bei Bedarf (optionale Abhängigkeit); None, wenn nicht installiert."""
+    try:
+        from PIL import Image
+    except ImportError:
+        return None
+    return Image
+
+
+def content_hash(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def is_file_id(media):
+    """Alles, was weder URL noch lokale Datei ist, wird als Telegram-file_id behandelt."""
+    return bool(media) and not media.startswith(("http://", "https://")) and not os.path.isfile(media)
+
+
+class TelegramMediaCache:
+    """Telegram-file_ids nach Bildinhalt sowie die Zuordnung URL -> Bildinhalt."""
+
+    def __init__(self, store=None, cache_days=None):
+        self.store = store or get_state_store()
+        self.cache_days = cache_days if cache_days is not None else TELEGRAM_MEDIA["cache_days"]
+        self.store.ensure_schema(_SCHEMA)
+        self.store.add_compaction_hook(self.compact)
+
+    def lookup(self, content_hash):
+        """Gibt die file_id für einen Bildinhalt zurück (oder None)."""
+        row = self.store.execute(
+            "SELECT file_id FROM telegram_media WHERE content_hash = ?", (content_hash,)
+        ).fetchone()
+        if not row:
+            return None
+        self.store.execute("UPDATE telegram_media SET last_used = ? WHERE content_hash = ?", (time.time(), content_hash))
+        return row[0]
+
+    def lookup_url(self, url):
+        """
+        Sucht eine bereits geladene URL.
+
+        Returns:
+            tuple: (content_hash, file_id oder None) oder None, wenn die URL unbekannt ist
+        """
+        row = self.store.execute(
+            "SELECT u.content_hash, m.file_id FROM telegram_media_urls u "
+            "LEFT JOIN telegram_media m ON m.content_hash = u.content_hash WHERE u.url = ?",
+            (url,)
+        ).fetchone()
+        return tuple(row) if row else None
+
+    def remember_url(self, url, content_hash):
+        self.store.execute(
+            "INSERT OR REPLACE INTO telegram_media_urls (url, content_hash, seen_at) VALUES (?, ?, ?)",
+            (url, content_hash, time.time())
+        )
+
+    def record_upload(self, content_hash, file_id):
+        """Merkt sich die file_id eines hochgeladenen Bildes."""
+        now = time.time()
+        self.store.execute(
+            "INSERT OR REPLACE INTO telegram_media (content_hash, file_id, uploaded_at, last_used) VALUES (?, ?, ?, ?)",
+            (content_hash, file_id, now, now)
+        )
+
+    def forget(self, content_hash):
+        """Verwirft eine file_id, die Telegram nicht mehr akzeptiert."""
+        self.store.execute("DELETE FROM telegram_media WHERE content_hash = ?", (content_hash,))
+
+    def compact(self):
+        """Entfernt file_ids und URLs, die seit cache_days nicht mehr verwendet wurden."""
+        cutoff = time.time() - self.cache_days * 86400
+        self.store.execute("DELETE FROM telegram_media WHERE last_used <= ?", (cutoff,))
+        self.store.execute("DELETE FROM telegram_media_urls WHERE seen_at <= ?", (cutoff,))
+
+
+_cache = None
+
+
+def get_telegram_media_cache():
+    """Gibt den prozessweiten file_id-Cache zurück."""
+    global _cache
+    if _cache is None:
+        _cache = TelegramMediaCache()
+    return _cache
+
+
+def fit_photo(data, settings=None):
+    """
+    Passt Bilddaten an die Foto-Limits von Telegram an (Dateigröße, Kantenlänge, Seitenverhältnis).
+
+    Ohne Pillow werden die Daten unverändert zurückgegeben, sofern sie klein genug sind.
+
+    Args:
+        data: Bilddaten
+        settings: Optional, abweichende Einstellungen (Standard: TELEGRAM_MEDIA)
+
+    Returns:
+        tuple: (Bilddaten, verändert) oder (None, False), wenn sich das Bild nicht anpassen lässt
+    """
+    settings = settings or TELEGRAM_MEDIA
+    Image = _load_pillow()
+    if Image is None:
+        return (data, False) if len(data) <= settings["max_photo_bytes"] else (None, False)
+
+    try:
+        image = Image.open(io.BytesIO(data))
+        width, height = image.size
+        needs_resize = max(width, height) > settings["max_side"]
+        needs_crop = max(width, height) > settings["max_aspect_ratio"] * min(width, height)
+        if (not needs_resize and not needs_crop and len(data) <= settings["max_photo_bytes"]
+                and image.format in ("JPEG", "PNG", "WEBP")):
+            return data, False
+
+        image.load()
+        if needs_crop:
+            # Extrem schmale Bilder lehnt Telegram ab: mittig auf das maximale Seitenverhältnis zuschneiden
+            limit = int(min(width, height) * settings["max_aspect_ratio"])
+            if width > height:
+                left = (width - limit) // 2
+                image = image.crop((left, 0, left + limit, height))
+            else:
+                top = (height - limit) // 2
+                image = image.crop((0, top, width, top + limit))
+        if image.mode not in ("RGB", "L"):
+            # Transparenz auf weißem Hintergrund auflösen (JPEG kennt keinen Alphakanal)
+            background = Image.new("RGB", image.size, (255, 255, 255))
+            rgba = image.convert("RGBA")
+            background.paste(rgba, mask=rgba.getchannel("A"))
+            image = background
+        image.thumbnail((settings["max_side"], settings["max_side"]))
+
+        quality = settings["jpeg_quality"]
+        while True:
+            output = io.BytesIO()
+            image.save(output, format="JPEG", quality=quality, optimize=True)
+            if output.tell() <= settings["max_photo_bytes"] or quality <= 40:
+                break
+            quality -= 15
+        if output.tell() > settings["max_photo_bytes"]:
+            return None, False
+        return output.getvalue(), True
+    except Exception as e:
+        print(f"Bild konnte nicht für Telegram angepasst werden: {e}")
+        return (data, False) if len(data) <= settings["max_photo_bytes"] else (None, False)
+
+
+async def download_media(url, client=None):
+    """
+    Lädt ein Bild herunter (höchstens max_download_bytes).
+
+    Returns:
+        bytes: Die Bilddaten
+    """
+    from clients import get_client
+
+    client = client or get_client("download_http")
+    limit = TELEGRAM_MEDIA["max_download_bytes"]
+    async with client.stream("GET", url, timeout=TELEGRAM_MEDIA["download_timeout_seconds"]) as response:
+        response.raise_for_status()
+        if int(response.headers.get("Content-Length") or 0) > limit:
+            raise ValueError(f"Bild größer als {limit} Bytes")
+        chunks = []
+        size = 0
+        async for chunk in response.aiter_bytes():
+            size += len(chunk)
+            if size > limit:
+                raise ValueError(f"Bild größer als {limit} Bytes")
+            chunks.append(chunk)
+    return b"".join(chunks)
+
+
+async def prepare_photo(media, cache=None):
+    """
+    Bereitet ein Bild für send_photo vor.
+
+    Args:
+        media: URL, lokaler Dateipfad oder Telegram-file_id
+        cache: Optional, TelegramMediaCache (Standard: der prozessweite Cache)
+
+    Returns:
+        PreparedPhoto oder None, wenn media leer ist. Scheitert der Download, enthält photo
+        die ursprüngliche URL, damit Telegram es wie bisher selbst versucht.
+    """
+    if not media:
+        return None
+    if not TELEGRAM_MEDIA["enabled"] or is_file_id(media):
+        return PreparedPhoto(source=media, photo=media)
+
+    started = time.perf_counter()
+    cache = cache or get_telegram_media_cache()
+    is_url = media.startswith(("http://", "https://"))
+    source = "url" if is_url else "file"
+    try:
+        if is_url:
+            known = cache.lookup_url(media)
+            if known and known[1]:
+                cache.lookup(known[0])  # last_used aktualisieren
+                get_metrics().record("media", "cached", started, source)
+                return PreparedPhoto(source=media, photo=known[1], content_hash=known[0], cached=True)
+            data = await download_media(media)
+        else:
+            with open(media, "rb") as f:
+                data = f.read()
+    except Exception as e:
+        print(f"Bild konnte nicht geladen werden, Telegram lädt die URL selbst: {media} ({e})")
+        get_metrics().record("media", "fallback", started, source)
+        return PreparedPhoto(source=media, photo=media)
+
+    digest = content_hash(data)
+    if is_url:
+        cache.remember_url(media, digest)
+    file_id = cache.lookup(digest)
+    if file_id:
+        get_metrics().record("media", "cached", started, source)
+        return PreparedPhoto(source=media, photo=file_id, content_hash=digest, cached=True)
+
+    # Anpassen kann bei großen Bildern spürbar CPU kosten, deshalb außerhalb des Event-Loops
+    photo, resized = await asyncio.to_thread(fit_photo, data)
+    if photo is None:
+        print(f"Bild überschreitet die Telegram-Limits und lässt sich nicht anpassen: {media}")
+        get_metrics().record("media", "fallback", started, source)
+        return PreparedPhoto(source=media, photo=media)
+    get_metrics().record("media", "success", started, source)
+    return PreparedPhoto(source=media, photo=photo, content_hash=digest, resized=resized)
+
+
+async def prepare_photos(media_list, cache=None):
+    """Bereitet mehrere Bilder gleichzeitig vor (Reihenfolge bleibt erhalten)."""
+    return list(await asyncio.gather(*(prepare_photo(media, cache) for media in media_list)))
+
+
+# Laufende Uploads pro Bildinhalt (siehe upload_slot)
+_upload_locks = weakref.WeakValueDictionary()
+
+
+@contextlib.asynccontextmanager
+async def upload_slot(prepared, cache=None):
+    """
+    Lässt gleichzeitige Posts mit demselben Bildinhalt nacheinander senden: nur der erste
+    lädt das Bild hoch, die übrigen erhalten danach dessen file_id.
+
+    Yields:
+        PreparedPhoto: das vorbereitete Bild, ggf. mit inzwischen bekannter file_id
+    """
+    if not prepared or not prepared.content_hash or prepared.cached:
+        yield prepared
+        return
+    lock = _upload_locks.setdefault(prepared.content_hash, asyncio.Lock())
+    async with lock:
+        file_id = (cache or get_telegram_media_cache()).lookup(prepared.content_hash)
+        yield replace(prepared, photo=file_id, cached=True, resized=False) if file_id else prepared
+
+
+def remember_upload(prepared, sent_message, cache=None):
+    """Speichert die file_id eines hochgeladenen Bildes aus der Antwort von send_photo/send_media_group."""
+    if not prepared or not prepared.content_hash or prepared.cached:
+        return
+    photos = getattr(sent_message, "photo", None)
+    if photos:
+        (cache or get_telegram_media_cache()).record_upload(prepared.content_hash, photos[-1].file_id)
+
+
+def forget_upload(prepared, cache=None):
+    """Verwirft eine gespeicherte file_id, die Telegram abgelehnt hat."""
+    if prepared and prepared.cached and prepared.content_hash:
+        (cache or get_telegram_media_cache()).forget(prepared.content_hash)
@@ -0,0 +1,241 @@
+# -*- coding: utf-8 -*-
+
+"""
+Ausgehende Warteschlange für Telegram-Nachrichten.
+Statt fester Pausen begrenzen Token-Buckets die Senderate pro Chat und global auf die
+Telegram-Limits. Pro Chat arbeitet ein Worker die Nachrichten in Reihenfolge ab; bei
+RetryAfter (Flood Control) wird genau die von Telegram genannte Zeit gewartet und
+dieselbe Anfrage erneut gesendet, statt den Post zu verwerfen.
+"""
+
+import time
+import asyncio
+import datetime
+
+from config import TELEGRAM_SEND
+
+
+def retry_after_seconds(error):
+    """Liest die Wartezeit aus einem RetryAfter-Fehler (int oder timedelta, je nach PTB-Version)."""
+    value = getattr(error, "_retry_after", None)
+    if value is None:
+        value = error.retry_after
+    if isinstance(value, datetime.timedelta):
+        return value.total_seconds()
+    return float(value)
+
+
+class TokenBucket:
+    """Token-Bucket mit Nachfüllrate (Tokens pro Sekunde) und Burst-Kapazität."""
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def delay(self, cost=1, now=None):
+        """Sekunden, bis cost Tokens verfügbar sind (0, wenn sofort gesendet werden darf)."""
+        now = now or time.monotonic()
+        self._refill(now)
+        if now < self.blocked_until:
+            return self.blocked_until - now
+        # Anfragen teurer als die Kapazität (z.B. große Mediengruppen) dürfen ins Minus gehen
+        needed = min(cost, self.capacity) - self.tokens
+        return max(0.0, needed / self.rate)
+
+    def consume(self, cost=1):
+        self.tokens -= cost
+
+    def block(self, seconds):
+        """Sperrt den Bucket für die von Telegram vorgegebene Zeit und leert ihn."""
+        now = time.monotonic()
+        self._refill(now)
+        self.blocked_until = max(self.blocked_until, now + seconds)
+        self.tokens = 0.0
+
+
+class _Job:
+    __slots__ = ("request_factory", "cost", "future", "enqueued_at")
+
+    def __init__(self, request_factory, cost, future):
+        self.request_factory = request_factory
+        self.cost = cost
+        self.future = future
+        self.enqueued_at = time.monotonic()
+
+
+class TelegramSendQueue:
+    """Rate-begrenzte Sendewarteschlange mit je einem Worker pro Chat."""
+
+    def __init__(self, settings=None):
+        self.settings = dict(TELEGRAM_SEND if settings is None else settings)
+        self.share = 1.0
+        self.global_bucket = TokenBucket(self.settings["global_messages_per_second"],
+                                         self.settings["global_burst"])
+        self._chats = {}
+        self._workers = []
+        self.sent = 0
+        self.failed = 0
+        self.retries = 0
+        self.retry_after_total = 0.0
+        self.max_depth = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def _chat(self, chat_id):
+        chat = self._chats.get(chat_id)
+        if chat is None:
+            bucket = TokenBucket(self.settings["per_chat_messages_per_minute"] / 60.0 * self.share,
+                                 max(1.0, self.settings["per_chat_burst"] * self.share))
+            queue = asyncio.Queue(maxsize=self.settings["max_queue_size"])
+            chat = (bucket, queue)
+            self._chats[chat_id] = chat
+            self._workers.append(asyncio.create_task(self._worker(chat_id, bucket, queue)))
+        return chat
+
+    def set_share(self, share):
+        """
+        Beschränkt diese Warteschlange auf einen Anteil der Telegram-Limits, wenn sich mehrere
+        Prozesse denselben Bot teilen (z.B. 1/3 bei drei Workern).
+        """
+        self.share = share
+        self.global_bucket.rate = self.settings["global_messages_per_second"] * share
+        self.global_bucket.capacity = max(1.0, self.settings["global_burst"] * share)
+        for bucket, _ in self._chats.values():
+            bucket.rate = self.settings["per_chat_messages_per_minute"] / 60.0 * share
+            bucket.capacity = max(1.0, self.settings["per_chat_burst"] * share)
+
+    def depth(self):
+        """Anzahl der Nachrichten, die aktuell auf den Versand warten."""
+        return sum(queue.qsize() for _, queue in self._chats.values())
+
+    async def submit(self, chat_id, request_factory, cost=1):
+        """
+        Stellt eine Telegram-Anfrage in die Warteschlange und wartet auf ihr Ergebnis.
+
+        Args:
+            chat_id: Ziel-Chat, bestimmt den Token-Bucket und die Reihenfolge
+            request_factory: Funktion ohne Argumente, die die Anfrage-Coroutine erzeugt
+                (wird bei RetryAfter erneut aufgerufen)
+            cost: Anzahl der Nachrichten, die die Anfrage erzeugt (z.B. Bilder einer Mediengruppe)
+
+        Returns:
+            Die Antwort der Bot-API; Fehler außer RetryAfter werden weitergereicht
+        """
+        _, queue = self._chat(chat_id)
+        future = asyncio.get_running_loop().create_future()
+        await queue.put(_Job(request_factory, cost, future))
+        self.max_depth = max(self.max_depth, self.depth())
+        return await future
+
+    async def _acquire(self, bucket, cost):
+        while True:
+            wait = max(bucket.delay(cost), self.global_bucket.delay(cost))
+            if wait <= 0:
+                bucket.consume(cost)
+                self.global_bucket.consume(cost)
+                return
+            await asyncio.sleep(wait)
+
+    async def _send(self, chat_id, bucket, job):
+        # Erst beim ersten Versand laden, damit der Import dieses Moduls die Telegram-Bibliothek nicht braucht
+        from telegram.error import RetryAfter
+
+        max_retries = self.settings["max_retries"]
+        for attempt in range(max_retries + 1):
+            await self._acquire(bucket, job.cost)
+            if attempt == 0:
+                # Wartezeit von der Einreihung bis zum ersten Sendeversuch
+                wait = time.monotonic() - job.enqueued_at
+                self.total_wait += wait
+                self.max_wait = max(self.max_wait, wait)
+            try:
+                return await job.request_factory()
+            except RetryAfter as e:
+                seconds = retry_after_seconds(e)
+                self.retries += 1
+                self.retry_after_total += seconds
+                if attempt >= max_retries:
+                    raise
+                print(f"Telegram Flood Control für {chat_id}: warte {seconds:.0f}s "
+                      f"(Versuch {attempt + 1}/{max_retries}, {self.depth()} Nachrichten in der Warteschlange)")
+                bucket.block(seconds)
+
+    async def _worker(self, chat_id, bucket, queue):
+        while True:
+            job = await queue.get()
+            try:
+                if job.future.cancelled():
+                    continue
+                try:
+                    result = await self._send(chat_id, bucket, job)
+                except Exception as e:
+                    self.failed += 1
+                    if not job.future.done():
+                        job.future.set_exception(e)
+                else:
+                    self.sent += 1
+                    if not job.future.done():
+                        job.future.set_result(result)
+            finally:
+                queue.task_done()
+
+    def stats(self):
+        processed = self.sent + self.failed
+        return {
+            "sent": self.sent,
+            "failed": self.failed,
+            "retries": self.retries,
+            "retry_after_seconds": self.retry_after_total,
+            "depth": self.depth(),
+            "max_depth": self.max_depth,
+            "avg_wait_seconds": self.total_wait / processed if processed else 0.0,
+            "max_wait_seconds": self.max_wait
+        }
+
+    async def close(self):
+        """Wartet, bis alle Nachrichten gesendet sind, und beendet die Worker."""
+        for _, queue in self._chats.values():
+            await queue.join()
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        self._chats = {}
+
+
+# Die Warteschlange gehört zum Event-Loop, in dem sie erzeugt wurde
+_queue = None
+_queue_loop = None
+
+
+def get_telegram_queue():
+    """
+    Gibt die gemeinsame Telegram-Sendewarteschlange zurück.
+    Muss innerhalb eines laufenden Event-Loops aufgerufen werden.
+    """
+    global _queue, _queue_loop
+    loop = asyncio.get_running_loop()
+    if _queue is None or _queue_loop is not loop:
+        _queue = TelegramSendQueue()
+        _queue_loop = loop
+    return _queue
+
+
+async def close_telegram_queue():
+    """
+    Leert und beendet die Warteschlange, falls sie im laufenden Event-Loop existiert.
+
+    Returns:
+        dict: Statistiken der Warteschlange oder None, wenn nichts gesendet wurde
+    """
+    if _queue is None or _queue_loop is not asyncio.get_running_loop():
+        return None
+    await _queue.close()
+    return _queue.stats()
@@ -0,0 +1,245 @@
+# -*- coding: utf-8 -*-
+
+"""
+Token-Zählung, Token-Budgets und Verbrauchserfassung für die LLM-Aufrufe.
+
+Tokens werden mit tiktoken gezählt, falls installiert und die Kodierung des Modells
+verfügbar ist (tiktoken lädt sie beim ersten Gebrauch herunter); sonst wird über
+TOKEN_BUDGET["chars_per_token"] geschätzt. Damit wird der Tweet-Text vor dem Aufruf auf
+max_input_tokens gekürzt und max_tokens der Antwort so gewählt, dass die Zusammenfassung
+in die Telegram-Nachricht passt (1024 Zeichen Bildunterschrift, 4096 Zeichen Text).
+
+Den tatsächlichen Verbrauch liefert die API in jeder Antwort (usage). TokenUsage summiert
+ihn pro Account, Stil, Modell und Stufe für den laufenden Prozess und tageweise im State-Store.
+"""
+
+import math
+import time
+import datetime
+import threading
+
+from config import TOKEN_BUDGET
+from state_store import get_state_store
+from metrics import get_metrics
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS token_usage (
+    day               TEXT NOT NULL,
+    account           TEXT NOT NULL,
+    style             TEXT NOT NULL,
+    model             TEXT NOT NULL,
+    stage             TEXT NOT NULL,
+    calls             INTEGER NOT NULL,
+    prompt_tokens     INTEGER NOT NULL,
+    completion_tokens INTEGER NOT NULL,
+    PRIMARY KEY (day, account, style, model, stage)
+);
+"""
+
+# Zusätzliche Tokens pro Chat-Nachricht (Rolle, Trennzeichen) und für den Antwortbeginn
+_TOKENS_PER_MESSAGE = 4
+_TOKENS_PER_REPLY = 3
+
+_encodings = {}
+_encodings_lock = threading.Lock()
+
+
+def _encoding(model):
+    """tiktoken-Kodierung für ein Modell oder None (nicht installiert, unbekannt oder nicht ladbar)."""
+    if not TOKEN_BUDGET["use_tiktoken"]:
+        return None
+    with _encodings_lock:
+        if model in _encodings:
+            return _encodings[model]
+        encoding = None
+        try:
+            import tiktoken
+            try:
+                encoding = tiktoken.encoding_for_model(model)
+            except KeyError:
+                encoding = tiktoken.get_encoding(TOKEN_BUDGET["fallback_encoding"])
+        except ImportError:
+            pass
+        except Exception as e:
+            # z.B. ohne Netzwerkzugang beim ersten Laden der Kodierung; nur einmal pro Modell versuchen
+            print(f"tiktoken-Kodierung für {model} nicht verfügbar, Tokens werden geschätzt: {e}")
+        _encodings[model] = encoding
+        return encoding
+
+
+def count_tokens(text, model):
+    """Anzahl der Tokens eines Texts (mit tiktoken exakt, sonst geschätzt)."""
+    if not text:
+        return 0
+    encoding = _encoding(model)
+    if encoding is not None:
+        return len(encoding.encode(text))
+    return math.ceil(len(text) / TOKEN_BUDGET["chars_per_token"])
+
+
+def count_chat_tokens(messages, model):
+    """Geschätzte Prompt-Tokens einer Chat-Anfrage (Inhalte plus Overhead pro Nachricht)."""
+    return sum(count_tokens(message["content"], model) + _TOKENS_PER_MESSAGE for message in messages) + _TOKENS_PER_REPLY
+
+
+def trim_to_tokens(text, max_tokens, model):
+    """
+    Kürzt einen Text auf höchstens max_tokens Tokens (an einer Wortgrenze, mit "…").
+
+    Returns:
+        str: Der unveränderte oder gekürzte Text
+    """
+    if not text or not max_tokens or count_tokens(text, model) <= max_tokens:
+        return text
+    encoding = _encoding(model)
+    if encoding is not None:
+        trimmed = encoding.decode(encoding.encode(text)[:max(max_tokens - 1, 1)])
+    else:
+        trimmed = text[:int((max_tokens - 1) * TOKEN_BUDGET["chars_per_token"])]
+    # Angeschnittenes letztes Wort entfernen
+    if " " in trimmed:
+        trimmed = trimmed.rsplit(" ", 1)[0]
+    return trimmed.rstrip() + "…"
+
+
+def output_budget(available_chars):
+    """
+    Berechnet das Budget einer Zusammenfassung aus dem Platz in der Telegram-Nachricht.
+
+    Args:
+        available_chars: Zeichen, die nach Kopfzeile, Quellen und Fußzeile frei bleiben
+
+    Returns:
+        tuple: (max_chars, max_tokens); max_tokens ist großzügig bemessen, damit die Antwort
+               im Normalfall vorher endet und nur ausufernde Antworten abgeschnitten werden
+    """
+    max_chars = max(int(available_chars), TOKEN_BUDGET["min_summary_chars"])
+    max_tokens = math.ceil(max_chars / TOKEN_BUDGET["output_chars_per_token"])
+    return max_chars, min(max_tokens, TOKEN_BUDGET["max_output_tokens"])
+
+
+def finish_truncated(text):
+    """Schneidet eine wegen max_tokens abgebrochene Antwort nach dem letzten vollständigen Satz ab."""
+    cut = max(text.rfind(end) for end in (". ", "! ", "? ", ".\n", "!\n", "?\n"))
+    if cut >= len(text) // 2:
+        return text[:cut + 1].rstrip()
+    return text.rstrip() + "…"
+
+
+def usage_from_response(completion, messages, model):
+    """
+    Liest den Token-Verbrauch aus einer Chat-Antwort.
+
+    Returns:
+        tuple: (prompt_tokens, completion_tokens, geschätzt); ohne usage-Angabe des Servers
+               werden beide Werte lokal gezählt
+    """
+    usage = getattr(completion, "usage", None)
+    if usage and usage.prompt_tokens is not None:
+        return usage.prompt_tokens, usage.completion_tokens or 0, False
+    content = (completion.choices[0].message.content or "") if completion.choices else ""
+    return count_chat_tokens(messages, model), count_tokens(content, model), True
+
+
+class TokenUsage:
+    """Summiert den Token-Verbrauch pro Account, Stil, Modell und Stufe (threadsicher)."""
+
+    def __init__(self, store=None, retention_days=None):
+        self.store = store or get_state_store()
+        self.retention_days = retention_days if retention_days is not None else TOKEN_BUDGET["retention_days"]
+        self.store.ensure_schema(_SCHEMA)
+        self.store.add_compaction_hook(self.compact)
+        self._run = {}
+        self._estimated_calls = 0
+        self._lock = threading.Lock()
+
+    def record(self, stage, model, prompt_tokens, completion_tokens, account="", style="", estimated=False):
+        """Erfasst den Verbrauch eines Aufrufs für den laufenden Prozess, den State-Store und die Metriken."""
+        key = (account or "", style or "", model, stage)
+        with self._lock:
+            calls, prompt, completion = self._run.get(key, (0, 0, 0))
+            self._run[key] = (calls + 1, prompt + prompt_tokens, completion + completion_tokens)
+            self._estimated_calls += bool(estimated)
+        day = datetime.date.today().isoformat()
+        self.store.execute(
+            "INSERT INTO token_usage (day, account, style, model, stage, calls, prompt_tokens, completion_tokens) "
+            "VALUES (?, ?, ?, ?, ?, 1, ?, ?) ON CONFLICT(day, account, style, model, stage) DO UPDATE SET "
+            "calls = calls + 1, prompt_tokens = prompt_tokens + excluded.prompt_tokens, "
+            "completion_tokens = completion_tokens + excluded.completion_tokens",
+            (day, *key, prompt_tokens, completion_tokens)
+        )
+        get_metrics().count_tokens(stage, model, prompt_tokens, completion_tokens)
+
+    def summary(self):
+        """
+        Verbrauch des laufenden Prozesses.
+
+        Returns:
+            dict: {"total": {...}, "by_account": {...}, "by_style": {...}, "by_model": {...},
+                   "estimated_calls": int}; jeder Eintrag mit calls, prompt_tokens, completion_tokens
+        """
+        def add(bucket, name, values):
+            entry = bucket.setdefault(name, {"calls": 0, "prompt_tokens": 0, "completion_tokens": 0})
+            for field, value in zip(("calls", "prompt_tokens", "completion_tokens"), values):
+                entry[field] += value
+
+        result = {"total": {"calls": 0, "prompt_tokens": 0, "completion_tokens": 0},
+                  "by_account": {}, "by_style": {}, "by_model": {}}
+        with self._lock:
+            for (account, style, model, _), values in self._run.items():
+                add(result, "total", values)
+                add(result["by_account"], account or "-", values)
+                add(result["by_style"], style or "-", values)
+                add(result["by_model"], model, values)
+            result["estimated_calls"] = self._estimated_calls
+        return result
+
+    def summary_lines(self, top=5):
+        """Kurzfassung für die Konsolenausgabe: Summe, Modelle, Stile und die Accounts mit dem höchsten Verbrauch."""
+        summary = self.summary()
+        total = summary["total"]
+        if not total["calls"]:
+            return []
+
+        def line(name, values):
+            return (f"  {name:<24} {values['calls']:>6} Aufrufe {values['prompt_tokens']:>9} Prompt "
+                    f"{values['completion_tokens']:>8} Antwort")
+
+        lines = [line("gesamt", total)]
+        lines += [line(f"Modell {model}", values) for model, values in sorted(summary["by_model"].items())]
+        lines += [line(f"Stil {style}", values) for style, values in sorted(summary["by_style"].items())]
+        accounts = sorted(summary["by_account"].items(),
+                          key=lambda item: item[1]["prompt_tokens"] + item[1]["completion_tokens"], reverse=True)
+        lines += [line(f"@{account}", values) for account, values in accounts[:top]]
+        if summary["estimated_calls"]:
+            lines.append(f"  ({summary['estimated_calls']} Aufrufe ohne usage-Angabe, lokal gezählt)")
+        return lines
+
+    def daily_totals(self, days=30):
+        """Gespeicherter Verbrauch der letzten Tage pro Tag, Account, Stil, Modell und Stufe."""
+        since = (datetime.date.today() - datetime.timedelta(days=days - 1)).isoformat()
+        rows = self.store.execute(
+            "SELECT day, account, style, model, stage, calls, prompt_tokens, completion_tokens FROM token_usage "
+            "WHERE day >= ? ORDER BY day, account, style, model, stage",
+            (since,)
+        ).fetchall()
+        columns = ("day", "account", "style", "model", "stage", "calls", "prompt_tokens", "completion_tokens")
+        return [dict(zip(columns, row)) for row in rows]
+
+    def compact(self):
+        """Entfernt Tageswerte, die älter als retention_days sind."""
+        cutoff = datetime.date.fromtimestamp(time.time() - self.retention_days * 86400).isoformat()
+        self.store.execute("DELETE FROM token_usage WHERE day < ?", (cutoff,))
+
+
+_usage = None
+_usage_lock = threading.Lock()
+
+
+def get_token_usage():
+    """Gibt die prozessweite Verbrauchserfassung zurück."""
+    global _usage
+    with _usage_lock:
+        if _usage is None:
+            _usage = TokenUsage()
+        return _usage
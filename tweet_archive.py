@@ -0,0 +1,156 @@
+# -*- coding: utf-8 -*-
+
+"""
+Aufzeichnen und Wiedergeben abgerufener Tweets (gzip-komprimiertes JSONL).
+Im Aufnahmemodus wird jeder abgerufene Tweet normalisiert (Tweet.to_dict) mit Account und
+Abrufzeitpunkt in ein Archiv geschrieben. Die Wiedergabe liefert die Tweets in denselben
+Abruf-Gruppen wieder aus, wahlweise so schnell wie möglich, mit fester Rate (Tweets pro
+Sekunde) oder im ursprünglichen zeitlichen Abstand (beschleunigt um einen Faktor).
+So lassen sich echte Rückstaus, z.B. ein Tag mit 200 Accounts, ohne Scraping gegen den
+Filter-, Zusammenfassungs- und Sende-Code abspielen.
+"""
+
+import gzip
+import json
+import time
+import asyncio
+import threading
+
+from config import TWEET_ARCHIVE
+from tweet_record import Tweet
+
+
+class TweetArchiveWriter:
+    """Hängt abgerufene Tweets an ein gzip-JSONL-Archiv an (ein gzip-Member pro Programmlauf)."""
+
+    def __init__(self, path):
+        self.path = path
+        self.records = 0
+        self._file = gzip.open(path, "at", encoding="utf-8")
+        self._lock = threading.Lock()
+
+    def write(self, account, tweets, fetched_at=None):
+        """
+        Schreibt die Tweets eines Abrufs.
+
+        Args:
+            account: Benutzername des abgefragten Accounts
+            tweets: Liste von Tweets aus get_latest_tweets_async
+            fetched_at: Abrufzeitpunkt (Unix-Zeit, Standard: jetzt)
+        """
+        if not tweets:
+            return
+        fetched_at = fetched_at or time.time()
+        lines = "".join(
+            json.dumps({"account": account, "fetched_at": fetched_at, "tweet": tweet.to_dict()}, ensure_ascii=False) + "\n"
+            for tweet in tweets
+        )
+        with self._lock:
+            self._file.write(lines)
+            # Nach jedem Abruf leeren, damit das Archiv auch nach einem Absturz lesbar bleibt
+            self._file.flush()
+            self.records += len(tweets)
+
+    def close(self):
+        with self._lock:
+            if not self._file.closed:
+                self._file.close()
+
+
+def read_archive(path):
+    """
+    Liest ein Archiv Zeile für Zeile.
+
+    Yields:
+        tuple: (account, fetched_at, Tweet)
+    """
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        try:
+            for line in f:
+                if not line.strip():
+                    continue
+                record = json.loads(line)
+                yield record["account"], record["fetched_at"], Tweet.from_dict(record["tweet"])
+        except (EOFError, gzip.BadGzipFile) as e:
+            # Unvollständiges Ende (z.B. Abbruch während der Aufnahme): bisherige Einträge sind gültig
+            print(f"Archiv {path} endet unvollständig, Wiedergabe bis hierhin: {e}")
+        except json.JSONDecodeError as e:
+            print(f"Archiv {path} enthält eine unvollständige Zeile, Wiedergabe bis hierhin: {e}")
+
+
+def _fetch_groups(path):
+    """Fasst aufeinanderfolgende Einträge desselben Abrufs (Account und Zeitpunkt) zusammen."""
+    group_key, tweets = None, []
+    for account, fetched_at, tweet in read_archive(path):
+        if (account, fetched_at) != group_key and tweets:
+            yield group_key[0], group_key[1], tweets
+            tweets = []
+        group_key = (account, fetched_at)
+        tweets.append(tweet)
+    if tweets:
+        yield group_key[0], group_key[1], tweets
+
+
+async def replay_archive(path, rate=None, speed=None):
+    """
+    Gibt die Abrufe eines Archivs zeitgesteuert wieder.
+
+    Args:
+        path: Pfad des Archivs
+        rate: Optional, Tweets pro Sekunde (gleichmäßig verteilt)
+        speed: Optional, Zeitraffer-Faktor für die ursprünglichen Abstände (z.B. 60 = eine Stunde in einer Minute);
+            ohne rate und speed wird so schnell wie möglich wiedergegeben
+
+    Yields:
+        tuple: (account, [Tweet, ...]) pro ursprünglichem Abruf
+    """
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+    first_fetched_at = None
+    released = 0
+    for account, fetched_at, tweets in _fetch_groups(path):
+        if first_fetched_at is None:
+            first_fetched_at = fetched_at
+        if rate:
+            due = started + released / rate
+        elif speed:
+            due = started + (fetched_at - first_fetched_at) / speed
+        else:
+            due = started
+        delay = due - loop.time()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        released += len(tweets)
+        yield account, tweets
+
+
+_writer = None
+_writer_lock = threading.Lock()
+
+
+def get_tweet_archive(path=None):
+    """
+    Gibt den prozessweiten Archiv-Schreiber zurück (Standard: TWEET_ARCHIVE["record_file"]).
+
+    Returns:
+        TweetArchiveWriter oder None, wenn nicht aufgezeichnet wird
+    """
+    global _writer
+    with _writer_lock:
+        if _writer is None:
+            path = path or TWEET_ARCHIVE["record_file"]
+            if path:
+                _writer = TweetArchiveWriter(path)
+                print(f"Abgerufene Tweets werden aufgezeichnet: {path}")
+        return _writer
+
+
+def close_tweet_archive():
+    """Schließt den Archiv-Schreiber und gibt die Anzahl aufgezeichneter Tweets zurück (oder None)."""
+    global _writer
+    with _writer_lock:
+        writer, _writer = _writer, None
+    if writer is None:
+        return None
+    writer.close()
+    return writer.records
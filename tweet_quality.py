@@ -0,0 +1,251 @@
+# -*- coding: utf-8 -*-
+
+"""
+Qualitätsbewertung von Tweets.
+Enthält die bisherige Einzelbewertung evaluate_tweet_quality und eine vektorisierte
+Batch-Variante, die die Merkmale vieler Tweets als NumPy-Arrays verarbeitet und exakt
+dieselben Scores liefert. Begründungstexte werden dort nur auf Anfrage erzeugt.
+Ist NumPy nicht installiert, bewertet die Batch-Variante die Tweets einzeln.
+"""
+
+from config import KEYWORD_MATCHING
+from keyword_matcher import KeywordMatcher
+from tweet_record import as_tweet
+
+try:
+    import numpy as np
+except ImportError:  # NumPy ist optional
+    np = None
+
+
+# Schlüsselwörter, die auf Qualität hindeuten könnten
+QUALITY_KEYWORDS = ['analyse', 'studie', 'forschung', 'erklärt', 'wichtig', 'neu']
+quality_matcher = KeywordMatcher({"quality": QUALITY_KEYWORDS}, word_boundary=KEYWORD_MATCHING["word_boundary"])
+
+
+def evaluate_tweet_quality(tweet_text, tweet_data=None):
+    """
+    Bewertet die Qualität eines Tweets basierend auf Inhalt und Engagement-Metriken.
+    
+    Args:
+        tweet_text: Der Text des Tweets
+        tweet_data: Optional, der Tweet mit Engagement-Daten (Likes, Retweets, etc.)
+        
+    Returns: 
+        float: Qualitätswert zwischen 0 und 1
+        str: Begründung für die Bewertung
+    """
+    score = 0.5  # Startwert
+    reasons = []
+    
+    # Länge des Tweets bewerten
+    if len(tweet_text) < 30:
+        score -= 0.2
+        reasons.append("Tweet ist sehr kurz")
+    elif len(tweet_text) > 100:
+        score += 0.1
+        reasons.append("Tweet hat gute Länge")
+    
+    # Prüfen auf reine URLs oder zu viele Hashtags
+    if tweet_text.startswith('http'):
+        score -= 0.3
+        reasons.append("Tweet enthält nur URL")
+    
+    hashtag_count = tweet_text.count('#')
+    if hashtag_count > 5:
+        score -= 0.1
+        reasons.append(f"Tweet enthält viele Hashtags ({hashtag_count})")
+    
+    # Prüfen auf Schlüsselwörter, die auf Qualität hindeuten könnten
+    found_keywords = quality_matcher.find_keywords(tweet_text)
+    for keyword in QUALITY_KEYWORDS:
+        if keyword.lower() in found_keywords:
+            score += 0.05
+            reasons.append(f"Enthält Qualitätsbegriff: {keyword}")
+    
+    # Prüfen auf Fragen oder Diskussionsanregungen
+    if '?' in tweet_text:
+        score += 0.05
+        reasons.append("Tweet enthält Frage/Diskussionsanregung")
+    
+    # Engagement-Metriken bewerten, wenn verfügbar
+    if tweet_data is not None:
+        tweet_data = as_tweet(tweet_data)
+        # Likes bewerten
+        likes = tweet_data.likes
+        if likes >= 100:
+            score += 0.2
+            reasons.append(f"Hohe Anzahl an Likes: {likes}")
+        elif likes >= 20:
+            score += 0.1
+            reasons.append(f"Gute Anzahl an Likes: {likes}")
+        
+        # Retweets bewerten
+        retweets = tweet_data.retweets
+        if retweets >= 50:
+            score += 0.2
+            reasons.append(f"Hohe Anzahl an Retweets: {retweets}")
+        elif retweets >= 10:
+            score += 0.1
+            reasons.append(f"Gute Anzahl an Retweets: {retweets}")
+        
+        # Kommentare bewerten
+        replies = tweet_data.replies
+        if replies >= 20:
+            score += 0.15
+            reasons.append(f"Hohe Anzahl an Kommentaren: {replies}")
+        elif replies >= 5:
+            score += 0.05
+            reasons.append(f"Gute Anzahl an Kommentaren: {replies}")
+        
+        # Gesamtes Engagement bewerten
+        total_engagement = tweet_data.engagement_total
+        if total_engagement >= 200:
+            score += 0.1
+            reasons.append(f"Sehr hohes Gesamtengagement: {total_engagement}")
+    
+    # Begrenzung des Scores auf 0-1
+    score = max(0, min(1, score))
+    
+    return score, ", ".join(reasons)
+
+
+
+# Vektorisierte Bewertung vieler Tweets
+def quality_features(tweets):
+    """
+    Extrahiert die für die Bewertung nötigen Merkmale von N Tweets als NumPy-Arrays.
+
+    Args:
+        tweets: Liste von Tweets
+
+    Returns:
+        dict: Arrays der Länge N ("keywords" als N x len(QUALITY_KEYWORDS)-Matrix)
+    """
+    texts = [tweet.text for tweet in tweets]
+    n = len(texts)
+
+    if KEYWORD_MATCHING["word_boundary"]:
+        found = quality_matcher.find_keywords_batch(texts)
+        keywords = np.array([[keyword in keywords for keyword in QUALITY_KEYWORDS] for keywords in found],
+                            dtype=bool).reshape(n, len(QUALITY_KEYWORDS))
+    else:
+        # Ohne Wortgrenzen entspricht der Matcher der Teilstring-Suche; spaltenweise ist sie am schnellsten
+        lowered = [text.lower() for text in texts]
+        keywords = np.zeros((n, len(QUALITY_KEYWORDS)), dtype=bool)
+        for column, keyword in enumerate(QUALITY_KEYWORDS):
+            keywords[:, column] = np.fromiter((keyword in text for text in lowered), dtype=bool, count=n)
+
+    def _ints(key):
+        return np.fromiter((getattr(tweet, key) for tweet in tweets), dtype=np.int64, count=n)
+
+    return {
+        "length": np.fromiter(map(len, texts), dtype=np.int64, count=n),
+        "starts_with_url": np.fromiter((text.startswith('http') for text in texts), dtype=bool, count=n),
+        "hashtags": np.fromiter((text.count('#') for text in texts), dtype=np.int64, count=n),
+        "has_question": np.fromiter(('?' in text for text in texts), dtype=bool, count=n),
+        "keywords": keywords,
+        "has_metrics": np.ones(n, dtype=bool),  # jeder Tweet trägt Engagement-Felder
+        "likes": _ints("likes"),
+        "retweets": _ints("retweets"),
+        "replies": _ints("replies"),
+        "engagement_total": _ints("engagement_total"),
+    }
+
+
+def _tiered(values, mask, high, high_bonus, low, low_bonus):
+    return np.where(mask & (values >= high), high_bonus, np.where(mask & (values >= low), low_bonus, 0.0))
+
+
+def score_quality_features(features, with_reasons=False):
+    """
+    Berechnet die Qualitätswerte aus den Merkmalen von quality_features.
+    Die Terme werden in derselben Reihenfolge wie in evaluate_tweet_quality addiert,
+    damit die Scores bitgenau übereinstimmen.
+
+    Args:
+        features: Merkmale als Dictionary von Arrays (siehe quality_features)
+        with_reasons: Begründungstexte erzeugen (sonst None)
+
+    Returns:
+        numpy.ndarray: Qualitätswerte zwischen 0 und 1
+        list: Begründungen pro Tweet oder None
+    """
+    length = features["length"]
+    metrics = features["has_metrics"]
+    score = np.full(len(length), 0.5)
+
+    score += np.where(length < 30, -0.2, np.where(length > 100, 0.1, 0.0))
+    score += np.where(features["starts_with_url"], -0.3, 0.0)
+    score += np.where(features["hashtags"] > 5, -0.1, 0.0)
+    for column in range(len(QUALITY_KEYWORDS)):
+        score += np.where(features["keywords"][:, column], 0.05, 0.0)
+    score += np.where(features["has_question"], 0.05, 0.0)
+
+    score += _tiered(features["likes"], metrics, 100, 0.2, 20, 0.1)
+    score += _tiered(features["retweets"], metrics, 50, 0.2, 10, 0.1)
+    score += _tiered(features["replies"], metrics, 20, 0.15, 5, 0.05)
+    score += np.where(metrics & (features["engagement_total"] >= 200), 0.1, 0.0)
+
+    # Begrenzung des Scores auf 0-1
+    score = np.clip(score, 0.0, 1.0)
+
+    reasons = [_reasons(features, i) for i in range(len(score))] if with_reasons else None
+    return score, reasons
+
+
+def _reasons(features, i):
+    """Baut die Begründung eines Tweets wie evaluate_tweet_quality."""
+    reasons = []
+    length = features["length"][i]
+    if length < 30:
+        reasons.append("Tweet ist sehr kurz")
+    elif length > 100:
+        reasons.append("Tweet hat gute Länge")
+    if features["starts_with_url"][i]:
+        reasons.append("Tweet enthält nur URL")
+    hashtag_count = int(features["hashtags"][i])
+    if hashtag_count > 5:
+        reasons.append(f"Tweet enthält viele Hashtags ({hashtag_count})")
+    for column, keyword in enumerate(QUALITY_KEYWORDS):
+        if features["keywords"][i, column]:
+            reasons.append(f"Enthält Qualitätsbegriff: {keyword}")
+    if features["has_question"][i]:
+        reasons.append("Tweet enthält Frage/Diskussionsanregung")
+    if features["has_metrics"][i]:
+        tiers = (
+            ("likes", 100, "Hohe Anzahl an Likes", 20, "Gute Anzahl an Likes"),
+            ("retweets", 50, "Hohe Anzahl an Retweets", 10, "Gute Anzahl an Retweets"),
+            ("replies", 20, "Hohe Anzahl an Kommentaren", 5, "Gute Anzahl an Kommentaren"),
+        )
+        for key, high, high_text, low, low_text in tiers:
+            value = int(features[key][i])
+            if value >= high:
+                reasons.append(f"{high_text}: {value}")
+            elif value >= low:
+                reasons.append(f"{low_text}: {value}")
+        total_engagement = int(features["engagement_total"][i])
+        if total_engagement >= 200:
+            reasons.append(f"Sehr hohes Gesamtengagement: {total_engagement}")
+    return ", ".join(reasons)
+
+
+def evaluate_tweet_quality_batch(tweets, with_reasons=False):
+    """
+    Bewertet viele Tweets auf einmal; liefert dieselben Scores wie evaluate_tweet_quality.
+
+    Args:
+        tweets: Liste von Tweets (Dictionaries werden einmalig umgewandelt)
+        with_reasons: Begründungstexte erzeugen (sonst None)
+
+    Returns:
+        Scores (numpy.ndarray bzw. Liste ohne NumPy) und Begründungen oder None
+    """
+    tweets = [as_tweet(tweet) for tweet in tweets]
+    if np is None:
+        results = [evaluate_tweet_quality(tweet.text, tweet) for tweet in tweets]
+        scores = [score for score, _ in results]
+        return scores, ([reason for _, reason in results] if with_reasons else None)
+    if not tweets:
+        return np.zeros(0), ([] if with_reasons else None)
+    return score_quality_features(quality_features(tweets), with_reasons)
@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+
+"""
+Einheitlicher Datensatz für Tweets aus twscrape und Nitter.
+Beide Scraper erzeugen beim Einlesen genau einmal einen Tweet; alle weiteren Stufen
+(Duplikaterkennung, Qualitätsbewertung, Stil, Medien, Versand) lesen dessen Felder direkt,
+statt verschiedene Dictionary-Strukturen zu durchsuchen. Dank __slots__ braucht ein Tweet
+deutlich weniger Speicher als ein Dictionary mit denselben Feldern.
+"""
+
+import datetime
+from dataclasses import dataclass, field, asdict
+
+
+@dataclass(slots=True)
+class Tweet:
+    id: str
+    text: str
+    username: str = ""
+    url: str = ""
+    date: datetime.datetime | None = None
+    images: list = field(default_factory=list)            # Bild-URLs in Reihenfolge des Tweets
+    video_thumbnails: list = field(default_factory=list)  # Vorschaubilder von Videos und GIFs
+    likes: int = 0
+    retweets: int = 0
+    replies: int = 0
+    quotes: int = 0  # Nitter zeigt keine Quote-Tweets an
+    source: str = ""  # "twscrape" oder "nitter"
+
+    @property
+    def engagement_total(self):
+        return self.likes + self.retweets + self.replies + self.quotes
+
+    def to_dict(self):
+        """Serialisierbare Darstellung (Datum als ISO-String)."""
+        data = asdict(self)
+        data["date"] = self.date.isoformat() if self.date else None
+        return data
+
+    @classmethod
+    def from_dict(cls, data, username=""):
+        """
+        Erzeugt einen Tweet aus einem Dictionary, auch aus älteren Strukturen
+        (user/author/screen_name, public_metrics, media-Liste). Die Suche nach den
+        verschiedenen Schlüsseln findet nur hier statt.
+        """
+        author = data.get("user") if isinstance(data.get("user"), dict) else data.get("author")
+        if isinstance(author, dict):
+            username = author.get("username") or author.get("screen_name") or username
+        username = data.get("username") or data.get("screen_name") or username
+
+        metrics = data.get("public_metrics") or {}
+        images = list(data.get("images") or [])
+        video_thumbnails = list(data.get("video_thumbnails") or [])
+        for media in data.get("media") or []:
+            if media.get("type") == "photo" and (media.get("url") or media.get("preview_image_url")):
+                images.append(media.get("url") or media.get("preview_image_url"))
+            elif media.get("type") in ("video", "animated_gif") and media.get("preview_image_url"):
+                video_thumbnails.append(media["preview_image_url"])
+
+        date = data.get("date")
+        if isinstance(date, str):
+            date = datetime.datetime.fromisoformat(date)
+
+        tweet_id = data.get("id")
+        return cls(
+            id=str(tweet_id) if tweet_id is not None else "",
+            text=data.get("text", "") or "",
+            username=username or "",
+            url=data.get("url", "") or "",
+            date=date,
+            images=images,
+            video_thumbnails=video_thumbnails,
+            likes=data.get("likes", metrics.get("like_count", 0)) or 0,
+            retweets=data.get("retweets", metrics.get("retweet_count", 0)) or 0,
+            replies=data.get("replies", metrics.get("reply_count", 0)) or 0,
+            quotes=data.get("quotes", metrics.get("quote_count", 0)) or 0,
+            source=data.get("source", "") or ""
+        )
+
+
+def as_tweet(tweet_data, username=""):
+    """Gibt tweet_data als Tweet zurück (Dictionaries werden einmalig umgewandelt)."""
+    if isinstance(tweet_data, Tweet):
+        return tweet_data
+    return Tweet.from_dict(tweet_data or {}, username)
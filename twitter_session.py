@@ -0,0 +1,151 @@
+# -*- coding: utf-8 -*-
+
+"""
+Sitzungsverwaltung für twscrape.
+Meldet den Scraping-Account einmal an, nutzt die in der twscrape-Pool-Datenbank
+gespeicherten Cookies/Tokens über mehrere Läufe hinweg und meldet sich nur dann
+erneut an, wenn eine Anfrage tatsächlich mit einem Authentifizierungsfehler scheitert.
+"""
+
+import time
+import asyncio
+
+from twscrape import NoAccountError
+
+from config import TWITTER_SESSION
+
+# HTTP-Statuscodes, die auf eine abgelaufene oder ungültige Sitzung hindeuten
+AUTH_ERROR_STATUS = (401, 403)
+
+
+def is_auth_error(error):
+    """
+    Prüft, ob eine Anfrage mit 401/403 abgelehnt wurde. Rate-Limits und ein gerade von einer
+    anderen Anfrage belegter Account (NoAccountError) sind keine Authentifizierungsfehler.
+    """
+    response = getattr(error, "response", None)
+    return getattr(response, "status_code", None) in AUTH_ERROR_STATUS
+
+
+class TwitterSession:
+    """
+    Hält den Anmeldestatus des Scraping-Accounts im twscrape-Pool.
+
+    Der Gesundheitscheck liest nur die lokale Pool-Datenbank (keine Netzwerkanfrage).
+    Ein Login findet nur statt, wenn der Account fehlt, keine Sitzung hat oder
+    eine Anfrage mit einem Authentifizierungsfehler fehlgeschlagen ist.
+    """
+
+    def __init__(self, api, username, password, email, email_password, relogin_cooldown=None):
+        self.api = api
+        self.username = username
+        self.password = password
+        self.email = email
+        self.email_password = email_password
+        self.relogin_cooldown = (relogin_cooldown if relogin_cooldown is not None
+                                 else TWITTER_SESSION["relogin_cooldown_seconds"])
+        self._ready = False
+        self._lock = None
+        self._last_login_attempt = 0.0
+
+    @property
+    def has_credentials(self):
+        return bool(self.username and self.password and self.email and self.email_password)
+
+    def _get_lock(self):
+        # Lock erst im laufenden Event-Loop erzeugen
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        return self._lock
+
+    async def _account_info(self):
+        """Liest den Status des Accounts aus der lokalen Pool-Datenbank."""
+        for info in await self.api.pool.accounts_info():
+            if info["username"] == self.username:
+                return info
+        return None
+
+    async def _session_rejected(self):
+        """
+        twscrape reicht 401/403 nicht weiter, sondern deaktiviert den Account und meldet danach
+        NoAccountError. Nur dann (und nicht bei Rate-Limits oder belegtem Account) ist die Sitzung ungültig.
+        """
+        info = await self._account_info()
+        return info is None or not info["logged_in"] or not info["active"]
+
+    async def ensure_ready(self):
+        """
+        Stellt sicher, dass eine gültige Sitzung vorhanden ist.
+
+        Returns:
+            bool: True, wenn der Account angemeldet und aktiv ist
+        """
+        if self._ready:
+            return True
+        if not self.has_credentials:
+            return False
+
+        async with self._get_lock():
+            if self._ready:
+                return True
+
+            info = await self._account_info()
+            if info is None:
+                print("Füge Twitter-Account hinzu...")
+                await self.api.pool.add_account(self.username, self.password, self.email, self.email_password)
+                info = await self._account_info()
+
+            if info and info["logged_in"] and info["active"]:
+                print("Gespeicherte Twitter-Sitzung wird wiederverwendet.")
+                self._ready = True
+                return True
+
+            if time.time() - self._last_login_attempt < self.relogin_cooldown:
+                print("Letzter Twitter-Login liegt zu kurz zurück, überspringe erneuten Versuch.")
+                return False
+
+            self._last_login_attempt = time.time()
+            print("Logge in Twitter ein...")
+            if info and info.get("error_msg") and info["error_msg"] != "None":
+                await self.api.pool.relogin(self.username)
+            else:
+                await self.api.pool.login_all([self.username])
+
+            info = await self._account_info()
+            self._ready = bool(info and info["logged_in"] and info["active"])
+            print("Login erfolgreich!" if self._ready else "Twitter-Login fehlgeschlagen.")
+            return self._ready
+
+    async def handle_auth_failure(self, error=None):
+        """Verwirft die aktuelle Sitzung und meldet den Account erneut an."""
+        print(f"Twitter-Sitzung ungültig ({error}), melde erneut an...")
+        async with self._get_lock():
+            self._ready = False
+            if time.time() - self._last_login_attempt < self.relogin_cooldown:
+                return False
+            self._last_login_attempt = time.time()
+            await self.api.pool.relogin(self.username)
+            info = await self._account_info()
+            self._ready = bool(info and info["logged_in"] and info["active"])
+            return self._ready
+
+    async def call(self, request_factory):
+        """
+        Führt eine twscrape-Anfrage aus und meldet sich bei einem Authentifizierungsfehler
+        einmalig neu an, bevor die Anfrage wiederholt wird.
+
+        Args:
+            request_factory: Funktion ohne Argumente, die die Anfrage-Coroutine erzeugt
+        """
+        if not await self.ensure_ready():
+            raise NoAccountError("Keine gültige Twitter-Sitzung verfügbar")
+        try:
+            return await request_factory()
+        except NoAccountError as e:
+            if not await self._session_rejected() or not await self.handle_auth_failure(e):
+                raise
+            return await request_factory()
+        except Exception as e:
+            if not is_auth_error(e) or not await self.handle_auth_failure(e):
+                raise
+            return await request_factory()